@@ -0,0 +1,248 @@
+"""
+Measure each stage of the pipeline on a synthetic dataset: loading,
+column normalization, type inference, transformations, SQL generation per
+dialect and batch size, and writing plain and gzip output.
+
+Every stage reports its best wall time over the repeats, rows/sec and the
+peak resident memory while it ran. Results can be saved as JSON and
+compared against a saved baseline, flagging stages that got slower.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_stages.py --rows 200000 --save baseline.json
+    PYTHONPATH=. python benchmarks/bench_stages.py --rows 200000 --compare baseline.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from brokolisql.dialects import get_dialect
+from brokolisql.output.output_writer import write_output
+from brokolisql.services.normalizer import normalize_column_names
+from brokolisql.services.sql_generator import generate_sql
+from brokolisql.services.type_inference import infer_column_types
+from brokolisql.transformers.transform_engine import apply_transformations
+from brokolisql.utils.file_loader import load_file
+
+from synthetic import make_dataframe, write_csv
+
+# Transformations run by the apply_transformations stage, on the columns
+# `synthetic.make_dataframe` makes
+TRANSFORMS = {
+    'transformations': [
+        {'type': 'filter_rows', 'condition': 'INT_COL_0 % 4 != 0'},
+        {'type': 'add_column', 'name': 'SCALED', 'expression': 'FLOAT_COL_1 * 1.5'},
+        {'type': 'apply_function', 'column': 'TEXT_COL_2', 'function': 'upper'},
+        {'type': 'replace_values', 'column': 'TEXT_COL_2', 'mapping': {'LEE LEE': 'LEE'}},
+        {'type': 'rename_columns', 'mapping': {'DATE_COL_4': 'CREATED'}},
+    ]
+}
+
+DIALECTS = ['generic', 'mysql', 'postgres', 'sqlite', 'oracle', 'sqlserver']
+
+# Seconds between two samples of the resident memory
+SAMPLE_INTERVAL = 0.005
+
+# Slowdown past which a stage counts as a regression in compare mode
+DEFAULT_THRESHOLD = 0.10
+
+
+def resident_memory():
+    """Resident memory of this process in bytes, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Without /proc only the peak of the whole process is known
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class PeakMemory:
+    """Sample the resident memory on a thread while a stage runs, keeping the peak."""
+
+    def __init__(self):
+        self.peak = self.start = resident_memory()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._done.wait(SAMPLE_INTERVAL):
+            self._update()
+
+    def _update(self):
+        current = resident_memory()
+        if current is not None:
+            self.peak = max(self.peak or 0, current)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        self._thread.join()
+        self._update()
+
+
+def measure(fn, rows, repeat):
+    """
+    Run a stage `repeat` times.
+
+    Returns:
+        tuple: (result of the last run, stats of the best run)
+    """
+    best = peak = growth = None
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        # Progress bars go to stderr, and would otherwise be timed too
+        with PeakMemory() as memory, contextlib.redirect_stderr(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        if memory.peak is not None:
+            peak = max(peak or 0, memory.peak)
+            growth = max(growth or 0, memory.peak - memory.start)
+    stats = {
+        'seconds': round(best, 6),
+        'rows_per_sec': round(rows / best, 1) if best else None,
+        'peak_rss': peak,
+        'rss_growth': growth,
+    }
+    return result, stats
+
+
+def run_stages(args, workdir):
+    """Run every stage and collect its stats, keyed by stage name."""
+    raw = make_dataframe(args.rows, args.columns, args.null_ratio, args.seed)
+    csv_path = write_csv(raw, os.path.join(workdir, 'bench.csv'))
+    results = {}
+
+    def stage(name, fn, **extra):
+        result, stats = measure(fn, args.rows, args.repeat)
+        stats.update(extra)
+        results[name] = stats
+        print(f"{name:<34} {stats['seconds']:9.3f} {stats['rows_per_sec']:14,.0f} "
+              f"{(stats['peak_rss'] or 0) / 2**20:10.1f}")
+        return result
+
+    print(f"{'stage':<34} {'seconds':>9} {'rows/sec':>14} {'peak MB':>10}")
+    loaded, _ = stage('load_file', lambda: load_file(csv_path))
+    stage('normalize_column_names', lambda: normalize_column_names(raw.copy(deep=False)))
+    stage('infer_column_types', lambda: infer_column_types(loaded))
+    stage('apply_transformations', lambda: apply_transformations(loaded, TRANSFORMS))
+
+    statements = None
+    for dialect_name in args.dialects:
+        dialect = get_dialect(dialect_name)
+        for batch_size in args.batch_sizes:
+            sql = stage(f'generate_sql[{dialect_name},{batch_size}]',
+                        lambda: generate_sql(loaded, 'bench', dialect, batch_size))
+            if statements is None:
+                statements = sql
+
+    for kind, ext in (('plain', '.sql'), ('gz', '.sql.gz')):
+        path = os.path.join(workdir, 'bench' + ext)
+        stage(f'write_output[{kind}]', lambda: write_output(statements, path))
+        results[f'write_output[{kind}]']['bytes'] = os.path.getsize(path)
+    return results
+
+
+def environment():
+    """Versions and machine the results were measured with."""
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare rows/sec against a baseline, stage by stage.
+
+    Returns:
+        list: Names of the stages slower than the baseline by more than
+            `threshold`.
+    """
+    if baseline.get('params') != results['params']:
+        print(f"\nWarning: the baseline was measured with other parameters: {baseline.get('params')}")
+
+    regressions = []
+    print(f"\n{'stage':<34} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, stats in results['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if not before or not before.get('rows_per_sec') or not stats['rows_per_sec']:
+            print(f"{name:<34} {'-':>14} {stats['rows_per_sec'] or 0:14,.0f} {'new':>8}")
+            continue
+        change = stats['rows_per_sec'] / before['rows_per_sec'] - 1
+        flag = '  REGRESSION' if change < -threshold else ''
+        print(f"{name:<34} {before['rows_per_sec']:14,.0f} {stats['rows_per_sec']:14,.0f} {change:+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=10, help='Number of columns (at least 5)')
+    parser.add_argument('--null-ratio', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of each stage; the best one is kept')
+    parser.add_argument('--dialects', type=lambda value: value.split(','), default=DIALECTS)
+    parser.add_argument('--batch-sizes', type=lambda value: [int(n) for n in value.split(',')], default=[1, 100])
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare against the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Slowdown that counts as a regression, such as 0.1 for 10%%')
+    args = parser.parse_args()
+    if args.columns < 5:
+        parser.error('--columns must be at least 5')
+
+    with tempfile.TemporaryDirectory(prefix='brokolisql-bench-') as workdir:
+        stages = run_stages(args, workdir)
+    results = {
+        'params': {
+            'rows': args.rows, 'columns': args.columns, 'null_ratio': args.null_ratio, 'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'environment': environment(),
+        'stages': stages,
+    }
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Measure how SQL generation throughput scales with the number of worker
+processes used by `iter_sql_parallel`.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_workers.py --rows 500000 --max-workers 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from brokolisql.dialects import get_dialect
+from brokolisql.services.parallel import iter_sql_parallel
+from brokolisql.services.sql_generator import iter_sql
+
+
+def make_dataframe(rows, seed=0):
+    """Build a synthetic table mixing integers, floats, strings and dates."""
+    rng = np.random.default_rng(seed)
+    names = np.array(["O'Brien", 'Smith', 'van der Berg', 'Lee', "D'Angelo"])
+    return pd.DataFrame({
+        'ID': np.arange(rows),
+        'AMOUNT': np.where(rng.random(rows) < 0.1, np.nan, rng.normal(100, 25, rows).round(2)),
+        'NAME': names[rng.integers(0, len(names), rows)],
+        'ACTIVE': rng.random(rows) < 0.5,
+        'CREATED': pd.to_datetime(rng.integers(1_500_000_000, 1_700_000_000, rows), unit='s'),
+    })
+
+
+def worker_counts(max_workers):
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--dialect', default='postgres')
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    df = make_dataframe(args.rows)
+    dialect = get_dialect(args.dialect)
+
+    start = time.perf_counter()
+    for _ in iter_sql([df], 'bench', dialect, batch_size=args.batch_size, progress=False):
+        pass
+    serial = time.perf_counter() - start
+    print(f"{'workers':>8} {'seconds':>9} {'rows/sec':>12} {'speedup':>8}")
+    print(f"{'serial':>8} {serial:9.2f} {args.rows / serial:12,.0f} {1:8.2f}")
+
+    for workers in worker_counts(args.max_workers):
+        start = time.perf_counter()
+        for _ in iter_sql_parallel([df], 'bench', dialect, batch_size=args.batch_size,
+                                   workers=workers, progress=False):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>8} {elapsed:9.2f} {args.rows / elapsed:12,.0f} {serial / elapsed:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Synthetic, reproducible datasets for the benchmarks.
+
+Columns cycle through integers, floats, strings that need quote escaping,
+booleans and dates, with a share of missing values in every column but
+the first. The same seed always gives the same rows.
+"""
+import numpy as np
+import pandas as pd
+
+# Kinds of columns, in the order they cycle
+COLUMN_KINDS = ('int', 'float', 'text', 'bool', 'date')
+
+# Words strings are made of; some need their quotes escaped in SQL
+WORDS = np.array(["O'Brien", 'Smith', 'van der Berg', 'Lee', "D'Angelo", "it's", 'Müller', '"quoted"'])
+
+
+def column_names(columns):
+    """Raw names of the columns, with spaces and lower case for the normalizer to fix."""
+    return [f'{COLUMN_KINDS[i % len(COLUMN_KINDS)]} col {i}' for i in range(columns)]
+
+
+def _column(kind, rows, rng):
+    if kind == 'int':
+        return rng.integers(-1_000_000, 1_000_000, rows)
+    if kind == 'float':
+        return rng.normal(100, 25, rows).round(2)
+    if kind == 'text':
+        first = WORDS[rng.integers(0, len(WORDS), rows)]
+        second = WORDS[rng.integers(0, len(WORDS), rows)]
+        return np.char.add(np.char.add(first.astype(str), ' '), second.astype(str)).astype(object)
+    if kind == 'bool':
+        return rng.random(rows) < 0.5
+    return pd.to_datetime(rng.integers(1_500_000_000, 1_700_000_000, rows), unit='s')
+
+
+def make_dataframe(rows, columns=10, null_ratio=0.1, seed=0):
+    """
+    Build a synthetic table.
+
+    Args:
+        rows (int): Number of rows.
+        columns (int): Number of columns; the first one is a unique id.
+        null_ratio (float): Share of missing values in the other columns.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        DataFrame: The rows, with the raw column names of `column_names`.
+    """
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i, name in enumerate(column_names(columns)):
+        values = pd.Series(np.arange(rows) if i == 0 else _column(COLUMN_KINDS[i % len(COLUMN_KINDS)], rows, rng))
+        if i and null_ratio:
+            values = values.mask(rng.random(rows) < null_ratio)
+        data[name] = values
+    return pd.DataFrame(data)
+
+
+def write_csv(df, path):
+    """Write a synthetic table as a CSV file, as the loader reads them."""
+    df.to_csv(path, index=False)
+    return path
@@ -1,10 +1,46 @@
 import argparse
-from brokolisql.utils.file_loader import load_file
-from brokolisql.services.sql_generator import generate_sql
-from brokolisql.output.output_writer import write_output
+from brokolisql.utils.file_loader import (
+    load_file, load_sheets, iter_file_chunks, scan_file_schema, scan_file_stats, estimate_chunk_size, resolve_format,
+    read_columns, CSV_ENGINES,
+)
+from brokolisql.utils.input_files import (
+    expand_input, is_batch_input, is_template, render_table_name, template_fields,
+)
+from brokolisql.utils.arrow_csv import arrow_available
+from brokolisql.utils.excel_reader import resolve_sheets
+from brokolisql.utils.sizes import parse_size
+from brokolisql.services.sql_generator import iter_sql
+from brokolisql.services.parallel import iter_sql_parallel
+from brokolisql.services.bulk_load import iter_copy, iter_load_data, data_file_path
+from brokolisql.services.compact import compact_frame, MemoryReport
+from brokolisql.services.delta import DeltaState, iter_delta, default_state_path, resolve_key_columns
+from brokolisql.services import metrics
+from brokolisql.services.progress import progress_bar, set_progress
+from brokolisql.services.type_inference import column_types_from_stats, merge_column_stats, widen_text_types
+from brokolisql.services.schema_cache import (
+    SchemaCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_ENTRIES, file_fingerprint, header_signature, schema_key,
+    export_schemas, import_schemas, project_schema,
+)
+from brokolisql.output.output_writer import write_output, DEFAULT_BUFFER_SIZE
+from brokolisql.output.shards import write_shards, manifest_path
 from brokolisql.dialects import get_dialect
-from brokolisql.exceptions import BrokoliSQLException
+from brokolisql.targets import get_target
+from brokolisql.targets.base import DEFAULT_COMMIT_INTERVAL
+from brokolisql.transformers.streaming import DEFAULT_SPILL_GROUPS
+from brokolisql.transformers.external_sort import DEFAULT_SORT_MEMORY
+from brokolisql.exceptions import (
+    BatchFailed, BrokoliSQLException, OutputConflict, OutputFormatNotSupported, SchemaNotFound,
+)
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
 import sys
+import tempfile
 import importlib.resources
 from importlib.metadata import version, PackageNotFoundError
 
@@ -27,22 +63,109 @@ def main():
     print_banner()
     parser = argparse.ArgumentParser(description="BrokoliSQL - Convert CSV/Excel to SQL INSERT statements")
     parser.add_argument('--version', action='version', version=f"BrokoliSQL {__version__}")
-    parser.add_argument('--input', required=True, help='Path to the input CSV or Excel file')
-    parser.add_argument('--output', required=True, help='Path to the output SQL file')
-    parser.add_argument('--table', required=True, help='Name of the SQL table to insert into')
+    parser.add_argument('--input', required=True, help="Path to the input CSV or Excel file, or a directory or quoted glob pattern such as 'data/**/*.csv' to convert many files at once with --workers processes")
+    parser.add_argument('--output', help='Path to the output SQL file; with a batch --input, the SQL of all the files goes to it in input order unless it is a template such as out/{stem}.sql naming one output per file ({stem}, {name}, {parent} and {index} of each file)')
+    parser.add_argument('--target', help='Load the rows straight into a database instead of writing SQL, such as sqlite:///data.db (SQLite pragmas can be set as query parameters, e.g. ?journal_mode=WAL; journal_mode=OFF loads faster but cannot roll back a failed load)')
+    parser.add_argument('--commit-interval', type=int, default=DEFAULT_COMMIT_INTERVAL, help=f'Number of rows loaded per transaction with --target (default: {DEFAULT_COMMIT_INTERVAL})')
+    parser.add_argument('--table', required=True, help='Name of the SQL table to insert into; with a batch --input the files are appended into it under a schema merged from all of them, unless it is a template such as {stem} naming one table per file')
     parser.add_argument('--dialect', default='generic', help='SQL dialect (mysql, postgres, sqlite, oracle, sqlserver)')
     parser.add_argument('--create-table', action='store_true', help='Generate CREATE TABLE statement')
-    parser.add_argument('--batch-size', type=int, default=1, help='Number of INSERT statements per batch')
-    parser.add_argument('--format', default='auto', help='Force input format (csv, excel, json, xml)')
+    parser.add_argument('--output-format', choices=['insert', 'copy', 'copy-csv', 'load-data'], default='insert', help="Write INSERT statements, a PostgreSQL COPY FROM STDIN script with text ('copy') or CSV ('copy-csv') data, or a MySQL LOAD DATA LOCAL INFILE script with a companion <output>.<table>.tsv data file (default: insert)")
+    parser.add_argument('--batch-size', type=parse_batch_size, default=1, help="Number of rows per INSERT statement, or 'auto' for as many as the dialect's limits allow; statements are closed early at those limits either way")
+    parser.add_argument('--max-batch-rows', type=int, help='Rows per INSERT statement at most, instead of the limit of the dialect (1000 for sqlserver and generic, none for the others)')
+    parser.add_argument('--max-statement-bytes', type=parse_size, help='Size of an INSERT statement at most, such as 1MB, instead of the limit of the dialect (just under 4MB for mysql and generic, 16MB for the others)')
+    parser.add_argument('--max-bind-parameters', type=int, help='Values per INSERT statement at most, for drivers that bind literals as parameters (default: no limit)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes used to generate SQL')
+    parser.add_argument('--format', default='auto', help='Force input format (csv, excel, json, ndjson, xml, parquet, arrow for Feather and Arrow IPC files)')
+    parser.add_argument('--engine', choices=CSV_ENGINES, default='c', help="Parser of CSV input: pandas' C parser, or Arrow's multithreaded reader, which streams the file block by block in streaming mode (default: c)")
+    parser.add_argument('--json-path', help='Dot-separated path to the record array in a JSON file, such as data.items')
+    parser.add_argument('--xml-record-tag', help='Tag of the XML elements holding one record each (default: children of the root)')
+    parser.add_argument('--xml-attributes', action='store_true', help='Take the attributes of XML record elements as columns')
+    parser.add_argument('--sheet', action='append', help="Excel sheet name or 0-based position to read; repeat for several sheets or use '*' for all (default: the first sheet)")
+    parser.add_argument('--sheet-tables', action='store_true', help='Write each Excel sheet to its own table named <table>_<sheet> instead of appending them all to --table')
     parser.add_argument('--transform', help='Path to transformation config file')
+    parser.add_argument('--spill-groups', type=int, default=DEFAULT_SPILL_GROUPS, help=f'Number of groups a streaming aggregate keeps in memory before spilling partial results to disk (default: {DEFAULT_SPILL_GROUPS})')
+    parser.add_argument('--sort-memory', type=parse_size, default=DEFAULT_SORT_MEMORY, help='Memory a streaming sort uses to sort rows before writing them to disk as a sorted run, such as 1GB (default: 256MB)')
+    parser.add_argument('--spill-dir', help='Directory for the partial results and sorted runs a streaming aggregate or sort writes to disk, and the rows spread over --shards files (default: the system temporary directory)')
+    parser.add_argument('--explain', action='store_true', help='Print the optimized plan of the --transform config and exit without loading any rows')
+    parser.add_argument('--compact', action='store_true', help='Hold the rows in compact dtypes before writing them: categoricals for repeated strings, the narrowest integer types, and Arrow-backed strings when pyarrow is installed')
+    parser.add_argument('--memory-report', action='store_true', help='Print the memory taken by each column before and after compacting (implies --compact)')
+    parser.add_argument('--stream', action='store_true', help='Stream the input in chunks to keep memory use flat')
+    parser.add_argument('--chunk-size', type=int, help='Number of rows per chunk in streaming mode (implies --stream)')
+    parser.add_argument('--max-memory', type=parse_size, help='Memory budget such as 512MB used to pick the chunk size (implies --stream)')
+    parser.add_argument('--delta', action='store_true', help='Only write the rows that are new or changed since the last --delta run, as upserts (ON CONFLICT for PostgreSQL and SQLite, ON DUPLICATE KEY for MySQL, MERGE for SQL Server, Oracle and generic SQL); requires --key')
+    parser.add_argument('--key', type=lambda value: [col.strip() for col in value.split(',')], help='Comma-separated columns identifying a row in --delta mode; with --create-table they become the primary key')
+    parser.add_argument('--delta-state', help='SQLite file keeping the key and a hash of every row between --delta runs (default: brokolisql.delta.db next to the output)')
+    parser.add_argument('--delta-deletes', action='store_true', help='In --delta mode, also delete the rows whose key is gone since the last run')
+    parser.add_argument('--shard-rows', type=int, help='Split the SQL output into numbered files of at most this many rows, such as output.0001.sql, listed with their rows, size and checksum in output.manifest.json; CREATE TABLE goes to output.preamble.sql')
+    parser.add_argument('--shard-bytes', type=parse_size, help='Split the SQL output into numbered files of this size before compression, such as 1GB, give or take a statement (can be combined with --shard-rows)')
+    parser.add_argument('--shards', type=int, help='Split the rows of each table over this many numbered files, in contiguous ranges, round robin when the number of rows is not known up front, or by --shard-key')
+    parser.add_argument('--shard-key', type=lambda value: [col.strip() for col in value.split(',')], help='Comma-separated columns whose hash picks the file of each row with --shards, so rows sharing a key go to the same file')
+    parser.add_argument('--compression-level', type=int, help='Compression level for .gz/.zst output')
+    parser.add_argument('--compression-threads', type=int, help='Number of threads used to compress .gz/.zst output')
+    parser.add_argument('--buffer-size', type=parse_size, default=DEFAULT_BUFFER_SIZE, help='Size of the blocks written to the output file, such as 4MB')
+    parser.add_argument('--schema-cache', dest='schema_cache', action='store_true', help='Reuse the schema inferred for an unchanged input file from the schema cache (default when BROKOLISQL_SCHEMA_CACHE=1)')
+    parser.add_argument('--no-schema-cache', dest='schema_cache', action='store_false', help='Always infer the schema, without using the schema cache')
+    parser.add_argument('--schema-cache-dir', default=DEFAULT_CACHE_DIR, help='Directory of the schema cache')
+    parser.add_argument('--schema-cache-size', type=int, default=DEFAULT_MAX_ENTRIES, help='Number of schemas kept in the cache before the least recently used are evicted')
+    parser.add_argument('--schema-cache-key', choices=['content', 'header'], default='content', help="Key cached schemas by file content, or by header so files with the same layout share one (default: content)")
+    parser.add_argument('--export-schema', help='Write the schema of the input to a JSON schema file')
+    parser.add_argument('--import-schema', help='Read the input with the schema from a JSON schema file instead of inferring it')
+    parser.add_argument('--profile', action='store_true', help='Print the wall time, CPU time, rows/sec and peak memory of each stage of the run: parsing, normalizing, type inference, each transformation, SQL generation, writing and loading')
+    parser.add_argument('--metrics-file', help='Write the measurements of each stage, and the bytes written and compression ratio of the output, to this JSON file')
+    parser.add_argument('--profile-dump', help='Run cProfile and write its stats to this file, for pstats or snakeviz')
+    parser.add_argument('--profile-stage', help="Only profile the stages whose name starts with this, such as 'generate' or 'transform' (default: the whole run)")
+    parser.add_argument('--no-progress', action='store_true', help='Show no progress bars')
     parser.add_argument('--debug', action='store_true', help='Show full tracebacks for debugging')
+    parser.set_defaults(schema_cache=os.environ.get('BROKOLISQL_SCHEMA_CACHE', '') not in ('', '0'))
     
     args = parser.parse_args()
+    if not args.output and not args.target and not args.explain:
+        parser.error('one of --output or --target is required')
+    if args.target and args.output_format != 'insert':
+        parser.error('--output-format does not apply to --target')
+    if bool(args.delta) != bool(args.key):
+        parser.error('--delta and --key go together')
+    if args.delta and (args.target or args.output_format != 'insert'):
+        parser.error('--delta writes upserts to an SQL --output, without --target or --output-format')
+    if args.shard_rows or args.shard_bytes or args.shards:
+        if args.target or not args.output or args.delta:
+            parser.error('--shard-rows, --shard-bytes and --shards split an SQL --output, without --target or --delta')
+        if args.shards and (args.shard_rows or args.shard_bytes):
+            parser.error('--shards does not go with --shard-rows or --shard-bytes')
+        if args.shard_bytes and args.output_format == 'load-data':
+            parser.error('--shard-bytes does not apply to --output-format load-data, whose rows go to a data file')
+    if args.shard_key and not args.shards:
+        parser.error('--shard-key requires --shards')
+    if is_batch_input(args.input):
+        if args.target or args.delta:
+            parser.error('a directory or pattern --input writes an SQL --output, without --target or --delta')
+        if not is_template(args.output) and (args.shard_rows or args.shard_bytes or args.shards):
+            parser.error('--shard-rows, --shard-bytes and --shards need an --output template such as {stem}.sql with a directory or pattern --input')
+        if not is_template(args.output) and args.output_format == 'load-data':
+            parser.error('--output-format load-data needs an --output template such as {stem}.sql with a directory or pattern --input')
+        if args.sheet_tables and not is_template(args.table):
+            parser.error('--sheet-tables needs a --table template such as {stem} with a directory or pattern --input')
+        if args.export_schema and is_template(args.table):
+            parser.error('--export-schema does not apply to a --table template, whose tables each have a schema')
+    elif is_template(args.table) or is_template(args.output):
+        parser.error('--table and --output templates such as {stem} need a directory or pattern --input')
+    for option, value in (('--table', args.table), ('--output', args.output)):
+        if is_template(value):
+            try:
+                value.format(**template_fields('input.csv', 1))
+            except (KeyError, IndexError, ValueError) as e:
+                parser.error(f"{option} template {value!r} is not valid: {e}; it can hold {{stem}}, {{name}}, {{parent}} and {{index}}")
+    if args.no_progress:
+        set_progress(None)
     
     # Load and transform data
-
+    
     try:
-        run(args)
+        if args.profile or args.metrics_file or args.profile_dump:
+            run_measured(args)
+        else:
+            run(args)
     except BrokoliSQLException as e:
         print(f"\n{e}")
         if args.debug:
@@ -58,30 +181,616 @@ def main():
             print("Run with --debug for more information.")
         sys.exit(1)
 
+def parse_batch_size(value):
+    """Read --batch-size: a number of rows, or 'auto' (None) for as many as the limits allow."""
+    if value == 'auto':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid batch size: '{value}' (use a number of rows or 'auto')")
+
+def batch_options(args):
+    """Collect the limits of multi-row statements given on the command line."""
+    return {
+        'max_rows': args.max_batch_rows,
+        'max_bytes': args.max_statement_bytes,
+        'max_parameters': args.max_bind_parameters,
+    }
+
+def reader_options(args):
+    """Collect the format-specific reader options given on the command line."""
+    return {
+        'json_path': args.json_path,
+        'xml_record_tag': args.xml_record_tag,
+        'xml_attributes': args.xml_attributes,
+        'sheets': args.sheet,
+    }
+
+def output_tables(args):
+    """
+    Pair each output table with the reader options that load its rows: a
+    single table for the whole input, or one table per Excel sheet with
+    `--sheet-tables`.
+    """
+    options = reader_options(args)
+    if not args.sheet_tables or resolve_format(args.input, args.format) != 'excel':
+        return [(args.table, options)]
+    return [(args.table + '_' + re.sub(r'[^\w]', '_', sheet), dict(options, sheets=[sheet]))
+            for sheet in resolve_sheets(args.input, args.sheet)]
+
+def schema_sources(args):
+    """Open the schema file given with `--import-schema` and the schema cache, when enabled."""
+    imported = import_schemas(args.import_schema) if args.import_schema else None
+    cache = SchemaCache(args.schema_cache_dir, args.schema_cache_size) if args.schema_cache else None
+    return imported, cache
+
+def find_schema(args, table, options, imported, cache):
+    """
+    Look up the known schema of an output table, imported or cached.
+    
+    Returns:
+        tuple: (schema or None, cache key to store a new schema under or None)
+    """
+    if imported is not None:
+        # A schema file holding a single table applies whatever the table is called
+        schema = imported.get(table) or (next(iter(imported.values())) if len(imported) == 1 else None)
+        if schema is None:
+            raise SchemaNotFound(args.import_schema, table, list(imported))
+        return project_schema(schema, options.get('exclude_columns')), None
+    if cache is None:
+        return None, None
+    
+    if args.schema_cache_key == 'header':
+        signature = header_signature(read_columns(args.input, args.format, **options))
+    else:
+        signature = file_fingerprint(args.input)
+    key = schema_key(signature, resolve_format(args.input, args.format), options)
+    schema = cache.get(key)
+    if schema and args.schema_cache_key == 'header':
+        # Files sharing a layout share their types, not their length
+        schema = schema[:2] + (None,)
+    return schema, key
+
+def shared_schema(args, schema, key):
+    """Whether a schema was cached for another file with the same header, whose text may be shorter."""
+    return bool(schema and key and args.schema_cache_key == 'header')
+
+def streaming(args):
+    """Whether the input is read in chunks rather than all at once."""
+    return bool(args.stream or args.chunk_size or args.max_memory)
+
+def plan_tables(args, config=None):
+    """
+    Pair each output table and its reader options with the optimized plan of
+    the `--transform` config, or of `config` when given, or None without
+    one. Columns the plan drops without reading are left out of the reader
+    options, so they are never loaded.
+    """
+    tables = output_tables(args)
+    if not args.transform:
+        return [(table, options, None) for table, options in tables]
+    
+    from brokolisql.transformers.transform_engine import load_config
+    from brokolisql.transformers.plan import compile_plan
+    if config is None:
+        config = load_config(args.transform)
+    planned = []
+    for table, options in tables:
+        plan = compile_plan(config, read_columns(args.input, args.format, **options))
+        if plan.exclude_columns:
+            options = dict(options, exclude_columns=plan.exclude_columns)
+        planned.append((table, options, plan))
+    return planned
+
+def explain(args):
+    """Print the transformation plan of each output table."""
+    config = barrier = tail = None
+    if args.transform and streaming(args):
+        from brokolisql.transformers.transform_engine import load_config
+        from brokolisql.transformers.streaming import split_streaming
+        config, barrier, tail = split_streaming(load_config(args.transform))
+    
+    for table, _, plan in plan_tables(args, config):
+        print(f"Table '{table}':")
+        print(plan.explain() if plan else "No transformations (no --transform config given).")
+        if barrier and barrier['type'] == 'aggregate':
+            print(f"Then over all chunks: aggregate group_by={barrier['group_by']!r}, "
+                  f"aggregations={barrier.get('aggregations', {})!r} from per-chunk partial results, "
+                  f"spilling to disk past {args.spill_groups} groups")
+        elif barrier:
+            print(f"Then over all chunks: sort columns={barrier['columns']!r}, "
+                  f"ascending={barrier.get('ascending', True)!r} as an external merge sort "
+                  f"of runs of up to {args.sort_memory} bytes")
+        if tail:
+            rows = 'aggregated' if barrier['type'] == 'aggregate' else 'sorted'
+            print(f"Then on the {rows} rows: {', '.join(t.get('type', '') for t in tail['transformations'])}")
+
+def compact_chunks(chunks, report=None):
+    """Pass chunks through in compact dtypes, measuring them into `report` when given."""
+    for chunk in chunks:
+        with metrics.stage('compact', len(chunk)):
+            compacted = compact_frame(chunk)
+        if report is not None:
+            report.add(chunk, compacted)
+        yield compacted
+
+def check_output_format(args, dialect):
+    """Make sure the dialect can write the output format asked for."""
+    if args.output_format != 'insert' and args.output_format not in dialect.bulk_load_formats:
+        raise OutputFormatNotSupported(args.output_format, args.dialect, dialect.bulk_load_formats)
+
+def resolve_dialect(args):
+    """Get the dialect asked for, defaulting to the dialect of the target database."""
+    if args.target and args.dialect == 'generic':
+        return get_dialect(get_target(args.target).dialect)
+    return get_dialect(args.dialect)
+
+def table_statements(args, dialect, table, chunks, total_rows, delta=None, output=None):
+    """
+    Lazily generate the statements loading the rows of a table in the chosen
+    output format, into the SQL file at `output` (default: --output).
+    """
+    chunks = count_generated(chunks)
+    if delta is not None:
+        return iter_delta(chunks, table, dialect, delta, args.key, batch_size=args.batch_size,
+                          deletes=args.delta_deletes, total_rows=total_rows, **batch_options(args))
+    if args.output_format in ('copy', 'copy-csv'):
+        return iter_copy(chunks, table, dialect, csv=args.output_format == 'copy-csv', total_rows=total_rows)
+    if args.output_format == 'load-data':
+        return iter_load_data(chunks, table, dialect, data_file_path(output or args.output, table),
+                              total_rows=total_rows)
+    if args.workers > 1:
+        return iter_sql_parallel(chunks, table, dialect, batch_size=args.batch_size,
+                                 workers=args.workers, total_rows=total_rows, **batch_options(args))
+    return iter_sql(chunks, table, dialect, batch_size=args.batch_size, total_rows=total_rows, **batch_options(args))
+
+def write_tables(args, dialect, tables):
+    """
+    Write the rows of each (table, column types, chunks, total rows) to the
+    SQL output file, or load them into the target database.
+    
+    Returns:
+        int: Number of SQL statements written, or rows loaded
+    """
+    if args.target:
+        target = get_target(args.target)
+        with metrics.stage('load'):
+            loaded = target.load(tables, dialect, create_table=args.create_table,
+                                 commit_interval=args.commit_interval)
+        metrics.add('load', loaded)
+        return loaded
+    
+    if args.shard_rows or args.shard_bytes or args.shards:
+        return write_sharded(args, dialect, tables)
+    
+    # Rows already written by earlier --delta runs are left out
+    delta = DeltaState(args.delta_state or default_state_path(args.output)) if args.delta else None
+    try:
+        sql_statements = []
+        for table, column_types, chunks, total_rows in tables:
+            if args.create_table:
+                primary_key = resolve_key_columns(args.key, list(column_types)) if delta else None
+                sql_statements.append([dialect.create_table_statement(table, column_types, primary_key)])
+            sql_statements.append(table_statements(args, dialect, table, chunks, total_rows, delta))
+        count = write_output(chain.from_iterable(sql_statements), args.output,
+                             compression_level=args.compression_level, buffer_size=args.buffer_size,
+                             threads=args.compression_threads)
+        if delta is not None:
+            # Only a complete output moves the state on
+            delta.commit()
+            print(delta.describe())
+    finally:
+        if delta is not None:
+            delta.close()
+    return count
+
+def write_sharded(args, dialect, tables):
+    """
+    Write the rows of each table to numbered SQL files, the CREATE TABLE
+    statements to a preamble file, and a manifest of the files.
+    
+    Returns:
+        int: Number of SQL statements written
+    """
+    preamble = None
+    if args.create_table:
+        preamble = [dialect.create_table_statement(table, column_types) for table, column_types, _, _ in tables]
+    statements = lambda table, chunks, path: table_statements(args, dialect, table, chunks, None, output=path)
+    count = write_shards(tables, statements, args.output, shard_rows=args.shard_rows, shard_bytes=args.shard_bytes,
+                         shards=args.shards, shard_key=args.shard_key, preamble=preamble, spill_dir=args.spill_dir,
+                         compression_level=args.compression_level, buffer_size=args.buffer_size,
+                         threads=args.compression_threads)
+    print(f"Manifest of the SQL files written to {manifest_path(args.output)}")
+    return count
+
+def report(args, total_rows, count):
+    """Print the closing summary of a run."""
+    if args.target:
+        metrics.note(rows=count)
+        print(f"\nLoaded {count} rows into '{args.target}'.")
+    else:
+        metrics.note(rows=total_rows, statements=count)
+        print(f"\nProcessed {total_rows} rows into {count} SQL statements.")
+    print("Done!\nexiting...")
+
+def run_measured(args):
+    """
+    Run with every stage measured, printing the measurements with
+    `--profile`, writing them as JSON with `--metrics-file`, and the
+    cProfile stats with `--profile-dump`.
+    """
+    collector = metrics.Metrics(profile=bool(args.profile_dump), profile_stage=args.profile_stage)
+    metrics.activate(collector)
+    collector.start()
+    try:
+        run(args)
+    finally:
+        collector.stop()
+        metrics.activate(None)
+    
+    if args.profile:
+        print(f"\n{collector.describe()}")
+    if args.metrics_file:
+        report = collector.report()
+        report['input'] = args.input
+        report['output'] = args.output or args.target
+        with open(args.metrics_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Metrics written to {args.metrics_file}")
+    if args.profile_dump:
+        collector.profiler.dump_stats(args.profile_dump)
+        print(f"Profile written to {args.profile_dump}")
+
 def run(args):
+    """
+    Convert the input, or each file of a batch input.
+    
+    Returns:
+        tuple: (rows, SQL statements written or rows loaded)
+    """
+    if is_batch_input(args.input):
+        return run_batch(args)
+    if args.explain:
+        return explain(args)
+    check_output_format(args, resolve_dialect(args))
+    if args.engine == 'pyarrow' and not arrow_available():
+        print("pyarrow is not installed, reading CSV input with the C parser instead")
+    if streaming(args):
+        return run_stream(args)
+    
     # Load and transform data
-    data, column_types = load_file(args.input, format=args.format)
-    print(f"Loaded {len(data)} rows from '{args.input}' with columns: {list(data.columns)}")
+    tables = plan_tables(args)
+    imported, cache = schema_sources(args)
+    schemas = [find_schema(args, table, options, imported, cache) for table, options, _ in tables]
+    if len(tables) > 1:
+        # Several sheets are parsed in parallel, one table each
+        sheets = [options['sheets'][0] for _, options, _ in tables]
+        excluded = [options.get('exclude_columns') for _, options, _ in tables]
+        loaded = [(table, data, column_types, plan) for (table, _, plan), (_, data, column_types)
+                  in zip(tables, load_sheets(args.input, sheets, workers=args.workers,
+                                             schemas=[schema for schema, _ in schemas],
+                                             exclude_columns=excluded))]
+    else:
+        table, options, plan = tables[0]
+        data, column_types = load_file(args.input, format=args.format, workers=args.workers,
+                                       schema=schemas[0][0], engine=args.engine, **options)
+        loaded = [(table, data, column_types, plan)]
+    
+    exported = {}
+    for i, ((table, data, column_types, plan), (schema, key)) in enumerate(zip(loaded, schemas)):
+        if shared_schema(args, schema, key):
+            column_types = widen_text_types(column_types, data)
+            loaded[i] = (table, data, column_types, plan)
+        if schema:
+            print(f"Using the known schema of table '{table}'")
+        elif key:
+            cache.put(key, (data.dtypes.to_dict(), column_types, len(data)))
+        exported[table] = (data.dtypes.to_dict(), column_types, None)
+    if args.export_schema:
+        export_schemas(args.export_schema, exported)
+    
+    # Get the dialect
+    dialect = resolve_dialect(args)
+    
+    # Generate SQL
+    outputs = []
+    total_rows = 0
+    memory = MemoryReport() if args.memory_report else None
+    while loaded:
+        # Taken off the list so that only the compact rows stay in memory
+        table, data, column_types, plan = loaded.pop(0)
+        print(f"Loaded {len(data)} rows for table '{table}' from '{args.input}' with columns: {list(data.columns)}")
+        
+        if plan:
+            from brokolisql.transformers.plan import execute_plan
+            data = execute_plan(plan, data)
+        if args.compact or memory:
+            data = next(compact_chunks([data], memory))
+        
+        outputs.append((table, column_types, [data], len(data)))
+        total_rows += len(data)
+    if memory:
+        print(memory.describe())
+    
+    # Write output
+    count = write_tables(args, dialect, outputs)
+    report(args, total_rows, count)
+    return total_rows, count
 
+def run_stream(args):
+    config = barrier = tail = None
     if args.transform:
-        from brokolisql.transformers.transform_engine import apply_transformations
-        data = apply_transformations(data, args.transform)
+        from brokolisql.transformers.transform_engine import load_config
+        from brokolisql.transformers.streaming import split_streaming
+        # Row-local steps run chunk by chunk, an aggregate or sort across all of them
+        config, barrier, tail = split_streaming(load_config(args.transform))
     
     # Get the dialect
-    dialect = get_dialect(args.dialect)
+    dialect = resolve_dialect(args)
     
-    # Generate SQL
-    sql_statements = []
-    if args.create_table:
-        sql_statements.append(dialect.create_table_statement(args.table, column_types))
+    imported, cache = schema_sources(args)
     
-    sql_statements.extend(generate_sql(data, args.table, dialect, batch_size=args.batch_size))
+    outputs = []
+    total_rows = 0
+    row_counts = []
+    exported = {}
+    memory = MemoryReport() if args.memory_report else None
+    for table, options, plan in plan_tables(args, config):
+        chunk_size = args.chunk_size or estimate_chunk_size(args.input, args.format, args.max_memory, **options)
+        
+        schema, key = find_schema(args, table, options, imported, cache)
+        if schema:
+            # A known schema saves the first pass altogether
+            dtypes, column_types, rows = schema
+            if shared_schema(args, schema, key):
+                # The lengths of this file's text are not known before its rows are read
+                column_types = widen_text_types(column_types)
+            print(f"Using the known schema of table '{table}'")
+        else:
+            # A first pass settles dtypes and column types across all chunks
+            dtypes, column_types, rows = scan_file_schema(args.input, args.format, chunk_size, engine=args.engine,
+                                                          **options)
+            if key:
+                cache.put(key, (dtypes, column_types, rows))
+        exported[table] = (dtypes, column_types, None)
+        described = 'rows' if rows is None else f"{rows} rows"
+        print(f"Streaming {described} for table '{table}' from '{args.input}' in chunks of {chunk_size} rows with columns: {list(column_types)}")
+        
+        chunks = iter_file_chunks(args.input, args.format, chunk_size, dtypes=dtypes, engine=args.engine, **options)
+        if plan:
+            from brokolisql.transformers.streaming import stream_transformations
+            chunks = stream_transformations(chunks, plan, barrier, tail, spill_groups=args.spill_groups,
+                                            spill_dir=args.spill_dir, sort_memory=args.sort_memory)
+        # Transformations may filter or group rows, so only the file's own count is known up front
+        output_rows = None if config else rows
+        if output_rows is None:
+            counter = [0]
+            row_counts.append(counter)
+            chunks = count_rows(chunks, counter)
+        if args.compact or memory:
+            chunks = compact_chunks(chunks, memory)
+        
+        # Chunks are read lazily, as their SQL is written or their rows loaded
+        outputs.append((table, column_types, chunks, output_rows))
+        total_rows += output_rows or 0
     
-    # Write output
-    write_output(sql_statements, args.output)
+    if args.export_schema:
+        export_schemas(args.export_schema, exported)
+    
+    count = write_tables(args, dialect, outputs)
+    if memory:
+        print(memory.describe())
+    # Rows of tables whose length was not known up front are counted as they go
+    total_rows += sum(counter[0] for counter in row_counts)
+    report(args, total_rows, count)
+    return total_rows, count
 
-    print(f"\nProcessed {len(data)} rows into {len(sql_statements)} SQL statements.")
-    print("Done!\nexiting...")
+def batch_jobs(args):
+    """
+    List the files of a batch input, each with the arguments it is
+    converted with: its own --input, and --table and --output rendered
+    from their templates, if any.
+    
+    Raises:
+        InputNotMatched: If the input holds no files
+        OutputConflict: If two files would be written to the same output
+    """
+    jobs = []
+    outputs = {}
+    for index, path in enumerate(expand_input(args.input, args.format), 1):
+        fields = template_fields(path, index)
+        job = argparse.Namespace(**vars(args))
+        job.input = path
+        job.workers = 1
+        if is_template(args.table):
+            job.table = render_table_name(args.table, fields)
+        if is_template(args.output):
+            job.output = args.output.format(**fields)
+            outputs.setdefault(job.output, []).append(path)
+        jobs.append(job)
+    for output, paths in outputs.items():
+        if len(paths) > 1:
+            raise OutputConflict(output, paths)
+    return jobs
+
+def scan_input(args):
+    """
+    Collect the column stats of one file of a batch, in a worker process.
+    
+    Returns:
+        tuple: (column stats, rows), or (None, error message) if the file failed
+    """
+    try:
+        options = reader_options(args)
+        chunk_size = args.chunk_size or estimate_chunk_size(args.input, args.format, args.max_memory, **options)
+        return scan_file_stats(args.input, args.format, chunk_size, engine=args.engine, **options)
+    except Exception as e:
+        return None, describe_error(e)
+
+def convert_input(args):
+    """
+    Convert one file of a batch, in a worker process, quietly.
+    
+    Returns:
+        tuple: (rows, statements), or (None, error message) if the file failed
+    """
+    metrics.activate(None)
+    set_progress(None)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run(args)
+    except Exception as e:
+        return None, describe_error(e)
+
+def describe_error(e):
+    """Describe an error of one file of a batch, as `main` would."""
+    if isinstance(e, BrokoliSQLException):
+        return str(e)
+    return f"Unexpected error: {e}"
+
+def merge_schemas(jobs, results, spill_path):
+    """
+    Merge the column stats of the files of a batch into one schema, and
+    have each file read with the part of it for its own columns.
+    
+    Returns:
+        tuple: (dtypes, column types) of all the files
+    """
+    merged = {}
+    for job, (stats, _) in zip(jobs, results):
+        if stats is not None:
+            excel = resolve_format(job.input, job.format) == 'excel'
+            merged = merge_column_stats(merged, stats, numeric_bools=excel)
+    dtypes = {col: column.dtype for col, column in merged.items()}
+    column_types = column_types_from_stats(merged)
+    
+    for index, (job, (stats, rows)) in enumerate(zip(jobs, results)):
+        if stats is not None:
+            # A file is read with the merged dtypes of its own columns, but
+            # its CREATE TABLE has the columns of all the files
+            schema = ({col: dtypes[col] for col in stats}, column_types, rows)
+            job.import_schema = os.path.join(spill_path, f"schema-{index}.json")
+            job.schema_cache = False
+            export_schemas(job.import_schema, {job.table: schema})
+    return dtypes, column_types
+
+def run_pool(executor, function, jobs, desc):
+    """
+    Run a function over the jobs in the pool, printing the error of each
+    job that fails as it comes.
+    
+    Returns:
+        list: The result of each job, in order
+    """
+    futures = {executor.submit(function, job): index for index, job in enumerate(jobs)}
+    results = [None] * len(jobs)
+    with progress_bar(len(jobs), desc, unit='files') as bar:
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            if results[index][0] is None:
+                print(f"\nFailed to convert '{jobs[index].input}': {results[index][1]}")
+            bar.update(1)
+    return results
+
+def run_batch(args):
+    """
+    Convert each file of a directory or glob pattern, in a pool of --workers
+    processes.
+    
+    Without a --table template the files are appended into one table, whose
+    schema merges the types inferred from every file; its CREATE TABLE
+    comes first in the combined output, or in the output of the first file.
+    With a --table template each file gets its own table. Without an
+    --output template the outputs of the files are joined in input order
+    into one file, compressed files included.
+    
+    A file that fails is reported and left out, and the others are still
+    converted; `BatchFailed` is raised at the end.
+    
+    Returns:
+        tuple: (rows, SQL statements written)
+    """
+    jobs = batch_jobs(args)
+    if args.explain:
+        return explain(jobs[0])
+    one_table = not is_template(args.table)
+    combined = not is_template(args.output)
+    workers = max(args.workers, 1)
+    print(f"Converting {len(jobs)} files from '{args.input}' with {workers} worker{'s' if workers > 1 else ''}")
+    
+    spill_path = tempfile.mkdtemp(prefix='brokolisql-batch-', dir=args.spill_dir)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            failed = 0
+            column_types = None
+            if one_table and not args.import_schema:
+                results = run_pool(executor, scan_input, jobs, "Scanning files")
+                scanned = [job for job, (stats, _) in zip(jobs, results) if stats is not None]
+                failed = len(jobs) - len(scanned)
+                dtypes, column_types = merge_schemas(jobs, results, spill_path)
+                if args.export_schema:
+                    export_schemas(args.export_schema, {args.table: (dtypes, column_types, None)})
+                jobs = scanned
+            elif one_table:
+                schema, _ = find_schema(args, args.table, reader_options(args), import_schemas(args.import_schema),
+                                        None)
+                column_types = schema[1]
+            
+            _, ext = os.path.splitext(args.output)
+            if ext.lower() in ('.gz', '.zst'):
+                ext = os.path.splitext(os.path.splitext(args.output)[0])[1] + ext
+            for index, job in enumerate(jobs):
+                job.export_schema = None
+                if combined:
+                    job.output = os.path.join(spill_path, f"part-{index + 1}{ext}")
+                elif os.path.dirname(job.output):
+                    os.makedirs(os.path.dirname(job.output), exist_ok=True)
+                if one_table and (combined or index):
+                    # The table is created once, ahead of all the rows
+                    job.create_table = False
+            
+            results = run_pool(executor, convert_input, jobs, "Converting files")
+    
+        converted = [(job, result) for job, result in zip(jobs, results) if result[0] is not None]
+        failed += len(jobs) - len(converted)
+        total_rows = sum(rows for _, (rows, _) in converted)
+        count = sum(statements for _, (_, statements) in converted)
+        if combined:
+            parts = [job.output for job, _ in converted]
+            if one_table and args.create_table and column_types is not None:
+                header = os.path.join(spill_path, f"part-0{ext}")
+                count += write_output([resolve_dialect(args).create_table_statement(args.table, column_types)],
+                                      header, compression_level=args.compression_level)
+                parts.insert(0, header)
+            with open(args.output, 'wb') as out, metrics.stage('combine'):
+                for part in parts:
+                    with open(part, 'rb') as f:
+                        shutil.copyfileobj(f, out, DEFAULT_BUFFER_SIZE)
+    finally:
+        shutil.rmtree(spill_path, ignore_errors=True)
+    
+    print(f"Converted {len(converted)} of {len(converted) + failed} files")
+    report(args, total_rows, count)
+    if failed:
+        raise BatchFailed(failed, len(converted) + failed)
+    return total_rows, count
+
+def count_rows(chunks, counter):
+    """Pass chunks through, counting their rows into `counter[0]`."""
+    for chunk in chunks:
+        counter[0] += len(chunk)
+        yield chunk
+
+def count_generated(chunks):
+    """
+    Pass chunks through, adding their rows to the 'generate' stage, whose
+    time `write_output` measures as it pulls the statements made from them.
+    """
+    for chunk in chunks:
+        metrics.add('generate', len(chunk))
+        yield chunk
 
 if __name__ == '__main__':
     main()
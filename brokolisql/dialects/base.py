@@ -1,9 +1,27 @@
+import numpy as np
 import pandas as pd
+from pandas.api import types as ptypes
 from datetime import datetime, date
 
 class SQLDialect:
     """Base class for SQL dialects"""
     
+    # Appended to single-row INSERT statements
+    statement_terminator = ';'
+    
+    # Native bulk-load output formats besides INSERT statements
+    bulk_load_formats = ()
+    
+    # Limits a multi-row INSERT is closed at: rows in its VALUES list, bytes
+    # of its text, and bind parameters when it is parameterized (None for
+    # no limit). The defaults stay well within what the database accepts.
+    max_batch_rows = None
+    max_statement_bytes = 16 * 1024 * 1024
+    max_bind_parameters = None
+    
+    # DB-API paramstyle of the usual driver, for parameterized statements
+    paramstyle = 'qmark'
+    
     def format_column_name(self, name):
         """Format a column name according to the dialect's syntax"""
         return f'"{name}"'
@@ -22,17 +40,279 @@ class SQLDialect:
         else:
             return str(val)
     
+    def format_column(self, series):
+        """
+        Format a whole column of values according to the dialect's syntax.
+    
+        The rendering is chosen once from the column dtype and applied with
+        vectorized pandas/NumPy operations. The result is identical to calling
+        `format_value` on every element; columns whose dtype has no
+        vectorized rendering fall back to exactly that.
+    
+        Args:
+            series (Series): The column to format
+    
+        Returns:
+            Series: SQL literals as strings, aligned with `series`
+        """
+        dtype = series.dtype
+    
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Each distinct value is formatted once; code -1 (null) picks the extra last entry
+            categories = self.format_column(pd.Series(dtype.categories)).to_numpy(dtype=object)
+            literals = np.append(categories, 'NULL')[series.cat.codes.to_numpy()]
+        elif ptypes.is_bool_dtype(dtype):
+            values = series.to_numpy(dtype=bool, na_value=False)
+            literals = self.format_bool_column(values)
+        elif ptypes.is_integer_dtype(dtype):
+            literals = series.astype(str).to_numpy(dtype=object)
+        elif ptypes.is_float_dtype(dtype) and dtype.itemsize == 8:
+            literals = series.to_numpy(dtype=np.float64, na_value=np.nan).astype(str).astype(object)
+        elif isinstance(dtype, np.dtype) and dtype.kind == 'M':
+            literals = self.format_datetime_column(series).to_numpy(dtype=object)
+        elif isinstance(dtype, pd.StringDtype) or (
+            ptypes.is_object_dtype(dtype) and ptypes.infer_dtype(series, skipna=True) in ('string', 'empty')
+        ):
+            literals = self.format_string_column(series).to_numpy(dtype=object)
+        else:
+            literals = np.array([self.format_value(val) for val in series], dtype=object)
+            return pd.Series(literals, index=series.index, dtype=object)
+    
+        mask = series.isna().to_numpy()
+        if mask.any():
+            literals[mask] = 'NULL'
+        return pd.Series(literals, index=series.index, dtype=object)
+    
+    def format_string_column(self, series):
+        """Quote and escape a column of strings (nulls are masked afterwards)"""
+        return "'" + series.str.replace("'", "''", regex=False) + "'"
+    
+    def format_datetime_column(self, series):
+        """Format a datetime64 column (nulls are masked afterwards)"""
+        return "'" + self.format_datetime_text(series) + "'"
+    
+    def format_datetime_text(self, series):
+        """Write a datetime64 column as unquoted text"""
+        # str(Timestamp) only shows the fractional part when there is one
+        text = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+        fractional = (series.dt.microsecond != 0) | (series.dt.nanosecond != 0)
+        if fractional.any():
+            text = text.mask(fractional, series[fractional].map(str))
+        return text
+    
+    def format_bool_column(self, values):
+        """Format a boolean NumPy array"""
+        return np.where(values, 'TRUE', 'FALSE').astype(object)
+    
+    def format_text_value(self, val):
+        """Format a value as unquoted text for bulk-load data, None for nulls"""
+        if pd.isna(val):
+            return None
+        elif isinstance(val, str):
+            return val
+        elif isinstance(val, bool):
+            return self.format_bool_column(np.array([val]))[0]
+        else:
+            return str(val)
+    
+    def format_text_column(self, series):
+        """
+        Format a whole column as unquoted text for bulk-load data files,
+        the way its values read back into the column's SQL type.
+        
+        Unlike `format_column`, values are not quoted or escaped, and nulls
+        are None, so that each bulk-load format can apply its own escaping.
+        
+        Args:
+            series (Series): The column to format
+        
+        Returns:
+            ndarray: Object array of strings, or None for nulls
+        """
+        dtype = series.dtype
+        
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = self.format_text_column(pd.Series(dtype.categories))
+            text = np.append(categories, None)[series.cat.codes.to_numpy()]
+        elif ptypes.is_bool_dtype(dtype):
+            text = self.format_bool_column(series.to_numpy(dtype=bool, na_value=False))
+        elif ptypes.is_integer_dtype(dtype):
+            text = series.astype(str).to_numpy(dtype=object)
+        elif ptypes.is_float_dtype(dtype) and dtype.itemsize == 8:
+            text = series.to_numpy(dtype=np.float64, na_value=np.nan).astype(str).astype(object)
+        elif isinstance(dtype, np.dtype) and dtype.kind == 'M':
+            text = self.format_datetime_text(series).to_numpy(dtype=object)
+        elif isinstance(dtype, pd.StringDtype) or (
+            ptypes.is_object_dtype(dtype) and ptypes.infer_dtype(series, skipna=True) in ('string', 'empty')
+        ):
+            text = series.to_numpy(dtype=object, copy=True)
+        else:
+            return np.array([self.format_text_value(val) for val in series], dtype=object)
+        
+        mask = series.isna().to_numpy()
+        if mask.any():
+            text[mask] = None
+        return text
+    
+    def placeholders(self, count, paramstyle=None, start=0):
+        """
+        Parameter markers for `count` values, such as `?, ?` or `:3, :4`.
+        
+        Args:
+            count (int): Number of values
+            paramstyle (str): DB-API paramstyle of the driver, or None for
+                the dialect's
+            start (int): Values bound before these, for numbered markers
+        
+        Returns:
+            str: The comma-separated markers
+        
+        Raises:
+            ValueError: If the paramstyle has no positional markers
+        """
+        paramstyle = paramstyle or self.paramstyle
+        if paramstyle == 'qmark':
+            return ', '.join(['?'] * count)
+        elif paramstyle in ('format', 'pyformat'):
+            return ', '.join(['%s'] * count)
+        elif paramstyle == 'numeric':
+            return ', '.join([f":{i + 1}" for i in range(start, start + count)])
+        else:
+            raise ValueError(f"Unsupported DB-API paramstyle: {paramstyle}")
+    
+    def parameter_column(self, series):
+        """
+        Convert a whole column into Python values a driver can bind, None
+        for nulls, instead of SQL literals.
+        
+        Numbers, booleans and strings are converted in bulk into the
+        matching Python objects. Datetimes are passed as text, written the
+        way the dialect writes them in SQL.
+        
+        Args:
+            series (Series): The column to convert
+        
+        Returns:
+            list: One value per row
+        """
+        dtype = series.dtype
+        
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Each distinct value is converted once; code -1 (null) picks the extra last entry
+            categories = np.array(self.parameter_column(pd.Series(dtype.categories)) + [None], dtype=object)
+            return categories[series.cat.codes.to_numpy()].tolist()
+        elif isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+            # tolist() turns NumPy scalars into the matching Python types
+            values = series.to_numpy().tolist()
+        elif isinstance(dtype, np.dtype) and dtype.kind == 'M':
+            values = self.format_datetime_text(series).tolist()
+        elif ptypes.is_bool_dtype(dtype) or ptypes.is_numeric_dtype(dtype) or isinstance(dtype, pd.StringDtype):
+            # Nullable and Arrow-backed columns give Python objects and None
+            return series.to_numpy(dtype=object, na_value=None).tolist()
+        elif ptypes.infer_dtype(series, skipna=True) in ('string', 'empty'):
+            # Columns of strings are bound as they are
+            values = series.to_numpy(dtype=object).tolist()
+        else:
+            values = [self.parameter_value(val) for val in series.to_numpy(dtype=object)]
+        
+        mask = series.isna().to_numpy()
+        if mask.any():
+            for i in np.flatnonzero(mask).tolist():
+                values[i] = None
+        return values
+    
+    def parameter_value(self, val):
+        """Convert a single value of an object column for binding"""
+        if isinstance(val, (str, bool, int, float)) or val is None:
+            return val
+        elif isinstance(val, np.generic):
+            return val.item()
+        return self.format_text_value(val)
+    
     def create_insert_statement(self, table_name, columns, values):
         """Create an INSERT statement"""
         cols = ', '.join([self.format_column_name(col) for col in columns])
         vals = ', '.join([self.format_value(val) for val in values])
-        return f"INSERT INTO {table_name} ({cols}) VALUES ({vals});"
+        return f"INSERT INTO {table_name} ({cols}) VALUES ({vals}){self.statement_terminator}"
+    
+    def create_upsert_statement(self, table_name, columns, key_columns, rows):
+        """
+        Create a statement inserting rows, and updating instead those whose
+        key is already in the table: a standard SQL MERGE.
+        
+        Args:
+            table_name (str): Name of the table
+            columns (list): Names of the columns
+            key_columns (list): Names of the columns identifying a row
+            rows (list): Tuples of SQL literals, one per column
+        
+        Returns:
+            str: The statement
+        """
+        cols = [self.format_column_name(col) for col in columns]
+        keys = [self.format_column_name(col) for col in key_columns]
+        values = ',\n    '.join(f"({', '.join(row)})" for row in rows)
+        lines = [
+            f"MERGE INTO {table_name} AS target",
+            f"USING (VALUES\n    {values}\n) AS source ({', '.join(cols)})",
+            "ON " + ' AND '.join(f"target.{key} = source.{key}" for key in keys),
+        ]
+        return '\n'.join(lines + self.merge_actions(cols, keys)) + self.statement_terminator
+    
+    def merge_actions(self, cols, keys):
+        """WHEN clauses of a MERGE from `source` into `target`, given formatted column names"""
+        updates = [col for col in cols if col not in keys]
+        actions = []
+        if updates:
+            actions.append("WHEN MATCHED THEN UPDATE SET " + ', '.join(f"{col} = source.{col}" for col in updates))
+        actions.append(f"WHEN NOT MATCHED THEN INSERT ({', '.join(cols)}) "
+                       f"VALUES ({', '.join('source.' + col for col in cols)})")
+        return actions
+    
+    def create_on_conflict_statement(self, table_name, columns, key_columns, rows):
+        """Create an INSERT ... ON CONFLICT DO UPDATE upsert, as PostgreSQL and SQLite write them"""
+        cols = [self.format_column_name(col) for col in columns]
+        keys = [self.format_column_name(col) for col in key_columns]
+        values = ',\n  '.join(f"({', '.join(row)})" for row in rows)
+        updates = [col for col in cols if col not in keys]
+        if updates:
+            action = "DO UPDATE SET " + ', '.join(f"{col} = EXCLUDED.{col}" for col in updates)
+        else:
+            action = "DO NOTHING"
+        return (f"INSERT INTO {table_name} ({', '.join(cols)}) VALUES\n  {values}\n"
+                f"ON CONFLICT ({', '.join(keys)}) {action}{self.statement_terminator}")
+    
+    def create_delete_statement(self, table_name, key_columns, keys):
+        """
+        Create a DELETE statement removing the rows with the given keys.
+        
+        Args:
+            table_name (str): Name of the table
+            key_columns (list): Names of the columns identifying a row
+            keys (list): Tuples of SQL literals, one per key column
+        
+        Returns:
+            str: The statement
+        """
+        names = [self.format_column_name(col) for col in key_columns]
+        if len(names) == 1:
+            condition = f"{names[0]} IN ({', '.join(key[0] for key in keys)})"
+        else:
+            condition = '\n   OR '.join(
+                '(' + ' AND '.join(f"{name} = {value}" for name, value in zip(names, key)) + ')' for key in keys)
+        return f"DELETE FROM {table_name} WHERE {condition}{self.statement_terminator}"
+    
+    def primary_key_clause(self, primary_key):
+        """Column definition line declaring the primary key"""
+        return f"    PRIMARY KEY ({', '.join(self.format_column_name(col) for col in primary_key)})"
     
-    def create_table_statement(self, table_name, column_types):
-        """Create a CREATE TABLE statement"""
+    def create_table_statement(self, table_name, column_types, primary_key=None):
+        """Create a CREATE TABLE statement, with a primary key on the `primary_key` columns when given"""
         columns_sql = []
         for col, sql_type in column_types.items():
             columns_sql.append(f"    {self.format_column_name(col)} {sql_type}")
+        if primary_key:
+            columns_sql.append(self.primary_key_clause(primary_key))
         
         columns_def = ',\n'.join(columns_sql)
         return f"CREATE TABLE {table_name} (\n{columns_def}\n);"
\ No newline at end of file
@@ -2,4 +2,8 @@ from brokolisql.dialects.base import SQLDialect
 
 class GenericDialect(SQLDialect):
     """Generic SQL dialect that should work with most databases"""
-    pass
\ No newline at end of file
+    
+    # The lowest limits among the supported databases, so statements run on any of them
+    max_batch_rows = 1000
+    max_statement_bytes = 4000000
+    max_bind_parameters = 999
@@ -1,10 +1,21 @@
 from brokolisql.dialects.base import SQLDialect
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
 
 class MySQLDialect(SQLDialect):
     """MySQL dialect implementation"""
     
+    bulk_load_formats = ('load-data',)
+    
+    # A statement must fit in one packet, and max_allowed_packet defaults
+    # to 4MB before MySQL 8.0
+    max_statement_bytes = 4000000
+    max_bind_parameters = 65535
+    
+    # mysqlclient and PyMySQL
+    paramstyle = 'format'
+    
     def format_column_name(self, name):
         """Format column name with MySQL backticks"""
         return f"`{name}`"
@@ -26,7 +37,45 @@ class MySQLDialect(SQLDialect):
         else:
             return str(val)
     
-    def create_table_statement(self, table_name, column_types):
+    def format_string_column(self, series):
+        """Quote and backslash-escape a column of strings for MySQL"""
+        escaped = (
+            series.str.replace('\\', '\\\\', regex=False)
+            .str.replace("'", "\\'", regex=False)
+            .str.replace('"', '\\"', regex=False)
+        )
+        return "'" + escaped + "'"
+    
+    def format_datetime_text(self, series):
+        """Write a datetime64 column as MySQL datetime text"""
+        return series.dt.strftime('%Y-%m-%d %H:%M:%S')
+    
+    def format_bool_column(self, values):
+        """Format a boolean array for MySQL"""
+        return np.where(values, '1', '0').astype(object)
+    
+    def create_load_data_statement(self, table_name, columns, data_path):
+        """Create a LOAD DATA statement for a tab-separated, backslash-escaped data file"""
+        cols = ', '.join([self.format_column_name(col) for col in columns])
+        return (
+            f"LOAD DATA LOCAL INFILE {self.format_value(data_path)} INTO TABLE {table_name} CHARACTER SET utf8mb4\n"
+            f"  FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'\n"
+            f"  LINES TERMINATED BY '\\n'\n"
+            f"  ({cols});"
+        )
+    
+    def create_upsert_statement(self, table_name, columns, key_columns, rows):
+        """Create an INSERT ... ON DUPLICATE KEY UPDATE statement"""
+        cols = [self.format_column_name(col) for col in columns]
+        keys = [self.format_column_name(col) for col in key_columns]
+        values = ',\n  '.join(f"({', '.join(row)})" for row in rows)
+        # Rows made only of key columns still need an assignment, a no-op one
+        updates = [col for col in cols if col not in keys] or keys[:1]
+        assignments = ', '.join(f"{col} = VALUES({col})" for col in updates)
+        return (f"INSERT INTO {table_name} ({', '.join(cols)}) VALUES\n  {values}\n"
+                f"ON DUPLICATE KEY UPDATE {assignments};")
+    
+    def create_table_statement(self, table_name, column_types, primary_key=None):
         """Create MySQL-specific CREATE TABLE statement"""
         columns_sql = []
         for col, sql_type in column_types.items():
@@ -41,6 +90,8 @@ class MySQLDialect(SQLDialect):
                 mysql_type = sql_type
                 
             columns_sql.append(f"    {self.format_column_name(col)} {mysql_type}")
+        if primary_key:
+            columns_sql.append(self.primary_key_clause(primary_key))
         
         columns_def = ',\n'.join(columns_sql)
         return f"CREATE TABLE IF NOT EXISTS {table_name} (\n{columns_def}\n) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;"
@@ -1,10 +1,20 @@
 from brokolisql.dialects.base import SQLDialect
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
 
 class OracleDialect(SQLDialect):
     """Oracle dialect implementation"""
     
+    # Oracle doesn't use the semicolon traditionally
+    statement_terminator = ''
+    
+    # Bind variables per statement
+    max_bind_parameters = 65535
+    
+    # python-oracledb and cx_Oracle
+    paramstyle = 'numeric'
+    
     def format_column_name(self, name):
         """Format column name with Oracle double quotes"""
         return f'"{name}"'
@@ -25,7 +35,29 @@ class OracleDialect(SQLDialect):
         else:
             return str(val)
     
-    def create_table_statement(self, table_name, column_types):
+    def format_datetime_column(self, series):
+        """Format a datetime64 column for Oracle"""
+        return "TO_TIMESTAMP('" + series.dt.strftime('%Y-%m-%d %H:%M:%S') + "', 'YYYY-MM-DD HH24:MI:SS')"
+    
+    def format_bool_column(self, values):
+        """Format a boolean array for Oracle"""
+        return np.where(values, '1', '0').astype(object)
+    
+    def create_upsert_statement(self, table_name, columns, key_columns, rows):
+        """Create a MERGE statement, its source rows selected from DUAL as Oracle has no VALUES lists"""
+        cols = [self.format_column_name(col) for col in columns]
+        keys = [self.format_column_name(col) for col in key_columns]
+        first = ', '.join(f"{value} AS {col}" for value, col in zip(rows[0], cols))
+        selects = [f"    SELECT {first} FROM DUAL"]
+        selects += [f"    UNION ALL SELECT {', '.join(row)} FROM DUAL" for row in rows[1:]]
+        lines = [
+            f"MERGE INTO {table_name} target",
+            "USING (\n" + '\n'.join(selects) + "\n) source",
+            "ON (" + ' AND '.join(f"target.{key} = source.{key}" for key in keys) + ")",
+        ]
+        return '\n'.join(lines + self.merge_actions(cols, keys)) + self.statement_terminator
+    
+    def create_table_statement(self, table_name, column_types, primary_key=None):
         """Create Oracle-specific CREATE TABLE statement"""
         columns_sql = []
         for col, sql_type in column_types.items():
@@ -53,13 +85,8 @@ class OracleDialect(SQLDialect):
                 oracle_type = sql_type
                 
             columns_sql.append(f"    {self.format_column_name(col)} {oracle_type}")
+        if primary_key:
+            columns_sql.append(self.primary_key_clause(primary_key))
         
         columns_def = ',\n'.join(columns_sql)
-        return f"CREATE TABLE {table_name} (\n{columns_def}\n);"
-    
-    def create_insert_statement(self, table_name, columns, values):
-        """Create Oracle INSERT statement"""
-        cols = ', '.join([self.format_column_name(col) for col in columns])
-        vals = ', '.join([self.format_value(val) for val in values])
-        # Oracle doesn't use the semicolon traditionally
-        return f"INSERT INTO {table_name} ({cols}) VALUES ({vals})"
\ No newline at end of file
+        return f"CREATE TABLE {table_name} (\n{columns_def}\n);"
\ No newline at end of file
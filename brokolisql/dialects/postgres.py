@@ -5,6 +5,14 @@ from datetime import datetime, date
 class PostgresDialect(SQLDialect):
     """PostgreSQL dialect implementation"""
     
+    bulk_load_formats = ('copy', 'copy-csv')
+    
+    # The wire protocol counts bind parameters in 16 bits
+    max_bind_parameters = 65535
+    
+    # psycopg
+    paramstyle = 'format'
+    
     def format_column_name(self, name):
         """Format column name with PostgreSQL double quotes"""
         return f'"{name}"'
@@ -26,7 +34,21 @@ class PostgresDialect(SQLDialect):
         else:
             return str(val)
     
-    def create_table_statement(self, table_name, column_types):
+    def format_datetime_text(self, series):
+        """Write a datetime64 column as PostgreSQL datetime text"""
+        return series.dt.strftime('%Y-%m-%d %H:%M:%S')
+    
+    def create_copy_statement(self, table_name, columns, csv=False):
+        """Create a COPY statement reading rows in text or CSV format from STDIN"""
+        cols = ', '.join([self.format_column_name(col) for col in columns])
+        options = ' WITH (FORMAT csv)' if csv else ''
+        return f"COPY {table_name} ({cols}) FROM STDIN{options};"
+    
+    def create_upsert_statement(self, table_name, columns, key_columns, rows):
+        """Create an INSERT ... ON CONFLICT DO UPDATE statement"""
+        return self.create_on_conflict_statement(table_name, columns, key_columns, rows)
+    
+    def create_table_statement(self, table_name, column_types, primary_key=None):
         """Create PostgreSQL-specific CREATE TABLE statement"""
         columns_sql = []
         for col, sql_type in column_types.items():
@@ -53,6 +75,8 @@ class PostgresDialect(SQLDialect):
                 pg_type = sql_type
                 
             columns_sql.append(f"    {self.format_column_name(col)} {pg_type}")
+        if primary_key:
+            columns_sql.append(self.primary_key_clause(primary_key))
         
         columns_def = ',\n'.join(columns_sql)
         return f"CREATE TABLE IF NOT EXISTS {table_name} (\n{columns_def}\n);"
\ No newline at end of file
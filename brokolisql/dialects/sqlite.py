@@ -1,10 +1,14 @@
 from brokolisql.dialects.base import SQLDialect
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
 
 class SQLiteDialect(SQLDialect):
     """SQLite dialect implementation"""
     
+    # SQLITE_MAX_VARIABLE_NUMBER before SQLite 3.32; later versions take 32766
+    max_bind_parameters = 999
+    
     def format_column_name(self, name):
         """Format column name with SQLite double quotes"""
         return f'"{name}"'
@@ -23,7 +27,15 @@ class SQLiteDialect(SQLDialect):
         else:
             return str(val)
     
-    def create_table_statement(self, table_name, column_types):
+    def format_bool_column(self, values):
+        """Format a boolean array for SQLite"""
+        return np.where(values, '1', '0').astype(object)
+    
+    def create_upsert_statement(self, table_name, columns, key_columns, rows):
+        """Create an INSERT ... ON CONFLICT DO UPDATE statement"""
+        return self.create_on_conflict_statement(table_name, columns, key_columns, rows)
+    
+    def create_table_statement(self, table_name, column_types, primary_key=None):
         """Create SQLite-specific CREATE TABLE statement"""
         columns_sql = []
         for col, sql_type in column_types.items():
@@ -42,6 +54,8 @@ class SQLiteDialect(SQLDialect):
                 sqlite_type = 'TEXT'  # Default to TEXT for unknown types
                 
             columns_sql.append(f"    {self.format_column_name(col)} {sqlite_type}")
+        if primary_key:
+            columns_sql.append(self.primary_key_clause(primary_key))
         
         columns_def = ',\n'.join(columns_sql)
         return f"CREATE TABLE IF NOT EXISTS {table_name} (\n{columns_def}\n);"
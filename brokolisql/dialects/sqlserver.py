@@ -1,10 +1,18 @@
 from brokolisql.dialects.base import SQLDialect
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
 
 class SQLServerDialect(SQLDialect):
     """SQL Server dialect implementation"""
     
+    # A VALUES list takes at most 1000 rows, and a request 2100 parameters
+    max_batch_rows = 1000
+    max_bind_parameters = 2100
+    
+    # pyodbc
+    paramstyle = 'qmark'
+    
     def format_column_name(self, name):
         """Format column name with SQL Server brackets"""
         return f"[{name}]"
@@ -25,7 +33,15 @@ class SQLServerDialect(SQLDialect):
         else:
             return str(val)
     
-    def create_table_statement(self, table_name, column_types):
+    def format_datetime_column(self, series):
+        """Format a datetime64 column for SQL Server"""
+        return "'" + series.dt.strftime('%Y-%m-%d %H:%M:%S') + "'"
+    
+    def format_bool_column(self, values):
+        """Format a boolean array for SQL Server"""
+        return np.where(values, '1', '0').astype(object)
+    
+    def create_table_statement(self, table_name, column_types, primary_key=None):
         """Create SQL Server-specific CREATE TABLE statement"""
         columns_sql = []
         for col, sql_type in column_types.items():
@@ -55,6 +71,8 @@ class SQLServerDialect(SQLDialect):
                 mssql_type = sql_type
                 
             columns_sql.append(f"    {self.format_column_name(col)} {mssql_type}")
+        if primary_key:
+            columns_sql.append(self.primary_key_clause(primary_key))
         
         columns_def = ',\n'.join(columns_sql)
         return f"CREATE TABLE {table_name} (\n{columns_def}\n);"
\ No newline at end of file
@@ -1,7 +1,20 @@
 from .base import (
+    BatchFailed,
     BrokoliSQLException,
     FileFormatNotSupported,
     FileLoadError,
     FileParsingError,
     FileNotFound,
+    InputNotMatched,
+    InvalidExpression,
+    KeyColumnNotFound,
+    OptionalDependencyMissing,
+    OutputConflict,
+    OutputFormatNotSupported,
+    SchemaMismatch,
+    SchemaNotFound,
+    SheetNotFound,
+    TargetLoadError,
+    TargetNotSupported,
+    TransformNotStreamable,
 )
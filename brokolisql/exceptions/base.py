@@ -1,11 +1,11 @@
 class BrokoliSQLException(Exception):
     """Base exception for BrokoliSQL errors."""
-
+    
     def __init__(self, message, hint=None):
         super().__init__(message)
         self.message = message
         self.hint = hint
-
+    
     def __str__(self):
         return f"{self.message}" + (f"\n\n Hint: {self.hint}" if self.hint else "")
 
@@ -14,7 +14,7 @@ class BrokoliSQLException(Exception):
 class FileFormatNotSupported(BrokoliSQLException):
     def __init__(self, ext):
         message = f"The file extension '{ext}' is not supported."
-        hint = "Try using CSV, Excel (.xls/.xlsx), JSON, XML, or HTML — or specify the format manually with `--format`."
+        hint = "Try using CSV, Excel (.xls/.xlsx), JSON, XML, HTML, Parquet, Feather or Arrow IPC — or specify the format manually with `--format`."
         super().__init__(message, hint)
 
 
@@ -37,3 +37,103 @@ class FileLoadError(BrokoliSQLException):
         message = f"An error occurred while trying to load '{filepath}'."
         hint = f"This might be a permission issue or an unexpected file encoding. Details: {original_exception}"
         super().__init__(message, hint)
+
+
+class TransformNotStreamable(BrokoliSQLException):
+    def __init__(self, transform_types):
+        message = f"The transformation(s) {', '.join(transform_types)} cannot run in streaming mode."
+        hint = "Streaming applies row-local transformations one chunk at a time, an `aggregate` step with sum, count, min, max or mean across chunks, and a `sort` step as an external merge sort. Remove these steps or run without `--stream`/`--chunk-size`/`--max-memory`."
+        super().__init__(message, hint)
+
+
+class OptionalDependencyMissing(BrokoliSQLException):
+    def __init__(self, package, feature):
+        message = f"{feature} requires the optional package '{package}', which is not installed."
+        hint = f"Install it with `pip install {package}`."
+        super().__init__(message, hint)
+
+
+class SheetNotFound(BrokoliSQLException):
+    def __init__(self, filepath, sheet, available):
+        message = f"The workbook '{filepath}' has no sheet '{sheet}'."
+        hint = f"Available sheets: {', '.join(available) or 'none'}. Sheets can also be selected by their 0-based position."
+        super().__init__(message, hint)
+
+
+class SchemaMismatch(BrokoliSQLException):
+    def __init__(self, filepath, missing=(), unexpected=(), error=None):
+        if error is not None:
+            message = f"The values of '{filepath}' do not fit the types of the schema it is read with."
+            hint = f"Details: {error}. "
+        else:
+            message = f"The columns of '{filepath}' do not match the schema it is read with."
+            hint = f"Missing columns: {', '.join(missing) or 'none'}; unexpected columns: {', '.join(unexpected) or 'none'}. "
+        hint += "Export a fresh schema with `--export-schema`, or run with `--no-schema-cache`."
+        super().__init__(message, hint)
+
+
+class SchemaNotFound(BrokoliSQLException):
+    def __init__(self, schema_path, table, tables):
+        message = f"The schema file '{schema_path}' has no schema for table '{table}'."
+        hint = f"It holds schemas for: {', '.join(tables) or 'no tables'}. Export one for this table with `--export-schema`."
+        super().__init__(message, hint)
+
+
+class OutputFormatNotSupported(BrokoliSQLException):
+    def __init__(self, output_format, dialect, supported):
+        message = f"The output format '{output_format}' is not supported by the '{dialect}' dialect."
+        hint = f"Formats available for this dialect: {', '.join(('insert',) + tuple(supported))}."
+        super().__init__(message, hint)
+
+
+class TargetNotSupported(BrokoliSQLException):
+    def __init__(self, url, schemes):
+        message = f"The database target '{url}' is not supported."
+        hint = f"Give the target as a URL such as sqlite:///data.db. Supported schemes: {', '.join(schemes)}."
+        super().__init__(message, hint)
+
+
+class TargetLoadError(BrokoliSQLException):
+    def __init__(self, location, original_exception):
+        message = f"Failed to load the rows into '{location}'."
+        hint = f"The transaction in progress was rolled back. Database error: {original_exception}"
+        super().__init__(message, hint)
+
+
+class KeyColumnNotFound(BrokoliSQLException):
+    def __init__(self, key_columns, columns, option='--key'):
+        message = f"The key columns {', '.join(key_columns)} are not all columns of the rows."
+        hint = f"Give the key with `{option}` as column names of the output: {', '.join(map(str, columns))}."
+        super().__init__(message, hint)
+
+
+class InvalidExpression(BrokoliSQLException):
+    def __init__(self, expression, problem, columns=None):
+        message = f"The transformation expression '{expression}' is invalid: {problem}."
+        available = f" Available columns: {', '.join(map(str, columns))}." if columns is not None else ""
+        hint = ("Expressions can use the current column names, `pd` and `df`; columns renamed or dropped by "
+                f"earlier steps keep their input names.{available}")
+        super().__init__(message, hint)
+
+
+class InputNotMatched(BrokoliSQLException):
+    def __init__(self, pattern):
+        message = f"No input files found for '{pattern}'."
+        hint = ("Give `--input` a file, a directory holding files of a supported format, or a glob pattern "
+                "such as 'data/*.csv' (quoted, so the shell leaves it alone); `**` matches any number of directories.")
+        super().__init__(message, hint)
+
+
+class OutputConflict(BrokoliSQLException):
+    def __init__(self, output, files):
+        message = f"The input files {', '.join(files)} would all be written to '{output}'."
+        hint = "Give `--output` a template that tells the files apart, such as out/{parent}_{stem}.sql or out/{index}.sql."
+        super().__init__(message, hint)
+
+
+class BatchFailed(BrokoliSQLException):
+    def __init__(self, failed, total):
+        message = f"{failed} of {total} input files could not be converted."
+        hint = ("The other files were converted, and the errors are listed above. Run again with `--input` set "
+                "to a failed file and `--debug` for the details.")
+        super().__init__(message, hint)
@@ -1,21 +1,146 @@
-def write_output(sql_lines, output_path):
+import os
+import gzip
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from brokolisql.exceptions import OptionalDependencyMissing
+from brokolisql.services import metrics
+
+# Statements are gathered into blocks of about this many bytes before
+# being written (and, for compressed output, compressed independently)
+DEFAULT_BUFFER_SIZE = 4 * 1024 * 1024
+
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+
+
+def _iter_blocks(sql_lines, buffer_size, counter):
+    """
+    Gather statements into newline-terminated UTF-8 blocks of roughly
+    `buffer_size` bytes, counting statements into `counter[0]` and bytes
+    into `counter[1]`.
+    """
+    pending = []
+    pending_size = 0
+    for line in sql_lines:
+        pending.append(line)
+        pending.append('\n')
+        pending_size += len(line) + 1
+        counter[0] += getattr(line, 'statements', 1)
+        if pending_size >= buffer_size:
+            block = ''.join(pending).encode('utf-8')
+            counter[1] += len(block)
+            yield block
+            pending = []
+            pending_size = 0
+    if pending:
+        block = ''.join(pending).encode('utf-8')
+        counter[1] += len(block)
+        yield block
+
+
+def _write_gzip(blocks, f, level, threads):
+    """
+    Compress blocks on a thread pool, pigz style: every block becomes its
+    own gzip member, written in order. A concatenation of gzip members is
+    a valid gzip stream that `gunzip` and `gzip.open` read transparently.
+    """
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        in_flight = deque()
+        for block in blocks:
+            in_flight.append(executor.submit(gzip.compress, block, compresslevel=level, mtime=0))
+            # zlib releases the GIL, so this keeps every thread busy while
+            # bounding how much uncompressed data is held at once
+            if len(in_flight) >= threads * 2:
+                f.write(in_flight.popleft().result())
+        while in_flight:
+            f.write(in_flight.popleft().result())
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise OptionalDependencyMissing('zstandard', 'Zstandard (.zst) output')
+    return zstandard
+
+
+def _write_zstd(blocks, f, level, threads):
+    """Compress blocks into a zstd stream using zstd's own worker threads."""
+    zstandard = _import_zstandard()
+    compressor = zstandard.ZstdCompressor(level=level, threads=threads)
+    with compressor.stream_writer(f, closefd=False) as writer:
+        for block in blocks:
+            writer.write(block)
+
+
+class _DigestFile:
+    """File whose every byte written also goes through a hash."""
+    
+    def __init__(self, f, digest):
+        self.f = f
+        self.digest = digest
+    
+    def write(self, data):
+        self.digest.update(data)
+        return self.f.write(data)
+    
+    def flush(self):
+        self.f.flush()
+    
+    def tell(self):
+        return self.f.tell()
+
+
+def write_output(sql_lines, output_path, compression_level=None, buffer_size=DEFAULT_BUFFER_SIZE, threads=None,
+                 digest=None):
     """
     Write SQL statements to file with optional compression.
     
+    Statements are consumed one at a time, so `sql_lines` can be a
+    generator producing them lazily. Items may also be blocks of several
+    newline-separated statements with a `statements` attribute giving
+    their count.
+    
+    Statements are buffered into large blocks before being written. Output
+    ending in `.gz` is compressed block by block on a thread pool, output
+    ending in `.zst` is compressed with zstandard when it is installed.
+    
     Args:
-        sql_lines (list): List of SQL statements
+        sql_lines (iterable): SQL statements
         output_path (str): Path to output file
+        compression_level (int): Compression level (defaults to 6 for gzip
+            and 3 for zstd)
+        buffer_size (int): Size in bytes of the blocks written at once
+        threads (int): Number of compression threads (defaults to the CPU count)
+        digest (hashlib hash): Hash updated with the bytes of the file as
+            they are written, such as `hashlib.sha256()`
+    
+    Returns:
+        int: Number of statements written
     """
-    import os
-    import gzip
+    counter = [0, 0]
+    # Statements are generated as blocks are pulled, so the time spent
+    # making them is told apart from the time spent writing them
+    blocks = metrics.track(_iter_blocks(sql_lines, max(buffer_size, 1), counter), 'generate', count=None)
+    threads = threads or os.cpu_count() or 1
     
     # Check if output should be compressed
     _, ext = os.path.splitext(output_path)
-    if ext.lower() == '.gz':
-        with gzip.open(output_path, 'wt', encoding='utf-8') as f:
-            for line in sql_lines:
-                f.write(line + '\n')
-    else:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for line in sql_lines:
-                f.write(line + '\n')
\ No newline at end of file
+    if ext.lower() == '.zst':
+        _import_zstandard()
+    
+    with open(output_path, 'wb') as f, metrics.stage('write'):
+        if digest is not None:
+            f = _DigestFile(f, digest)
+        if ext.lower() == '.gz':
+            level = DEFAULT_GZIP_LEVEL if compression_level is None else compression_level
+            _write_gzip(blocks, f, level, threads)
+        elif ext.lower() == '.zst':
+            level = DEFAULT_ZSTD_LEVEL if compression_level is None else compression_level
+            _write_zstd(blocks, f, level, threads)
+        else:
+            for block in blocks:
+                f.write(block)
+        written = f.tell()
+    metrics.add('write', statements=counter[0], uncompressed_bytes=counter[1], bytes_written=written)
+    return counter[0]
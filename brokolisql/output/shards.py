@@ -0,0 +1,286 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from brokolisql.output.output_writer import write_output
+from brokolisql.services import metrics
+from brokolisql.services.delta import resolve_key_columns
+
+# Rows a shard closed by size takes at most at a time
+SHARD_BLOCK_ROWS = 10000
+
+
+def _split_extensions(path):
+    """Split a path into its root and its extensions, compression included."""
+    root, ext = os.path.splitext(path)
+    if ext.lower() in ('.gz', '.zst'):
+        root, inner = os.path.splitext(root)
+        ext = inner + ext
+    return root, ext
+
+
+def shard_path(output_path, label):
+    """
+    Path of a file of a sharded output, next to it: `<output without
+    extensions>.<label>` with the extensions of the output, such as
+    `out.0001.sql.gz` for `out.sql.gz`.
+    """
+    root, ext = _split_extensions(output_path)
+    return f"{root}.{label}{ext}"
+
+
+def manifest_path(output_path):
+    """Path of the manifest of a sharded output: `<output without extensions>.manifest.json`."""
+    return f"{_split_extensions(output_path)[0]}.manifest.json"
+
+
+class _RowCursor:
+    """
+    A stream of chunks handed out shard by shard. A chunk that would take
+    a shard past its row count is cut, and its rest starts the next shard.
+    """
+    
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.pending = None
+    
+    def _next(self):
+        chunk, self.pending = self.pending, None
+        while chunk is None or not len(chunk):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return None
+        return chunk
+    
+    def exhausted(self):
+        """Whether no rows are left."""
+        self.pending = self._next()
+        return self.pending is None
+    
+    def shard(self, max_rows=None, room=None):
+        """
+        Chunks of the next shard.
+        
+        Args:
+            max_rows (int): Rows of the shard at most, or None for no limit
+            room (callable): Called with the rows the shard has so far, it
+                tells how many more it takes, or None for no limit
+        
+        Yields:
+            DataFrame: The next chunk of the shard
+        """
+        rows = 0
+        while max_rows is None or rows < max_rows:
+            left = None if room is None else room(rows)
+            if left is not None and left <= 0:
+                return
+            chunk = self._next()
+            if chunk is None:
+                return
+            if max_rows is not None:
+                left = max_rows - rows if left is None else min(left, max_rows - rows)
+            if left is not None and len(chunk) > left:
+                chunk, self.pending = chunk.iloc[:left], chunk.iloc[left:]
+            rows += len(chunk)
+            yield chunk
+
+
+class _Partitions:
+    """
+    Rows spread over a number of shards, spilled to one file per shard in
+    `spill_dir` and read back one shard at a time, so memory stays flat.
+    """
+    
+    def __init__(self, count, spill_dir=None):
+        self.count = count
+        self.path = tempfile.mkdtemp(prefix='brokolisql-shards-', dir=spill_dir)
+    
+    def _partition_path(self, shard):
+        return os.path.join(self.path, f"shard-{shard}.pkl")
+    
+    def spill(self, chunks, key_columns=None):
+        """
+        Spread the rows over the shards: by a hash of the key columns, or
+        else round robin, row by row.
+        
+        Raises:
+            KeyColumnNotFound: If a key column is not one of the columns
+        """
+        position = 0
+        for chunk in chunks:
+            with metrics.stage('shard partition', len(chunk)):
+                if key_columns:
+                    key_columns = resolve_key_columns(key_columns, list(chunk.columns), '--shard-key')
+                    hashes = pd.util.hash_pandas_object(chunk[key_columns], index=False).to_numpy()
+                    shards = hashes % self.count
+                else:
+                    shards = np.arange(position, position + len(chunk)) % self.count
+                    position += len(chunk)
+                for shard, part in chunk.groupby(shards, sort=False):
+                    with open(self._partition_path(shard), 'ab') as f:
+                        pickle.dump(part, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    def read(self, shard):
+        """
+        Chunks of a shard, in the order they were spilled.
+        
+        Yields:
+            DataFrame: The next chunk of the shard
+        """
+        path = self._partition_path(shard)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+    
+    def close(self):
+        """Remove the spill files."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _counted(chunks, counter):
+    """Pass chunks through, counting their rows into `counter[0]`."""
+    for chunk in chunks:
+        counter[0] += len(chunk)
+        yield chunk
+
+
+def _sized(statements, counter):
+    """Pass statements through, adding their size to `counter[0]`."""
+    for statement in statements:
+        counter[0] += len(statement) + 1
+        yield statement
+
+
+def _room(rows, size, max_size, row_bytes=None):
+    """
+    Rows a shard of `rows` rows and `size` bytes so far takes next.
+    
+    With `row_bytes`, the size of a row in the shards written before, the
+    shard takes the rows that fit. Otherwise it goes by the size of its own
+    rows so far: half of those it has room for, since the rows whose
+    statements are still being made are not in `size` yet. Until its first
+    statement is written, it takes as many rows as it has, starting from
+    one, so it holds no more than a statement's rows unmeasured.
+    """
+    if size >= max_size:
+        return 0
+    if row_bytes:
+        left = int(max_size // row_bytes) - rows
+    elif not size:
+        return max(rows, 1)
+    else:
+        left = -(-((max_size - size) * rows // size) // 2)
+    return min(max(left, 1), SHARD_BLOCK_ROWS)
+
+
+def _write_file(statements, path, write_options):
+    """Write a file of the output, returning its manifest entry."""
+    digest = hashlib.sha256()
+    count = write_output(statements, path, digest=digest, **write_options)
+    return {'file': os.path.basename(path), 'statements': count, 'bytes': os.path.getsize(path),
+            'sha256': digest.hexdigest()}
+
+
+def write_shards(tables, statements, output_path, shard_rows=None, shard_bytes=None, shards=None, shard_key=None,
+                 preamble=None, spill_dir=None, **write_options):
+    """
+    Write the statements of each table to numbered shard files named after
+    `output_path`, so that they can be loaded by several client sessions
+    at once and retried one by one, along with a preamble file of
+    statements to run first, such as CREATE TABLE, and a JSON manifest
+    listing the rows, size and SHA-256 checksum of every file.
+    
+    With `shard_rows` or `shard_bytes`, a shard is closed at that many rows
+    or when its SQL, before compression, reaches that size, whichever comes
+    first, and the next one is started. A shard may pass `shard_bytes` by
+    up to a statement, as the rows of a batch are not cut. With `shards`, the rows of
+    each table are spread over that many files: by a hash of `shard_key`,
+    so that rows sharing a key end up in the same shard, or else in
+    contiguous ranges when the number of rows is known, and round robin
+    when it is not. Spread rows are spilled to `spill_dir` before the
+    shards are written.
+    
+    The manifest is written last, so it only exists for a complete output.
+    
+    Args:
+        tables (list): (table, column types, chunks, total rows) of each table
+        statements (callable): Called with a table name, the chunks of a
+            shard and the path of the shard, it returns the statements
+            loading the rows
+        output_path (str): Path of the SQL output the files are named after
+        shard_rows (int): Rows per shard at most
+        shard_bytes (int): Size of SQL at which a shard is closed
+        shards (int): Number of shards of each table
+        shard_key (list): Columns whose hash picks the shard of a row
+        preamble (list): Statements of the preamble file, or None for none
+        spill_dir (str): Directory of the rows spread over `shards` files,
+            or None for the system temporary directory
+        **write_options: Options of `write_output`, such as `compression_level`
+    
+    Returns:
+        int: Number of statements written, those of the preamble included
+    
+    Raises:
+        KeyColumnNotFound: If a column of `shard_key` is not one of the columns
+    """
+    manifest = manifest_path(output_path)
+    if os.path.exists(manifest):
+        # A manifest left by an earlier run would describe other files
+        os.remove(manifest)
+    
+    entries = []
+    contents = {'output': os.path.basename(output_path), 'preamble': None, 'shards': entries}
+    count = 0
+    if preamble:
+        contents['preamble'] = _write_file(preamble, shard_path(output_path, 'preamble'), write_options)
+        count += contents['preamble']['statements']
+    
+    def write_shard(table, chunks, size=None):
+        counter = [0]
+        path = shard_path(output_path, f"{len(entries) + 1:04d}")
+        lines = statements(table, _counted(chunks, counter), path)
+        if size is not None:
+            lines = _sized(lines, size)
+        entry = _write_file(lines, path, write_options)
+        entries.append(dict(entry, table=table, rows=counter[0]))
+        return entry['statements']
+    
+    for table, _, chunks, total_rows in tables:
+        if shards and (shard_key or total_rows is None):
+            partitions = _Partitions(shards, spill_dir)
+            try:
+                partitions.spill(chunks, shard_key)
+                for shard in range(shards):
+                    count += write_shard(table, partitions.read(shard))
+            finally:
+                partitions.close()
+            continue
+        
+        max_rows = -(-total_rows // shards) if shards else shard_rows
+        cursor = _RowCursor(chunks)
+        row_bytes = None
+        written = [0, 0]
+        while not cursor.exhausted():
+            size = [0]
+            room = None
+            if shard_bytes:
+                room = lambda rows, size=size, row_bytes=row_bytes: _room(rows, size[0], shard_bytes, row_bytes)
+            count += write_shard(table, cursor.shard(max_rows, room), size)
+            written[0] += entries[-1]['rows']
+            written[1] += size[0]
+            if written[0]:
+                # The next shard of the table goes by the size of the rows so far
+                row_bytes = written[1] / written[0]
+    
+    with open(manifest, 'w') as f:
+        json.dump(contents, f, indent=2)
+    return count
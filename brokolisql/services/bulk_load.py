@@ -0,0 +1,152 @@
+from itertools import chain
+import os
+import re
+from brokolisql.services.parallel import StatementBlock
+from brokolisql.services.progress import progress_bar
+
+# Marker of a NULL value in PostgreSQL COPY text and MySQL LOAD DATA files
+NULL_MARKER = '\\N'
+
+# Backslash escapes of COPY's text format
+COPY_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+# Escapes matching LOAD DATA's FIELDS ESCAPED BY '\\', which also reads \0 as NUL
+LOAD_DATA_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+# CSV fields holding any of these must be quoted
+CSV_SPECIAL_CHARACTERS = '",\r\n'
+CSV_SPECIAL = re.compile('[' + CSV_SPECIAL_CHARACTERS + ']')
+
+
+def _contains_any(values, characters):
+    """Whether any of the non-null values holds one of the characters."""
+    # A single search through the joined column is much faster than
+    # escaping every value, and most columns need no escaping at all
+    joined = ''.join([value for value in values if value is not None])
+    return any(character in joined for character in characters)
+
+
+def _escape_text(values, escapes):
+    """Escape a column of text for a tab-separated bulk-load file."""
+    if _contains_any(values, ''.join(map(chr, escapes))):
+        return [NULL_MARKER if value is None else value.translate(escapes) for value in values]
+    return [NULL_MARKER if value is None else value for value in values]
+
+
+def _quote_csv(value):
+    # A NULL is an unquoted empty field, so empty strings have to be quoted,
+    # and so does a lone \. which psql would take for the end of the data
+    if value is None:
+        return ''
+    if value == '' or value == '\\.' or CSV_SPECIAL.search(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _escape_csv(values):
+    """Quote a column of text for COPY's CSV format."""
+    if _contains_any(values, CSV_SPECIAL_CHARACTERS):
+        return [_quote_csv(value) for value in values]
+    return ['' if value is None else '""' if value == '' else '"\\."' if value == '\\.' else value
+            for value in values]
+
+
+def format_data_lines(df, dialect, escape, separator='\t'):
+    """
+    Format the rows of a dataframe as the lines of a bulk-load data file.
+    
+    Args:
+        df (DataFrame): The rows to format
+        dialect (SQLDialect): Dialect that writes the values as text
+        escape (callable): Escapes a list of text values, None for nulls
+        separator (str): Field separator
+    
+    Returns:
+        str: Newline-separated lines, one per row
+    """
+    columns = [escape(dialect.format_text_column(df[col])) for col in df.columns]
+    if not columns:
+        return '\n'.join([''] * len(df))
+    return '\n'.join(map(separator.join, zip(*columns)))
+
+
+def iter_copy(chunks, table_name, dialect, csv=False, total_rows=None, progress=True):
+    """
+    Generate a PostgreSQL `COPY ... FROM STDIN` statement followed by its
+    data, terminated by `\\.`, as psql runs it from a script.
+    
+    Args:
+        chunks (iterable): DataFrames sharing the same columns
+        table_name (str): Name of the table to load into
+        dialect (PostgresDialect): Dialect object for the target database
+        csv (bool): Write the data in CSV format instead of COPY's text format
+        total_rows (int): Total number of rows, if known, for progress reporting
+        progress (bool): Whether to show a progress bar
+    
+    Yields:
+        StatementBlock: The COPY statement, then blocks of data lines
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return
+    
+    escape = _escape_csv if csv else (lambda values: _escape_text(values, COPY_TEXT_ESCAPES))
+    separator = ',' if csv else '\t'
+    
+    yield StatementBlock(dialect.create_copy_statement(table_name, list(first.columns), csv=csv), 1)
+    with progress_bar(total_rows, "Generating COPY data", enabled=progress) as bar:
+        for chunk in chain([first], chunks):
+            if len(chunk):
+                # Data lines are not statements of their own
+                yield StatementBlock(format_data_lines(chunk, dialect, escape, separator), 0)
+                bar.update(len(chunk))
+    yield StatementBlock('\\.', 0)
+
+
+def data_file_path(output_path, table_name):
+    """
+    Path of the companion data file of a table, next to the SQL output:
+    `<output without extensions>.<table>.tsv`.
+    """
+    root, ext = os.path.splitext(output_path)
+    if ext.lower() in ('.gz', '.zst'):
+        root, ext = os.path.splitext(root)
+    return f"{root}.{table_name}.tsv"
+
+
+def iter_load_data(chunks, table_name, dialect, data_path, total_rows=None, progress=True):
+    """
+    Write the rows to a tab-separated companion data file and generate the
+    MySQL `LOAD DATA LOCAL INFILE` statement that loads it.
+    
+    The file is written with the escaping the statement declares, as the
+    statement is generated, so memory use does not grow with the input.
+    
+    Args:
+        chunks (iterable): DataFrames sharing the same columns
+        table_name (str): Name of the table to load into
+        dialect (MySQLDialect): Dialect object for the target database
+        data_path (str): Path of the companion data file
+        total_rows (int): Total number of rows, if known, for progress reporting
+        progress (bool): Whether to show a progress bar
+    
+    Yields:
+        str: The LOAD DATA statement
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return
+    
+    escape = lambda values: _escape_text(values, LOAD_DATA_ESCAPES)
+    with open(data_path, 'w', encoding='utf-8', newline='') as f, \
+            progress_bar(total_rows, "Writing LOAD DATA file", enabled=progress) as bar:
+        for chunk in chain([first], chunks):
+            if len(chunk):
+                f.write(format_data_lines(chunk, dialect, escape))
+                f.write('\n')
+                bar.update(len(chunk))
+    
+    # LOCAL paths are resolved by the client, wherever the script is run from
+    yield dialect.create_load_data_statement(table_name, list(first.columns), os.path.abspath(data_path))
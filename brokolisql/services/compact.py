@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+from brokolisql.services.type_inference import integer_type
+from brokolisql.utils.sizes import format_size
+
+# Columns of strings with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+
+def arrow_string_dtype():
+    """
+    Get the Arrow-backed string dtype.
+    
+    Returns:
+        StringDtype: The dtype, or None when pyarrow is not installed.
+    """
+    try:
+        return pd.StringDtype('pyarrow')
+    except ImportError:
+        return None
+
+
+def compact_column(series, string_dtype=None):
+    """
+    Convert a column to a dtype taking less memory, keeping its values
+    and the SQL they are written as.
+    
+    Integers are downcast to the narrowest type holding their range, the
+    range `infer_column_types` picks the SQL integer type from. Strings
+    with few distinct values become categoricals, and other strings take
+    `string_dtype` when given. Floats keep float64: float32 values are
+    written with fewer digits.
+    
+    Args:
+        series (Series): The column.
+        string_dtype: Dtype for columns of mostly distinct strings, such as
+            the one from `arrow_string_dtype`, or None to leave them as
+            Python objects.
+    
+    Returns:
+        Series: The column in its compact dtype, or the column itself.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+        if not len(series):
+            return series
+        narrow = integer_type(int(series.min()), int(series.max()))[1]
+        return series.astype(narrow) if narrow.itemsize < dtype.itemsize else series
+    
+    if ptypes.is_object_dtype(dtype) and ptypes.infer_dtype(series, skipna=True) == 'string':
+        # Mixed columns stay as they are: their values would not all write the same way
+        categorical = series.astype('category')
+        if len(categorical.cat.categories) <= CATEGORY_MAX_RATIO * series.count():
+            return categorical
+        if string_dtype is not None:
+            return series.astype(string_dtype)
+    return series
+
+
+def compact_frame(df):
+    """
+    Convert every column of a DataFrame with `compact_column`, using
+    Arrow-backed strings when pyarrow is installed.
+    
+    Args:
+        df (DataFrame): The rows to compact.
+    
+    Returns:
+        DataFrame: The rows in compact dtypes.
+    """
+    string_dtype = arrow_string_dtype()
+    compacted = df.copy(deep=False)
+    for i in range(len(df.columns)):
+        series = df.iloc[:, i]
+        column = compact_column(series, string_dtype)
+        if column is not series:
+            compacted.isetitem(i, column)
+    return compacted
+
+
+class MemoryReport:
+    """
+    Memory taken by each column before and after compacting, summed over
+    the frames added, such as the chunks of a stream.
+    
+    Attributes:
+        columns (dict): Column names mapped to [dtype before, dtype after,
+            bytes before, bytes after].
+    """
+    
+    def __init__(self):
+        self.columns = {}
+    
+    def add(self, before, after):
+        """
+        Measure a frame before and after `compact_frame`.
+        
+        Args:
+            before (DataFrame): The rows as loaded.
+            after (DataFrame): The same rows compacted.
+        """
+        for i, col in enumerate(before.columns):
+            original, compacted = before.iloc[:, i], after.iloc[:, i]
+            entry = self.columns.setdefault(col, [str(original.dtype), str(compacted.dtype), 0, 0])
+            entry[2] += int(original.memory_usage(index=False, deep=True))
+            entry[3] += int(compacted.memory_usage(index=False, deep=True))
+    
+    def describe(self):
+        """
+        Describe the memory use of each column and of all of them.
+        
+        Returns:
+            str: The report, one line per column.
+        """
+        lines = ['Memory before and after compacting:']
+        width = max((len(str(col)) for col in self.columns), default=0)
+        for col, (dtype, compact_dtype, size, compact_size) in self.columns.items():
+            lines.append(f"  {str(col):<{width}}  {dtype} -> {compact_dtype}, "
+                         f"{format_size(size)} -> {format_size(compact_size)}")
+        total = sum(entry[2] for entry in self.columns.values())
+        compact_total = sum(entry[3] for entry in self.columns.values())
+        ratio = f" ({total / compact_total:.1f}x smaller)" if compact_total else ''
+        lines.append(f"  Total: {format_size(total)} -> {format_size(compact_total)}{ratio}")
+        return '\n'.join(lines)
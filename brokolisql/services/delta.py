@@ -0,0 +1,281 @@
+import json
+import os
+import re
+import sqlite3
+from itertools import chain, islice
+import numpy as np
+import pandas as pd
+from brokolisql.exceptions import KeyColumnNotFound
+from brokolisql.services import metrics
+from brokolisql.services.progress import progress_bar
+from brokolisql.services.sql_generator import batch_limits, iter_batches, text_bytes
+
+# File the delta state is kept in, next to the SQL output, when none is given
+DEFAULT_STATE_FILE = 'brokolisql.delta.db'
+
+# Separates the literals of the key columns in the key stored for a row
+KEY_SEPARATOR = '\x1f'
+
+# Keys per DELETE statement at most; Oracle takes no more than 1000
+# expressions in an IN list
+MAX_DELETE_KEYS = 1000
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (
+    table_name TEXT PRIMARY KEY,
+    layout TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS row_hashes (
+    table_name TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    row_hash INTEGER NOT NULL,
+    PRIMARY KEY (table_name, row_key)
+) WITHOUT ROWID;
+CREATE TEMP TABLE seen (
+    table_name TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    row_hash INTEGER NOT NULL,
+    PRIMARY KEY (table_name, row_key)
+) WITHOUT ROWID;
+CREATE TEMP TABLE chunk_rows (
+    position INTEGER PRIMARY KEY,
+    row_key TEXT NOT NULL,
+    row_hash INTEGER NOT NULL
+);
+"""
+
+
+def default_state_path(output_path):
+    """Path of the delta state when none is given: `brokolisql.delta.db` next to the SQL output."""
+    return os.path.join(os.path.dirname(os.path.abspath(output_path)), DEFAULT_STATE_FILE)
+
+
+def resolve_key_columns(key_columns, columns, option='--key'):
+    """
+    Match the key columns given on the command line to the columns of the
+    rows, either as they are or as the normalizer names them.
+    
+    Args:
+        key_columns (list): Names of the key columns as given
+        columns (list): Names of the columns of the rows
+        option (str): Command-line option the key was given with, for the error
+    
+    Returns:
+        list: Names of the key columns among `columns`
+    
+    Raises:
+        KeyColumnNotFound: If a key column is not one of the columns
+    """
+    resolved = []
+    for col in key_columns:
+        if col not in columns:
+            col = re.sub(r'[^\w]', '_', col).upper()
+        if col not in columns:
+            raise KeyColumnNotFound(key_columns, columns, option)
+        resolved.append(col)
+    return resolved
+
+
+def _join(columns):
+    """Join the literals of each row, column by column, into one string per row."""
+    return list(map(KEY_SEPARATOR.join, zip(*columns)))
+
+
+class DeltaState:
+    """
+    State of delta loads kept in an SQLite file between runs: for every
+    table, the key of each row written and a hash of its values.
+    
+    A run compares its rows against the state as they stream by and only
+    the new or changed ones are written. The state is updated in a single
+    transaction by `commit`, once the output is complete, so a failed run
+    leaves it as it was and the next run writes the same rows again.
+    
+    A table whose columns, key or dialect differ from the last run starts
+    over with an empty state, so all its rows are written.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # The keys seen in this run go to a temporary table, which spills to
+        # disk past the cache, so memory stays flat however many rows there are
+        self.connection.execute("PRAGMA cache_size = -65536")
+        self.connection.executescript(STATE_SCHEMA)
+        self.layouts = {}
+        self.counts = {}
+    
+    def begin(self, table_name, columns, key_columns, dialect):
+        """Start comparing the rows of a table, starting over if its layout changed."""
+        layout = json.dumps({'columns': columns, 'key': key_columns, 'dialect': type(dialect).__name__})
+        stored = self.connection.execute("SELECT layout FROM tables WHERE table_name = ?", (table_name,)).fetchone()
+        self.layouts[table_name] = (layout, stored is None or stored[0] != layout)
+        self.counts[table_name] = {'new': 0, 'changed': 0, 'unchanged': 0, 'gone': 0}
+    
+    def fresh(self, table_name):
+        """Whether the table has no usable state from an earlier run."""
+        return self.layouts[table_name][1]
+    
+    def compare(self, table_name, keys, hashes):
+        """
+        Find the rows of a chunk that are new or changed since the last
+        run, and record all of them as seen in this run.
+        
+        Of rows sharing a key, only the last one counts, as it is the one
+        the table ends up with.
+        
+        Args:
+            table_name (str): Name of the table
+            keys (list): Key of each row
+            hashes (ndarray): 64-bit hash of each row
+        
+        Returns:
+            ndarray: Positions of the new or changed rows, in order
+        """
+        positions = np.flatnonzero(~pd.Series(keys, dtype=object).duplicated(keep='last').to_numpy())
+        cursor = self.connection.cursor()
+        cursor.execute("DELETE FROM temp.chunk_rows")
+        cursor.executemany("INSERT INTO temp.chunk_rows VALUES (?, ?, ?)",
+                           zip(positions.tolist(), [keys[i] for i in positions], hashes[positions].tolist()))
+        counts = self.counts[table_name]
+        if self.fresh(table_name):
+            changed = positions
+            counts['new'] += len(positions)
+        else:
+            found = cursor.execute(
+                "SELECT c.position, r.row_hash IS NULL FROM temp.chunk_rows c "
+                "LEFT JOIN row_hashes r ON r.table_name = ? AND r.row_key = c.row_key "
+                "WHERE r.row_hash IS NOT c.row_hash ORDER BY c.position", (table_name,)).fetchall()
+            changed = np.array([position for position, _ in found], dtype=np.int64)
+            new = sum(is_new for _, is_new in found)
+            counts['new'] += new
+            counts['changed'] += len(found) - new
+        counts['unchanged'] += len(keys) - len(changed)
+        cursor.execute("INSERT OR REPLACE INTO temp.seen SELECT ?, row_key, row_hash FROM temp.chunk_rows",
+                       (table_name,))
+        return changed
+    
+    def removed_keys(self, table_name):
+        """
+        Keys of the rows written by earlier runs that this run has not seen.
+        
+        Yields:
+            list: SQL literals of the key columns of the next row
+        """
+        if self.fresh(table_name):
+            return
+        cursor = self.connection.execute(
+            "SELECT r.row_key FROM row_hashes r WHERE r.table_name = ? AND NOT EXISTS "
+            "(SELECT 1 FROM temp.seen s WHERE s.table_name = r.table_name AND s.row_key = r.row_key)",
+            (table_name,))
+        for (key,) in cursor:
+            yield key.split(KEY_SEPARATOR)
+    
+    def commit(self):
+        """Replace the state of the tables compared in this run by what this run has seen."""
+        cursor = self.connection.cursor()
+        for table_name, (layout, fresh) in self.layouts.items():
+            if fresh:
+                cursor.execute("DELETE FROM row_hashes WHERE table_name = ?", (table_name,))
+            else:
+                cursor.execute(
+                    "DELETE FROM row_hashes WHERE table_name = ? AND NOT EXISTS (SELECT 1 FROM temp.seen s "
+                    "WHERE s.table_name = row_hashes.table_name AND s.row_key = row_hashes.row_key)",
+                    (table_name,))
+                self.counts[table_name]['gone'] = cursor.rowcount
+            # Only rows that are new or changed are written
+            cursor.execute(
+                "INSERT OR REPLACE INTO row_hashes SELECT s.table_name, s.row_key, s.row_hash FROM temp.seen s "
+                "LEFT JOIN row_hashes r ON r.table_name = s.table_name AND r.row_key = s.row_key "
+                "WHERE s.table_name = ? AND r.row_hash IS NOT s.row_hash", (table_name,))
+            cursor.execute("INSERT OR REPLACE INTO tables VALUES (?, ?)", (table_name, layout))
+        self.connection.commit()
+    
+    def describe(self):
+        """Describe the rows of each table found new, changed, unchanged and gone since the last run."""
+        lines = []
+        for table_name, counts in self.counts.items():
+            lines.append(f"Delta of table '{table_name}': {counts['new']} new, {counts['changed']} changed, "
+                         f"{counts['unchanged']} unchanged, {counts['gone']} gone rows"
+                         + (" (no earlier state)" if self.fresh(table_name) else ""))
+        return '\n'.join(lines)
+    
+    def close(self):
+        """Close the state file, dropping whatever was not committed."""
+        self.connection.close()
+
+
+def iter_delta(chunks, table_name, dialect, state, key_columns, batch_size=1, deletes=False, total_rows=None,
+               progress=True, max_rows=None, max_bytes=None, max_parameters=None):
+    """
+    Lazily generate the statements that bring a table loaded by earlier
+    runs up to date with the rows: upserts of the rows that are new or
+    changed since the last run, and optionally deletes of the rows that
+    are gone.
+    
+    Rows are compared by a hash of their values, computed column by column,
+    and only the new or changed rows are formatted as SQL. A column whose
+    dtype changes between runs, such as integers that gain missing values,
+    hashes differently and so counts as changed in every row.
+    
+    Args:
+        chunks (iterable): DataFrames sharing the same columns
+        table_name (str): Name of the table
+        dialect (SQLDialect): Dialect object for the target database
+        state (DeltaState): State of the earlier runs
+        key_columns (list): Names of the columns identifying a row
+        batch_size (int): Number of rows per upsert statement, or None for
+            as many as the dialect's limits allow
+        deletes (bool): Whether to delete the rows whose key is gone
+        total_rows (int): Total number of rows, if known, for progress reporting
+        progress (bool): Whether to show a progress bar
+        max_rows (int): Rows per statement at most, instead of the dialect's
+        max_bytes (int): Bytes per statement at most, instead of the dialect's
+        max_parameters (int): Values per statement at most, for databases
+            that bind literals as parameters
+    
+    Yields:
+        str: The next SQL statement
+    
+    Raises:
+        KeyColumnNotFound: If a key column is not one of the columns
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return
+    
+    columns = list(first.columns)
+    keys = resolve_key_columns(key_columns, columns)
+    positions = [columns.index(col) for col in keys]
+    state.begin(table_name, columns, keys, dialect)
+    if batch_size is not None:
+        batch_size = max(batch_size, 1)
+    rows_limit, bytes_limit = batch_limits(dialect, columns, batch_size, max_rows, max_bytes, max_parameters)
+    # Size of a statement without literals, for one row and for two: the
+    # difference is what each row adds besides its literals
+    blank = ('',) * len(columns)
+    one, two = (text_bytes(dialect.create_upsert_statement(table_name, columns, keys, [blank] * n)) for n in (1, 2))
+    row_bytes = two - one
+    row_size = lambda row: sum(map(text_bytes, row))
+    
+    with progress_bar(total_rows, "Comparing rows", enabled=progress) as bar:
+        for chunk in chain([first], chunks):
+            with metrics.stage('delta', len(chunk)):
+                # Keys are kept as SQL literals, ready for the DELETE statements
+                keys_text = _join([dialect.format_column(chunk.iloc[:, i]).to_numpy(dtype=object)
+                                   for i in positions])
+                row_hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy().view(np.int64)
+                changed = chunk.iloc[state.compare(table_name, keys_text, row_hashes)]
+                rows = list(zip(*[dialect.format_column(changed.iloc[:, i]).to_numpy(dtype=object)
+                                  for i in range(len(columns))]))
+            for batch in iter_batches(rows, rows_limit, bytes_limit, size=row_size, separator=row_bytes,
+                                      overhead=one - row_bytes):
+                yield dialect.create_upsert_statement(table_name, columns, keys, batch)
+            bar.update(len(chunk))
+    
+    if deletes:
+        removed = state.removed_keys(table_name)
+        size = min(rows_limit or MAX_DELETE_KEYS, MAX_DELETE_KEYS)
+        for batch in iter(lambda: list(islice(removed, size)), []):
+            yield dialect.create_delete_statement(table_name, keys, batch)
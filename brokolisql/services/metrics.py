@@ -0,0 +1,377 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Seconds between two samples of the resident memory
+SAMPLE_INTERVAL = 0.01
+
+# Collector the pipeline stages report to, when metrics are on
+_active = None
+
+_NO_STAGE = nullcontext()
+
+
+def resident_memory():
+    """
+    Resident memory of this process in bytes.
+    
+    Returns:
+        int: The resident memory, or where it cannot be read (without
+            /proc) the peak of the process so far, or None on platforms
+            without either.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageStats:
+    """
+    Measurements of one pipeline stage.
+    
+    Times are exclusive: time spent in a stage nested in another, such as
+    parsing the chunks a transformation pulls, counts for the inner stage
+    only. CPU time is that of the whole process, compression and worker
+    threads included.
+    
+    Attributes:
+        wall (float): Wall-clock seconds.
+        cpu (float): CPU seconds.
+        calls (int): Number of times the stage ran, such as once per chunk.
+        rows (int): Number of rows the stage handled.
+        peak_rss (int): Highest resident memory seen while it ran, in bytes.
+        counters (dict): Other counts, such as bytes written.
+    """
+    
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.calls = 0
+        self.rows = 0
+        self.peak_rss = None
+        self.counters = {}
+    
+    def to_dict(self, name):
+        stats = {
+            'name': name,
+            'wall_seconds': round(self.wall, 6),
+            'cpu_seconds': round(self.cpu, 6),
+            'calls': self.calls,
+            'rows': self.rows,
+            'rows_per_sec': round(self.rows / self.wall, 1) if self.rows and self.wall else None,
+            'peak_rss_bytes': self.peak_rss,
+        }
+        stats.update(self.counters)
+        if self.counters.get('uncompressed_bytes') and self.counters.get('bytes_written'):
+            stats['compression_ratio'] = round(self.counters['uncompressed_bytes'] / self.counters['bytes_written'], 3)
+        return stats
+
+
+class _Stage:
+    """Context manager timing one run of a stage."""
+    
+    __slots__ = ('metrics', 'name', 'rows')
+    
+    def __init__(self, metrics, name, rows):
+        self.metrics = metrics
+        self.name = name
+        self.rows = rows
+    
+    def __enter__(self):
+        self.metrics._enter(self.name)
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.metrics._exit()
+        if self.rows:
+            self.metrics.add(self.name, rows=self.rows)
+
+
+class Metrics:
+    """
+    Wall time, CPU time, rows and peak memory of each stage of a run.
+    
+    Stages are timed at chunk granularity, never per row, so measuring
+    costs next to nothing. The resident memory is sampled on a thread and
+    charged to the stage running at the time.
+    
+    Args:
+        profile (bool): Whether to run cProfile as well.
+        profile_stage (str): Profile only the stages whose name starts
+            with this, such as 'generate', or None for the whole run.
+    """
+    
+    def __init__(self, profile=False, profile_stage=None):
+        self.stages = {}
+        self.summary = {}
+        self.peak_rss = None
+        self.profiler = cProfile.Profile() if profile else None
+        self.profile_stage = profile_stage
+        self.prefix = ''
+        self._stack = []
+        self._profiling = False
+        self._done = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._started = self._stopped = None
+    
+    def start(self):
+        """Start the clock and the memory sampler."""
+        self._started = (time.perf_counter(), time.process_time())
+        self._sampler.start()
+        self._update_profiler()
+    
+    def stop(self):
+        """Stop the clock and the memory sampler."""
+        self._stopped = (time.perf_counter(), time.process_time())
+        self._done.set()
+        self._sampler.join()
+        if self._profiling:
+            self.profiler.disable()
+            self._profiling = False
+    
+    def _stats(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        return stats
+    
+    def _sample(self):
+        while not self._done.wait(SAMPLE_INTERVAL):
+            self._record_memory()
+    
+    def _record_memory(self):
+        rss = resident_memory()
+        if rss is None:
+            return
+        self.peak_rss = max(self.peak_rss or 0, rss)
+        stack = self._stack
+        if stack:
+            stats = self._stats(stack[-1][0])
+            stats.peak_rss = max(stats.peak_rss or 0, rss)
+    
+    def _charge(self, now_wall, now_cpu):
+        """Charge the time since the last mark to the innermost stage."""
+        name, wall, cpu = self._stack[-1]
+        stats = self._stats(name)
+        stats.wall += now_wall - wall
+        stats.cpu += now_cpu - cpu
+    
+    def _enter(self, name):
+        name = self.prefix + name
+        now = time.perf_counter(), time.process_time()
+        if self._stack:
+            self._charge(*now)
+        self._stack.append([name, now[0], now[1]])
+        self._stats(name).calls += 1
+        self._update_profiler()
+    
+    def _exit(self):
+        now = time.perf_counter(), time.process_time()
+        self._charge(*now)
+        name = self._stack.pop()[0]
+        if self._stack:
+            # The outer stage resumes
+            self._stack[-1][1:] = now
+        if self._stats(name).peak_rss is None:
+            # Stages too short for the sampler still get a reading
+            rss = resident_memory()
+            self._stats(name).peak_rss = rss
+        self._update_profiler()
+    
+    def _update_profiler(self):
+        """Profile while the stage asked for is the innermost one, or all the time."""
+        if self.profiler is None or self._done.is_set():
+            return
+        if self.profile_stage is None:
+            wanted = True
+        else:
+            wanted = bool(self._stack) and self._stack[-1][0].startswith(self.profile_stage)
+        if wanted and not self._profiling:
+            self.profiler.enable()
+        elif self._profiling and not wanted:
+            self.profiler.disable()
+        self._profiling = wanted
+    
+    def stage(self, name, rows=None):
+        """
+        Time a block of work as a run of a stage.
+        
+        Args:
+            name (str): Name of the stage.
+            rows (int): Number of rows the block handles, if known.
+        
+        Returns:
+            context manager: Times the block.
+        """
+        return _Stage(self, name, rows)
+    
+    def track(self, iterable, name, count=len):
+        """
+        Time the work of producing each item of an iterable as a run of a
+        stage, such as reading each chunk of a file.
+        
+        Args:
+            iterable (iterable): The items, produced lazily.
+            name (str): Name of the stage.
+            count (callable): Number of rows in an item, or None not to
+                count rows.
+        
+        Yields:
+            The items of `iterable`.
+        """
+        iterator = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            if count is not None:
+                self.add(name, count(item))
+            yield item
+    
+    def add(self, name, rows=0, **counters):
+        """Add rows and other counts, such as bytes, to a stage."""
+        stats = self._stats(self.prefix + name)
+        stats.rows += rows
+        for key, value in counters.items():
+            stats.counters[key] = stats.counters.get(key, 0) + value
+    
+    def report(self):
+        """
+        The measurements as a JSON-serializable dict.
+        
+        Returns:
+            dict: Totals of the run, with its `summary` values, and the
+                stats of each stage in the order they first ran. Time not
+                spent in any stage shows as an 'other' stage.
+        """
+        stopped = self._stopped or (time.perf_counter(), time.process_time())
+        wall = stopped[0] - self._started[0]
+        cpu = stopped[1] - self._started[1]
+        stages = [stats.to_dict(name) for name, stats in self.stages.items()]
+        other = wall - sum(stats.wall for stats in self.stages.values())
+        if other > 0:
+            other_cpu = max(cpu - sum(stats.cpu for stats in self.stages.values()), 0.0)
+            stages.append({'name': 'other', 'wall_seconds': round(other, 6), 'cpu_seconds': round(other_cpu, 6)})
+        
+        total = {'wall_seconds': round(wall, 6), 'cpu_seconds': round(cpu, 6), 'peak_rss_bytes': self.peak_rss}
+        total.update(self.summary)
+        if total.get('rows') and wall:
+            total['rows_per_sec'] = round(total['rows'] / wall, 1)
+        return {'total': total, 'stages': stages}
+    
+    def describe(self):
+        """
+        Describe the measurements as a table, one line per stage.
+        
+        Returns:
+            str: The table.
+        """
+        report = self.report()
+        total = report['total']
+        lines = [f"{'stage':<40} {'wall s':>9} {'cpu s':>9} {'share':>7} {'rows':>11} {'rows/s':>12} {'peak MB':>9}"]
+        for stats in report['stages'] + [dict(total, name='total')]:
+            share = stats['wall_seconds'] / total['wall_seconds'] if total['wall_seconds'] else 0
+            rows = f"{stats['rows']:,}" if stats.get('rows') else '-'
+            rate = f"{stats['rows_per_sec']:,.0f}" if stats.get('rows_per_sec') else '-'
+            peak = f"{stats['peak_rss_bytes'] / 2**20:.1f}" if stats.get('peak_rss_bytes') else '-'
+            name = stats['name'] if len(stats['name']) <= 40 else stats['name'][:37] + '...'
+            lines.append(f"{name:<40} {stats['wall_seconds']:9.3f} {stats['cpu_seconds']:9.3f} {share:7.1%} "
+                         f"{rows:>11} {rate:>12} {peak:>9}")
+        for stats in report['stages']:
+            if 'compression_ratio' in stats:
+                lines.append(f"{stats['name']}: {stats['bytes_written']:,} bytes written, "
+                             f"compression ratio {stats['compression_ratio']:.2f}")
+        return '\n'.join(lines)
+
+
+def activate(metrics):
+    """
+    Make the pipeline stages report to a collector.
+    
+    Args:
+        metrics (Metrics): The collector, or None to stop collecting.
+    """
+    global _active
+    _active = metrics
+
+
+def stage(name, rows=None):
+    """
+    Time a block of work as a run of a stage of the active collector, if
+    any; without one this costs nothing.
+    
+    Args:
+        name (str): Name of the stage.
+        rows (int): Number of rows the block handles, if known.
+    
+    Returns:
+        context manager: Times the block.
+    """
+    if _active is None:
+        return _NO_STAGE
+    return _active.stage(name, rows)
+
+
+def track(iterable, name, count=len):
+    """
+    Time the production of each item of an iterable as a run of a stage
+    of the active collector, if any; without one `iterable` is returned
+    as it is.
+    
+    Args:
+        iterable (iterable): The items, produced lazily.
+        name (str): Name of the stage.
+        count (callable): Number of rows in an item, or None not to count
+            rows.
+    
+    Returns:
+        iterable: The items.
+    """
+    if _active is None:
+        return iterable
+    return _active.track(iterable, name, count)
+
+
+def add(name, rows=0, **counters):
+    """Add rows and other counts to a stage of the active collector, if any."""
+    if _active is not None:
+        _active.add(name, rows, **counters)
+
+
+@contextmanager
+def scope(name):
+    """
+    Prefix the names of the stages run inside a block with `name`, such as
+    'scan' for the first pass over a streamed file, telling them apart from
+    the same stages of the pass that writes the rows.
+    """
+    if _active is None:
+        yield
+        return
+    outer = _active.prefix
+    _active.prefix = f'{outer}{name} '
+    try:
+        yield
+    finally:
+        _active.prefix = outer
+
+
+def note(**values):
+    """Record totals of the run, such as its row count, with the active collector, if any."""
+    if _active is not None:
+        _active.summary.update(values)
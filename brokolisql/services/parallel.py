@@ -0,0 +1,115 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+import os
+import pandas as pd
+from brokolisql.services.sql_generator import batch_limits, iter_sql
+from brokolisql.services.progress import progress_bar
+
+# Rows formatted by a worker in one task
+DEFAULT_BLOCK_ROWS = 20000
+
+
+class StatementBlock(str):
+    """
+    A run of newline-separated SQL statements rendered in one piece.
+
+    `write_output` writes it like a single statement but counts the
+    statements it holds.
+    """
+
+    def __new__(cls, text, statements):
+        block = super().__new__(cls, text)
+        block.statements = statements
+        return block
+
+
+def _render_block(df, table_name, dialect, batch_size, limits):
+    """Render a block of rows in a worker process as one joined text."""
+    statements = list(iter_sql([df], table_name, dialect, batch_size=batch_size, progress=False, **limits))
+    return '\n'.join(statements), len(statements)
+
+
+def _aligned_blocks(chunks, block_rows):
+    """
+    Re-slice a stream of chunks into blocks of exactly `block_rows` rows
+    (the last one may be shorter), so batches never straddle two blocks.
+    """
+    pending = []
+    pending_rows = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_rows += len(chunk)
+        if pending_rows < block_rows:
+            continue
+
+        df = pd.concat(pending) if len(pending) > 1 else pending[0]
+        start = 0
+        while len(df) - start >= block_rows:
+            yield df.iloc[start:start + block_rows]
+            start += block_rows
+        pending = [df.iloc[start:]]
+        pending_rows = len(df) - start
+
+    if pending_rows:
+        yield pd.concat(pending) if len(pending) > 1 else pending[0]
+
+
+def iter_sql_parallel(chunks, table_name, dialect, batch_size=1, workers=None,
+                      block_rows=DEFAULT_BLOCK_ROWS, total_rows=None, progress=True, **limits):
+    """
+    Generate SQL INSERT statements in a pool of worker processes.
+
+    The rows are partitioned into ranges of `block_rows` rows (rounded to
+    a multiple of `batch_size`), each range is formatted by a worker with the
+    given dialect and the results are yielded in the original row order.
+    A worker hands back one joined text block per range instead of one
+    string per statement, which keeps pickling overhead low.
+
+    Ranges are rounded to the rows per statement the dialect's limits allow
+    as well. Each range ends its last batch, so where batches are closed by
+    the byte limit rather than a row count, statements may split
+    differently than with `iter_sql`.
+
+    Args:
+        chunks (iterable): DataFrames sharing the same columns
+        table_name (str): Name of the table to insert into
+        dialect (SQLDialect): Dialect object for the target database
+        batch_size (int): Number of rows per INSERT statement, or None for
+            as many as the dialect's limits allow
+        workers (int): Number of worker processes (defaults to the CPU count)
+        block_rows (int): Number of rows per worker task
+        total_rows (int): Total number of rows, if known, for progress reporting
+        progress (bool): Whether to show a progress bar
+        **limits: `max_rows`, `max_bytes` and `max_parameters` overriding
+            the dialect's limits, as for `iter_sql`
+
+    Yields:
+        StatementBlock: Newline-separated statements for the next range of rows
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return
+    if batch_size is None or batch_size > 1:
+        rows_limit = batch_limits(dialect, list(first.columns), batch_size, **limits)[0]
+        if rows_limit:
+            block_rows = max(rows_limit, block_rows // rows_limit * rows_limit)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            progress_bar(total_rows, "Generating SQL", enabled=progress) as bar:
+        # Keep a bounded number of blocks in flight so memory stays flat
+        in_flight = deque()
+        for block in _aligned_blocks(chain([first], chunks), block_rows):
+            future = executor.submit(_render_block, block, table_name, dialect, batch_size, limits)
+            in_flight.append((len(block), future))
+            if len(in_flight) >= workers * 2:
+                rows, future = in_flight.popleft()
+                bar.update(rows)
+                yield StatementBlock(*future.result())
+
+        while in_flight:
+            rows, future = in_flight.popleft()
+            bar.update(rows)
+            yield StatementBlock(*future.result())
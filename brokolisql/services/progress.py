@@ -0,0 +1,55 @@
+from tqdm import tqdm
+
+# Makes progress bars, or None when progress is switched off
+_factory = tqdm
+
+
+class _NoProgress:
+    """Progress bar that shows nothing."""
+    
+    def update(self, n=1):
+        pass
+    
+    def close(self):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_PROGRESS = _NoProgress()
+
+
+def set_progress(factory):
+    """
+    Set how progress is reported, for every stage of a run.
+    
+    Args:
+        factory (callable): Called with `total`, `desc` and `unit` keyword
+            arguments, it returns a context manager with an `update(n)`
+            method, as `tqdm.tqdm` does; or None to report no progress.
+    """
+    global _factory
+    _factory = factory
+
+
+def progress_bar(total=None, desc=None, unit='rows', enabled=True):
+    """
+    Open a progress bar, updated chunk by chunk with the rows done.
+    
+    Args:
+        total (int): Number of rows to go, if known.
+        desc (str): What is being done.
+        unit (str): What is counted.
+        enabled (bool): Whether the caller wants progress shown.
+    
+    Returns:
+        context manager: The progress bar, which shows nothing when
+            disabled or when progress is switched off.
+    """
+    if not enabled or _factory is None:
+        return _NO_PROGRESS
+    return _factory(total=total, desc=desc, unit=unit)
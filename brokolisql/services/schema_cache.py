@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from brokolisql.exceptions import FileParsingError
+
+# Bumped whenever the stored schema or its meaning changes, which makes
+# entries written by older versions miss
+SCHEMA_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'brokolisql', 'schemas',
+)
+
+# Schemas kept before the least recently used ones are evicted
+DEFAULT_MAX_ENTRIES = 256
+
+# A file is fingerprinted by hashing this many blocks spread evenly over it
+SAMPLE_BLOCKS = 16
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+
+def file_fingerprint(filepath):
+    """
+    Fingerprint the content of a file from its size, its modification time
+    and a hash of blocks sampled across it, without reading it whole.
+    
+    Args:
+        filepath (str): Path to the file.
+    
+    Returns:
+        str: Hex digest identifying the file content.
+    """
+    stat = os.stat(filepath)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode('ascii'))
+    
+    with open(filepath, 'rb') as f:
+        if stat.st_size <= SAMPLE_BLOCKS * SAMPLE_BLOCK_SIZE:
+            digest.update(f.read())
+        else:
+            # The first and last blocks are always part of the sample
+            step = (stat.st_size - SAMPLE_BLOCK_SIZE) // (SAMPLE_BLOCKS - 1)
+            for i in range(SAMPLE_BLOCKS):
+                f.seek(i * step)
+                digest.update(f.read(SAMPLE_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def header_signature(columns):
+    """
+    Fingerprint the layout of a file from its column names, so that files
+    exported with the same layout share a schema.
+    
+    Args:
+        columns (list): Column names.
+    
+    Returns:
+        str: Hex digest identifying the layout.
+    """
+    return hashlib.blake2b('\x1f'.join(columns).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def schema_key(signature, format, reader_options):
+    """
+    Build the cache key of a schema from a file or header signature and
+    everything else that changes how the file is read.
+    
+    Args:
+        signature (str): File fingerprint or header signature.
+        format (str): Resolved input format.
+        reader_options (dict): Format-specific reader options.
+    
+    Returns:
+        str: The cache key.
+    """
+    options = json.dumps([SCHEMA_VERSION, format, reader_options], sort_keys=True, default=str)
+    return hashlib.blake2b(f"{signature}:{options}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+def project_schema(schema, exclude_columns):
+    """Leave the excluded columns out of a (dtypes, column types, rows) schema."""
+    if not exclude_columns:
+        return schema
+    dtypes, column_types, rows = schema
+    return ({col: dtype for col, dtype in dtypes.items() if col not in exclude_columns},
+            {col: sql_type for col, sql_type in column_types.items() if col not in exclude_columns},
+            rows)
+
+
+def schema_to_dict(schema):
+    """Turn a (dtypes, column types, rows) schema into plain JSON data."""
+    dtypes, column_types, rows = schema
+    return {
+        'version': SCHEMA_VERSION,
+        'dtypes': {col: str(dtype) for col, dtype in dtypes.items()},
+        'column_types': dict(column_types),
+        'rows': rows,
+    }
+
+
+def schema_from_dict(data):
+    """Turn JSON data written by `schema_to_dict` back into a schema."""
+    if data.get('version') != SCHEMA_VERSION:
+        raise ValueError(f"unsupported schema version {data.get('version')!r}")
+    dtypes = {col: pd.api.types.pandas_dtype(dtype) for col, dtype in data['dtypes'].items()}
+    return dtypes, dict(data['column_types']), data.get('rows')
+
+
+class SchemaCache:
+    """
+    On-disk cache of file schemas: the pandas dtypes to read a file with,
+    the SQL types of its columns and its row count.
+    
+    Every entry is a small JSON file in the cache directory. Reading an
+    entry refreshes its modification time, and once the cache holds more
+    than `max_entries` schemas the least recently used ones are removed.
+    """
+    
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+    
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+    
+    def get(self, key):
+        """
+        Look up a schema.
+        
+        Args:
+            key (str): Cache key from `schema_key`.
+        
+        Returns:
+            tuple: (pandas dtypes dict, column types dict, row count), or
+            None when the schema is not cached.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                schema = schema_from_dict(json.load(f))
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, unreadable or outdated entries are plain misses
+            return None
+        return schema
+    
+    def put(self, key, schema):
+        """
+        Store a schema, evicting the least recently used entries if the
+        cache is full.
+        
+        Args:
+            key (str): Cache key from `schema_key`.
+            schema (tuple): (pandas dtypes dict, column types dict, row count).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # Written aside and moved into place so readers never see half an entry
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(schema_to_dict(schema), f)
+        os.replace(temp_path, path)
+        self._evict()
+    
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.stat(path).st_mtime_ns, path))
+                except OSError:
+                    continue
+        entries.sort()
+        for _, path in entries[:max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def export_schemas(path, schemas):
+    """
+    Write table schemas to a schema file that can be edited and imported
+    into later runs.
+    
+    Args:
+        path (str): Path of the schema file.
+        schemas (dict): Table names mapped to their schema.
+    """
+    data = {'tables': {table: schema_to_dict(schema) for table, schema in schemas.items()}}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def import_schemas(path):
+    """
+    Read a schema file written by `export_schemas`.
+    
+    Args:
+        path (str): Path of the schema file.
+    
+    Returns:
+        dict: Table names mapped to their schema.
+    
+    Raises:
+        FileParsingError: If the file is not a valid schema file.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {table: schema_from_dict(schema) for table, schema in data['tables'].items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        raise FileParsingError(path, e)
@@ -1,49 +1,339 @@
-from tqdm import tqdm
+from itertools import chain, islice
+import numpy as np
+from brokolisql.services.progress import progress_bar
 
-def generate_sql(df, table_name, dialect, batch_size=1):
+# Rows in each batch of parameters handed to the driver, for one executemany() call
+DEFAULT_PARAMS_BATCH_ROWS = 10000
+
+def format_rows(df, dialect):
+    """
+    Format every row of the dataframe into a comma-separated list of
+    SQL literals, one column at a time.
+    
+    Args:
+        df (DataFrame): The dataframe to format
+        dialect (SQLDialect): Dialect object for the target database
+    
+    Returns:
+        iterator: One string of joined literals per row, in row order
+    """
+    if len(df.columns) == 0:
+        return iter([''] * len(df))
+    
+    dtypes = list(df.dtypes)
+    
+    # iterrows() interleaves each row into a single Series, so frames made
+    # only of numeric columns were rendered from their common dtype (ints
+    # show up as 1.0 next to floats) and all-bool frames from numpy bools.
+    # Keep those literals identical to what format_value used to receive.
+    if all(isinstance(dtype, np.dtype) and dtype.kind in 'iuf' for dtype in dtypes):
+        values = df.to_numpy()
+        columns = []
+        for j in range(values.shape[1]):
+            literals = values[:, j].astype(str).astype(object)
+            if values.dtype.kind == 'f':
+                literals[np.isnan(values[:, j])] = 'NULL'
+            columns.append(literals.tolist())
+    elif all(isinstance(dtype, np.dtype) and dtype.kind == 'b' for dtype in dtypes):
+        columns = [np.where(df[col].to_numpy(), 'True', 'False').tolist() for col in df.columns]
+    else:
+        columns = [dialect.format_column(df[col]).tolist() for col in df.columns]
+    
+    return map(', '.join, zip(*columns))
+
+def _iter_rows(chunks, dialect, bar):
+    """Format the rows of each chunk in turn, reporting progress once per chunk."""
+    for chunk in chunks:
+        yield from format_rows(chunk, dialect)
+        bar.update(len(chunk))
+
+def text_bytes(text):
+    """Size of a string encoded as UTF-8, without encoding ASCII text."""
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+def batch_limits(dialect, columns, batch_size=None, max_rows=None, max_bytes=None, max_parameters=None,
+                 parameterized=False):
+    """
+    Work out when a multi-row statement is closed: at the fixed batch size,
+    if any, or at the dialect's row, byte and bind-parameter limits,
+    whichever comes first.
+    
+    Statements with literal values bind no parameters, so the dialect's
+    parameter limit only applies to parameterized ones; pass
+    `max_parameters` to cap literal statements as well.
+    
+    Args:
+        dialect (SQLDialect): Dialect object for the target database
+        columns (list): Names of the columns, one parameter each per row
+        batch_size (int): Rows per statement asked for, or None for as many
+            as the limits allow
+        max_rows (int): Rows per statement at most, instead of the dialect's
+        max_bytes (int): Bytes per statement at most, instead of the dialect's
+        max_parameters (int): Bind parameters per statement at most, instead
+            of the dialect's
+        parameterized (bool): Whether the values are bind parameters
+    
+    Returns:
+        tuple: Rows per statement at most and bytes per statement at most,
+            each None for no limit
+    """
+    max_rows = max_rows or dialect.max_batch_rows
+    if parameterized:
+        max_parameters = max_parameters or dialect.max_bind_parameters
+    limits = [limit for limit in (batch_size, max_rows) if limit]
+    if max_parameters and columns:
+        limits.append(max(max_parameters // len(columns), 1))
+    return (min(limits) if limits else None), (max_bytes or dialect.max_statement_bytes)
+
+def iter_batches(items, max_rows=None, max_bytes=None, size=text_bytes, separator=0, overhead=0):
+    """
+    Group items into batches, closing a batch when it holds `max_rows`
+    items or when the next item would take it past `max_bytes`.
+    
+    An item bigger than `max_bytes` on its own still makes a batch of one.
+    
+    Args:
+        items (iterable): The items, such as formatted rows
+        max_rows (int): Items per batch at most, or None for no limit
+        max_bytes (int): Bytes per batch at most, or None for no limit
+        size (callable): Bytes an item takes
+        separator (int): Bytes each item adds besides its own, such as
+            the punctuation between two rows
+        overhead (int): Bytes a batch takes besides its items
+    
+    Yields:
+        list: The next batch of items
+    """
+    items = iter(items)
+    if max_bytes is None:
+        yield from iter(lambda: list(islice(items, max_rows)), [])
+        return
+    
+    batch = []
+    append = batch.append
+    used = overhead
+    for item in items:
+        item_bytes = size(item) + separator
+        used += item_bytes
+        if (used > max_bytes or len(batch) == max_rows) and batch:
+            yield batch
+            batch = []
+            append = batch.append
+            used = overhead + item_bytes
+        append(item)
+    if batch:
+        yield batch
+
+def iter_sql(chunks, table_name, dialect, batch_size=1, total_rows=None, progress=True, max_rows=None,
+             max_bytes=None, max_parameters=None):
+    """
+    Lazily generate SQL INSERT statements from a stream of DataFrame chunks.
+    
+    Only one chunk is formatted at a time, and batches carry over chunk
+    boundaries, so the statements are the same as for a single DataFrame
+    holding all the rows.
+    
+    A multi-row INSERT is closed at `batch_size` rows, or earlier when it
+    reaches a limit of the dialect (see `batch_limits`), such as the 1000
+    rows SQL Server takes in a VALUES list or the packet size of MySQL.
+    With `batch_size` None, every statement is as large as the limits allow.
+    
+    Args:
+        chunks (iterable): DataFrames sharing the same columns
+        table_name (str): Name of the table to insert into
+        dialect (SQLDialect): Dialect object for the target database
+        batch_size (int): Number of rows per INSERT statement, or None for
+            as many as the dialect's limits allow
+        total_rows (int): Total number of rows, if known, for progress reporting
+        progress (bool): Whether to show a progress bar
+        max_rows (int): Rows per statement at most, instead of the dialect's
+        max_bytes (int): Bytes per statement at most, instead of the dialect's
+        max_parameters (int): Values per statement at most, for databases
+            that bind literals as parameters
+        
+    Yields:
+        str: The next SQL statement
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return
+    
+    cols = list(first.columns)
+    col_str = ', '.join([dialect.format_column_name(col) for col in cols])
+    with progress_bar(total_rows, "Generating SQL", enabled=progress) as bar:
+        rows = _iter_rows(chain([first], chunks), dialect, bar)
+        
+        # For single-row inserts
+        if batch_size is not None and batch_size <= 1:
+            prefix = f"INSERT INTO {table_name} ({col_str}) VALUES ("
+            suffix = ')' + dialect.statement_terminator
+            for values in rows:
+                yield prefix + values + suffix
+        
+        # For batch inserts
+        else:
+            prefix = f"INSERT INTO {table_name} ({col_str}) VALUES\n  "
+            rows_limit, bytes_limit = batch_limits(dialect, cols, batch_size, max_rows, max_bytes, max_parameters)
+            # Each row adds its parentheses and the ',\n  ' separating it from the next
+            batches = iter_batches(rows, rows_limit, bytes_limit, separator=6, overhead=text_bytes(prefix) + 1)
+            for batch in batches:
+                yield prefix + ',\n  '.join(f"({values})" for values in batch) + ';'
+
+def generate_sql(df, table_name, dialect, batch_size=1, max_rows=None, max_bytes=None, max_parameters=None):
     """
     Generate SQL INSERT statements with support for batch inserts
     and SQL dialects.
     
+    Values are formatted column-wise with `SQLDialect.format_column` and
+    the preformatted columns are then joined row by row.
+    
     Args:
         df (DataFrame): The dataframe to generate SQL for
         table_name (str): Name of the table to insert into
         dialect (SQLDialect): Dialect object for the target database
-        batch_size (int): Number of rows per INSERT statement
-        
+        batch_size (int): Number of rows per INSERT statement, or None for
+            as many as the dialect's limits allow
+        max_rows (int): Rows per statement at most, instead of the dialect's
+        max_bytes (int): Bytes per statement at most, instead of the dialect's
+        max_parameters (int): Values per statement at most, for databases
+            that bind literals as parameters
+    
     Returns:
         list: A list of SQL statements as strings
     """
-    sql_statements = []
-    total_rows = len(df)
+    return list(iter_sql([df], table_name, dialect, batch_size=batch_size, total_rows=len(df),
+                         max_rows=max_rows, max_bytes=max_bytes, max_parameters=max_parameters))
+
+def parameter_rows(df, dialect):
+    """
+    Convert the rows of the dataframe into tuples of Python values a
+    driver can bind, one column at a time with `SQLDialect.parameter_column`.
     
-    # For single-row inserts
-    if batch_size <= 1:
-        for _, row in tqdm(df.iterrows(), total=total_rows, desc="Generating SQL"):
-            cols = list(df.columns)
-            values = [row[col] for col in cols]
-            sql = dialect.create_insert_statement(table_name, cols, values)
-            sql_statements.append(sql)
+    Args:
+        df (DataFrame): The dataframe to convert
+        dialect (SQLDialect): Dialect object for the target database
     
-    # For batch inserts
-    else:
-        for i in tqdm(range(0, total_rows, batch_size), desc="Generating SQL batches"):
-            batch = df.iloc[i:i+batch_size]
-            if len(batch) == 0:
-                continue
-                
-            cols = list(df.columns)
-            value_groups = []
-            
-            for _, row in batch.iterrows():
-                values = [dialect.format_value(row[col]) for col in cols]
-                value_group = f"({', '.join(values)})"
-                value_groups.append(value_group)
-                
-            col_str = ', '.join([dialect.format_column_name(col) for col in cols])
-            values_str = ',\n  '.join(value_groups)
-            
-            sql = f"INSERT INTO {table_name} ({col_str}) VALUES\n  {values_str};"
-            sql_statements.append(sql)
-            
-    return sql_statements
+    Returns:
+        iterator: One tuple of values per row, in row order
+    """
+    if len(df.columns) == 0:
+        return iter([()] * len(df))
+    return zip(*[dialect.parameter_column(df[col]) for col in df.columns])
+
+def _iter_parameter_rows(chunks, dialect, bar):
+    """Convert the rows of each chunk in turn, reporting progress once per chunk."""
+    for chunk in chunks:
+        yield from parameter_rows(chunk, dialect)
+        bar.update(len(chunk))
+
+def insert_template(table_name, columns, dialect, rows=1, paramstyle=None):
+    """
+    Create a parameterized INSERT statement for `rows` rows, with one
+    parameter marker per value in the dialect's paramstyle, or `paramstyle`.
+    Numbered markers go on across the rows.
+    """
+    cols = ', '.join([dialect.format_column_name(col) for col in columns])
+    if rows == 1:
+        return f"INSERT INTO {table_name} ({cols}) VALUES ({dialect.placeholders(len(columns), paramstyle)})"
+    values = ',\n  '.join(f"({dialect.placeholders(len(columns), paramstyle, start=i * len(columns))})"
+                           for i in range(rows))
+    return f"INSERT INTO {table_name} ({cols}) VALUES\n  {values}"
+
+def iter_params(chunks, table_name, dialect, batch_size=DEFAULT_PARAMS_BATCH_ROWS, rows_per_statement=1,
+                paramstyle=None, total_rows=None, progress=True, max_rows=None, max_parameters=None):
+    """
+    Lazily generate parameterized INSERT statements and the values bound
+    to them from a stream of DataFrame chunks, for drivers to run with
+    `executemany` instead of parsing literals back out of SQL text.
+    
+    Values are converted column-wise to native Python objects, None for
+    nulls, with `SQLDialect.parameter_column`; datetimes are passed as text.
+    The markers follow the dialect's driver (`%s` for PostgreSQL and MySQL,
+    `:1` for Oracle, `?` for the others) unless `paramstyle` is given.
+    
+    With `rows_per_statement` above 1, each statement inserts that many
+    rows and each tuple holds their values one row after the other, within
+    the dialect's row and bind-parameter limits (see `batch_limits`); with
+    None, as many rows as those limits allow. The rows left at the end get
+    a statement of their own.
+    
+    Args:
+        chunks (iterable): DataFrames sharing the same columns
+        table_name (str): Name of the table to insert into
+        dialect (SQLDialect): Dialect object for the target database
+        batch_size (int): Rows per batch at most, rounded down to whole
+            statements
+        rows_per_statement (int): Rows each statement inserts, or None for
+            as many as the dialect's limits allow
+        paramstyle (str): DB-API paramstyle of the driver, such as 'qmark',
+            instead of the dialect's
+        total_rows (int): Total number of rows, if known, for progress reporting
+        progress (bool): Whether to show a progress bar
+        max_rows (int): Rows per statement at most, instead of the dialect's
+        max_parameters (int): Bind parameters per statement at most,
+            instead of the dialect's
+    
+    Yields:
+        tuple: (statement, list of parameter tuples, one per execution)
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return
+    
+    cols = list(first.columns)
+    per_statement = 1
+    if rows_per_statement is None or rows_per_statement > 1:
+        per_statement, _ = batch_limits(dialect, cols, rows_per_statement, max_rows, None, max_parameters,
+                                        parameterized=True)
+        per_statement = per_statement or batch_size
+    batch_rows = max(batch_size // per_statement, 1) * per_statement
+    
+    with progress_bar(total_rows, "Generating parameters", enabled=progress) as bar:
+        rows = _iter_parameter_rows(chain([first], chunks), dialect, bar)
+        if per_statement == 1:
+            statement = insert_template(table_name, cols, dialect, paramstyle=paramstyle)
+            for batch in iter_batches(rows, batch_rows):
+                yield statement, batch
+            return
+        
+        statement = insert_template(table_name, cols, dialect, per_statement, paramstyle)
+        for batch in iter_batches(rows, batch_rows):
+            whole = len(batch) - len(batch) % per_statement
+            if whole:
+                yield statement, [tuple(chain.from_iterable(batch[start:start + per_statement]))
+                                  for start in range(0, whole, per_statement)]
+            if whole < len(batch):
+                rest = batch[whole:]
+                yield (insert_template(table_name, cols, dialect, len(rest), paramstyle),
+                       [tuple(chain.from_iterable(rest))])
+
+def generate_params(df, table_name, dialect, batch_size=DEFAULT_PARAMS_BATCH_ROWS, rows_per_statement=1,
+                    paramstyle=None, max_rows=None, max_parameters=None):
+    """
+    Generate parameterized INSERT statements and their values, the
+    counterpart of `generate_sql` for DB-API drivers:
+    
+        for statement, params in generate_params(df, 'users', get_dialect('postgres')):
+            cursor.executemany(statement, params)
+    
+    Args:
+        df (DataFrame): The dataframe to generate statements for
+        table_name (str): Name of the table to insert into
+        dialect (SQLDialect): Dialect object for the target database
+        batch_size (int): Rows per batch at most
+        rows_per_statement (int): Rows each statement inserts, or None for
+            as many as the dialect's limits allow
+        paramstyle (str): DB-API paramstyle of the driver, instead of the
+            dialect's
+        max_rows (int): Rows per statement at most, instead of the dialect's
+        max_parameters (int): Bind parameters per statement at most,
+            instead of the dialect's
+    
+    Returns:
+        list: (statement, list of parameter tuples) batches, as from `iter_params`
+    """
+    return list(iter_params([df], table_name, dialect, batch_size=batch_size, rows_per_statement=rows_per_statement,
+                            paramstyle=paramstyle, total_rows=len(df), max_rows=max_rows,
+                            max_parameters=max_parameters))
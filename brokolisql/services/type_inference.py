@@ -1,92 +1,358 @@
-def infer_column_types(df):
+import re
+import numpy as np
+import pandas as pd
+
+UUID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+
+BOOLEAN_STRINGS = ['true', 'false', '1', '0', 'yes', 'no', 'y', 'n']
+
+# Floats of at least this magnitude are written in exponent notation, so an
+# integer read as a float only renders with a plain '.0' below it
+EXPONENT_THRESHOLD = 10 ** 16
+
+# SQL integer types, narrowest first, with the NumPy dtype holding the same range
+INTEGER_TYPES = [
+    ('TINYINT', np.dtype('int8')),
+    ('SMALLINT', np.dtype('int16')),
+    ('INTEGER', np.dtype('int32')),
+    ('BIGINT', np.dtype('int64')),
+]
+
+
+class ColumnStats:
     """
-    Infer SQL column types from pandas data types with more advanced detection.
+    Mergeable summary of the values of one column, holding just what is
+    needed to pick its SQL type.
     
-    Args:
-        df (DataFrame): The dataframe to infer column types from.
-        
-    Returns:
-        dict: A dictionary with column names as keys and SQL types as values.
+    Stats are collected from any part of a column and the stats of two
+    parts merge into the stats of both, in any grouping. A file can thus be
+    summarized chunk by chunk, or in parallel, and still get the types a
+    whole-file read would get.
+    
+    Besides the statistics for its own dtype, a part records how its values
+    would measure as floats and as strings, since merging with other parts
+    may turn the column into a float or object column.
+    
+    Attributes:
+        dtype: Pandas dtype of the column, merged across parts.
+        rows (int): Number of rows.
+        non_null (int): Number of non-null values.
+        min, max: Smallest and largest integer value.
+        max_decimals (int): Most digits after the decimal point of a value
+            written as a float.
+        max_length (int): Longest value written as a string.
+        has_time (bool): Whether a datetime has a time of day.
+        all_uuid (bool): Whether every value looks like a UUID.
+        all_boolean (bool): Whether every value reads as a boolean.
     """
-    import numpy as np
-    import pandas as pd
-    import re
     
-    sql_types = {}
+    def __init__(self, dtype=np.dtype('float64'), rows=0):
+        # The defaults describe a column of nulls, as a column missing from
+        # part of the rows reads
+        self.dtype = dtype
+        self.rows = rows
+        self.non_null = 0
+        self.min = None
+        self.max = None
+        self.max_decimals = 0
+        self.max_length = 0
+        self.has_time = False
+        self.all_uuid = True
+        self.all_boolean = True
     
-    for col in df.columns:
-        # Skip completely empty columns
-        if df[col].isna().all():
-            sql_types[col] = 'VARCHAR(255)'
-            continue
+    @classmethod
+    def from_series(cls, series):
+        """
+        Collect the stats of a Series.
         
-        dtype = df[col].dtype
-        non_null_sample = df[col].dropna()
+        Args:
+            series (Series): Values of the column.
         
-        # No data to analyze
-        if len(non_null_sample) == 0:
-            sql_types[col] = 'VARCHAR(255)'
-            continue
-            
-        # Check integer types
-        if np.issubdtype(dtype, np.integer):
+        Returns:
+            ColumnStats: The stats of the values.
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Compact columns are summarized as the plain column they stand for
+            series = series.astype(series.dtype.categories.dtype)
+        elif isinstance(series.dtype, pd.StringDtype):
+            series = series.astype(object)
+        stats = cls(series.dtype, len(series))
+        values = series.dropna()
+        stats.non_null = len(values)
+        if not stats.non_null:
+            return stats
+        
+        dtype = series.dtype
+        kind = dtype.kind if isinstance(dtype, np.dtype) else None
+        if kind in ('i', 'u'):
+            stats._add_integers(values)
+        elif kind == 'f':
+            stats._add_floats(values)
+        elif kind == 'M':
+            stats._add_datetimes(values)
+        elif kind == 'b':
+            # Bounds for where booleans read as 1 and 0 next to numbers
+            stats.min, stats.max = int(values.min()), int(values.max())
+            stats._add_strings(values.astype(object).astype(str))
+        elif kind == 'O':
+            stats._add_strings(values.astype(str))
+        else:
+            stats._add_strings(values.astype(object).astype(str))
+        return stats
+    
+    def _add_integers(self, values):
+        self.min = int(values.min())
+        self.max = int(values.max())
+        self.max_length = max(len(str(self.min)), len(str(self.max)))
+        self.all_uuid = False
+        self.all_boolean = self.min >= 0 and self.max <= 1
+        
+        large = values[(values >= EXPONENT_THRESHOLD) | (values <= -EXPONENT_THRESHOLD)]
+        strings = large.to_numpy(np.float64).astype(str)
+        self.max_decimals = max(1 if len(large) < len(values) else 0, _max_decimals(strings, np.char.str_len(strings)))
+    
+    def _add_floats(self, values):
+        strings = values.to_numpy(np.float64).astype(str)
+        lengths = np.char.str_len(strings)
+        self.max_decimals = _max_decimals(strings, lengths)
+        self.max_length = int(lengths.max())
+        self.all_uuid = False
+        self.all_boolean = False
+    
+    def _add_datetimes(self, values):
+        self.has_time = bool((values.dt.floor('us') != values.dt.normalize()).any())
+        # Length as str(Timestamp) writes them, for a column that turns object
+        if (values.dt.nanosecond != 0).any():
+            self.max_length = 29
+        elif (values.dt.microsecond != 0).any():
+            self.max_length = 26
+        else:
+            self.max_length = 19
+        self.all_uuid = False
+        self.all_boolean = False
+    
+    def _add_strings(self, strings):
+        # Mapping len directly is several times faster than Series.str.len
+        lengths = np.fromiter(map(len, strings.to_numpy()), dtype=np.int64, count=len(strings))
+        self.max_length = int(lengths.max())
+        # Cheap length checks rule most columns out before any pattern matching
+        self.all_uuid = bool((lengths == 36).all()) and bool(strings.str.match(UUID_PATTERN).all())
+        self.all_boolean = bool((lengths <= 5).all()) and bool(strings.str.lower().isin(BOOLEAN_STRINGS).all())
+    
+    def merge(self, other, numeric_bools=False):
+        """
+        Merge with the stats of other rows of the same column.
+        
+        Args:
+            other (ColumnStats): Stats of the other rows.
+            numeric_bools (bool): Whether booleans read as numbers next to
+                numbers, as in `merge_dtypes`.
+        
+        Returns:
+            ColumnStats: Stats of the rows of both.
+        """
+        # Empty parts do not take part in settling the dtype, as in pd.concat
+        if not other.rows:
+            dtype = self.dtype
+        elif not self.rows:
+            dtype = other.dtype
+        else:
+            dtype = merge_dtypes(self.dtype, other.dtype, numeric_bools)
+        
+        merged = ColumnStats(dtype, self.rows + other.rows)
+        merged.non_null = self.non_null + other.non_null
+        bounds = [value for value in (self.min, other.min) if value is not None]
+        merged.min = min(bounds) if bounds else None
+        bounds = [value for value in (self.max, other.max) if value is not None]
+        merged.max = max(bounds) if bounds else None
+        merged.max_decimals = max(self.max_decimals, other.max_decimals)
+        merged.max_length = max(self.max_length, other.max_length)
+        merged.has_time = self.has_time or other.has_time
+        merged.all_uuid = self.all_uuid and other.all_uuid
+        merged.all_boolean = self.all_boolean and other.all_boolean
+        return merged
+    
+    def sql_type(self):
+        """
+        Pick the SQL type of the column.
+        
+        Returns:
+            str: The SQL type.
+        """
+        # Completely empty columns
+        if not self.non_null or not isinstance(self.dtype, np.dtype):
+            return 'VARCHAR(255)'
+        
+        kind = self.dtype.kind
+        if kind in ('i', 'u'):
             # Check value ranges to determine appropriate integer type
-            min_val = non_null_sample.min()
-            max_val = non_null_sample.max()
-            
-            if min_val >= -128 and max_val <= 127:
-                sql_types[col] = 'TINYINT'
-            elif min_val >= -32768 and max_val <= 32767:
-                sql_types[col] = 'SMALLINT'
-            elif min_val >= -2147483648 and max_val <= 2147483647:
-                sql_types[col] = 'INTEGER'
-            else:
-                sql_types[col] = 'BIGINT'
+            return integer_type(self.min, self.max)[0]
         
-        # Check floating point types
-        elif np.issubdtype(dtype, np.floating):
-            # Check precision needed
-            max_decimals = non_null_sample.apply(lambda x: len(str(x).split('.')[-1]) if '.' in str(x) else 0).max()
-            if max_decimals <= 6:
-                sql_types[col] = 'FLOAT'
-            else:
-                sql_types[col] = 'DOUBLE'
+        if kind == 'f':
+            return 'FLOAT' if self.max_decimals <= 6 else 'DOUBLE'
         
-        # Check date and time
-        elif np.issubdtype(dtype, np.datetime64):
-            if (non_null_sample.dt.time != pd.Timestamp('00:00:00').time()).any():
-                sql_types[col] = 'TIMESTAMP'
-            else:
-                sql_types[col] = 'DATE'
+        if kind == 'M':
+            return 'TIMESTAMP' if self.has_time else 'DATE'
         
-        # Check string types
-        elif dtype == 'object':
-            # Sample data for string analysis
-            sample = non_null_sample.sample(min(100, len(non_null_sample))).astype(str)
-            
-            # Check if it looks like a GUID/UUID
-            uuid_pattern = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
-            if all(bool(uuid_pattern.match(x)) for x in sample):
-                sql_types[col] = 'CHAR(36)'
-                continue
-                
-            # Check if all values are True/False (boolean)
-            if set(sample.str.lower()) <= {'true', 'false', '1', '0', 'yes', 'no', 'y', 'n'}:
-                sql_types[col] = 'BOOLEAN'
-                continue
-                
-            # Calculate max length for VARCHAR
-            max_length = non_null_sample.astype(str).str.len().max()
-            
-            # If very long text, use TEXT type
-            if max_length > 255:
-                sql_types[col] = 'TEXT'
-            else:
-                # Add some buffer to max length
-                sql_types[col] = f'VARCHAR({min(max_length + 10, 255)})'
+        if kind == 'O':
+            if self.all_uuid:
+                return 'CHAR(36)'
+            if self.all_boolean:
+                return 'BOOLEAN'
+            return text_type(self.max_length)
         
         # Default fallback
-        else:
-            sql_types[col] = 'VARCHAR(255)'
+        return 'VARCHAR(255)'
+
+
+def text_type(max_length):
+    """
+    Pick the SQL type of text whose longest value has `max_length`
+    characters: VARCHAR with some room to spare, or TEXT past 255.
+    """
+    # If very long text, use TEXT type
+    if max_length > 255:
+        return 'TEXT'
+    # Add some buffer to max length
+    return f'VARCHAR({min(max_length + 10, 255)})'
+
+
+def widen_text_types(column_types, df=None):
+    """
+    Widen the length of the text types of a schema inferred from other
+    rows, such as that of another file with the same header, so that the
+    text of `df` fits. Without `df`, the text takes TEXT, of no length.
+    
+    Args:
+        column_types (dict): Column names mapped to their SQL types.
+        df (DataFrame): The rows the types must fit, or None if not known.
+    
+    Returns:
+        dict: The column types, VARCHAR(n) and CHAR(n) widened where needed.
+    """
+    widened = dict(column_types)
+    for col, sql_type in column_types.items():
+        match = re.fullmatch(r'(?:VAR)?CHAR\((\d+)\)', sql_type)
+        if not match:
+            continue
+        if df is None:
+            widened[col] = 'TEXT'
+        elif col in df.columns:
+            values = df[col].dropna()
+            longest = int(values.astype(str).str.len().max()) if len(values) else 0
+            if longest > int(match.group(1)):
+                widened[col] = text_type(longest)
+    return widened
+
+
+def integer_type(low, high):
+    """
+    Pick the narrowest integer type holding a range of values.
+    
+    Args:
+        low (int): Smallest value.
+        high (int): Largest value.
+    
+    Returns:
+        tuple: (SQL type, NumPy dtype), BIGINT and int64 for ranges no
+            type holds.
+    """
+    for sql_type, dtype in INTEGER_TYPES:
+        limits = np.iinfo(dtype)
+        if low >= limits.min and high <= limits.max:
+            return sql_type, dtype
+    return INTEGER_TYPES[-1]
+
+
+def _max_decimals(strings, lengths):
+    """Most digits after the decimal point among floats written as strings."""
+    if not len(strings):
+        return 0
+    dots = np.char.rfind(strings, '.')
+    return int(np.where(dots >= 0, lengths - dots - 1, 0).max())
+
+
+def collect_column_stats(df):
+    """
+    Collect the stats of every column of a DataFrame.
+    
+    Args:
+        df (DataFrame): The rows to summarize.
+    
+    Returns:
+        dict: Column names mapped to their ColumnStats.
+    """
+    return {col: ColumnStats.from_series(series) for col, series in df.items()}
+
+
+def merge_column_stats(left, right, numeric_bools=False):
+    """
+    Merge the column stats of two sets of rows, such as two chunks of a
+    file. A column missing from one set counts as null there.
+    
+    Args:
+        left (dict): Column stats of the first rows.
+        right (dict): Column stats of the following rows.
+        numeric_bools (bool): Whether booleans read as numbers next to
+            numbers, as in `merge_dtypes`.
+    
+    Returns:
+        dict: Column stats of all the rows.
+    """
+    left_rows = next(iter(left.values())).rows if left else 0
+    right_rows = next(iter(right.values())).rows if right else 0
+    
+    merged = {}
+    for col in list(left) + [col for col in right if col not in left]:
+        merged[col] = left.get(col, ColumnStats(rows=left_rows)).merge(right.get(col, ColumnStats(rows=right_rows)),
+                                                                       numeric_bools)
+    return merged
+
+
+def column_types_from_stats(stats):
+    """
+    Pick the SQL type of every column from its stats.
+    
+    Args:
+        stats (dict): Column names mapped to their ColumnStats.
     
-    return sql_types
\ No newline at end of file
+    Returns:
+        dict: A dictionary with column names as keys and SQL types as values.
+    """
+    return {col: column.sql_type() for col, column in stats.items()}
+
+
+def infer_column_types(df):
+    """
+    Infer SQL column types from pandas data types with more advanced detection.
+    
+    Args:
+        df (DataFrame): The dataframe to infer column types from.
+    
+    Returns:
+        dict: A dictionary with column names as keys and SQL types as values.
+    """
+    return column_types_from_stats(collect_column_stats(df))
+
+
+def merge_dtypes(left, right, numeric_bools=False):
+    """
+    Merge the pandas dtypes a column was read with in two chunks into the
+    dtype a whole-file read would have produced.
+    
+    Args:
+        left (dtype): Dtype of the column in one chunk.
+        right (dtype): Dtype of the column in another chunk.
+        numeric_bools (bool): Whether booleans read as 1 and 0 in a column
+            that also holds numbers or nulls, as pandas' Excel parser reads
+            them; otherwise such a column reads as objects, as in CSV files.
+    
+    Returns:
+        dtype: The merged dtype.
+    """
+    if left == right:
+        return left
+    kinds = 'biuf' if numeric_bools else 'iuf'
+    if isinstance(left, np.dtype) and isinstance(right, np.dtype) and left.kind in kinds and right.kind in kinds:
+        return np.result_type(left, right)
+    return np.dtype(object)
@@ -0,0 +1,34 @@
+from urllib.parse import urlsplit, parse_qsl
+from brokolisql.targets.sqlite import SQLiteTarget
+from brokolisql.exceptions import TargetNotSupported
+
+# URL schemes mapped to their target class
+TARGETS = {
+    'sqlite': SQLiteTarget,
+}
+
+def get_target(url):
+    """
+    Get a database target from a URL such as `sqlite:///data.db`.
+    
+    As with SQLAlchemy URLs, `sqlite:///data.db` is relative to the current
+    directory and `sqlite:////var/data.db` is absolute. Query parameters are
+    passed to the target as options, such as SQLite pragmas in
+    `sqlite:///data.db?journal_mode=WAL`.
+    
+    Args:
+        url (str): URL of the database
+    
+    Returns:
+        DatabaseTarget: A target loading rows into the database
+    
+    Raises:
+        TargetNotSupported: If the URL scheme is not supported
+    """
+    parts = urlsplit(url)
+    target_class = TARGETS.get(parts.scheme.lower())
+    if target_class is None or not parts.path:
+        raise TargetNotSupported(url, list(TARGETS))
+    
+    location = parts.path[1:] if parts.path.startswith('/') else parts.path
+    return target_class(location, dict(parse_qsl(parts.query)))
@@ -0,0 +1,126 @@
+from itertools import chain
+from brokolisql.dialects import get_dialect
+from brokolisql.exceptions import TargetLoadError
+from brokolisql.services.progress import progress_bar
+
+# Rows bound and sent to the driver in one executemany() call
+DEFAULT_EXECUTE_ROWS = 10000
+
+# Rows loaded between two commits
+DEFAULT_COMMIT_INTERVAL = 100000
+
+class DatabaseTarget:
+    """
+    Base class for databases loaded directly through a DB-API 2.0 driver.
+    
+    Rows are bound as parameters of a prepared INSERT and sent with
+    `executemany`, so no SQL text is generated or parsed for the values.
+    Subclasses provide the driver module and how to connect; the rest only
+    relies on DB-API, which lets other drivers plug in with a subclass.
+    
+    Attributes:
+        driver: The DB-API module of the database
+        dialect (str): Name of the dialect used for CREATE TABLE and
+            identifiers
+        location (str): Database to connect to, as given in the target URL
+        options (dict): Driver-specific options from the target URL query
+    """
+    
+    driver = None
+    dialect = 'generic'
+    
+    def __init__(self, location, options=None):
+        self.location = location
+        self.options = options or {}
+        self.connection = None
+    
+    def connect(self):
+        """Open and return a DB-API connection to the database"""
+        raise NotImplementedError
+    
+    def placeholders(self, count):
+        """Parameter markers for one row, in the driver's paramstyle"""
+        return get_dialect(self.dialect).placeholders(count, getattr(self.driver, 'paramstyle', 'qmark'))
+    
+    def insert_statement(self, table_name, columns, dialect):
+        """Create the parameterized INSERT statement for one row"""
+        cols = ', '.join([dialect.format_column_name(col) for col in columns])
+        return f"INSERT INTO {table_name} ({cols}) VALUES ({self.placeholders(len(columns))})"
+    
+    def column_parameters(self, series, dialect):
+        """
+        Convert a column into a list of Python values the driver can bind,
+        None for nulls, as `SQLDialect.parameter_column` does.
+        """
+        return dialect.parameter_column(series)
+    
+    def execute_script(self, cursor, sql):
+        """Run a statement generated by the dialect, such as CREATE TABLE"""
+        cursor.execute(sql)
+    
+    def load(self, tables, dialect, create_table=False, commit_interval=DEFAULT_COMMIT_INTERVAL,
+             execute_rows=DEFAULT_EXECUTE_ROWS, progress=True):
+        """
+        Load the rows of several tables in one connection.
+        
+        Rows are inserted with `executemany` in groups of `execute_rows` and
+        committed every `commit_interval` rows, and once more at the end.
+        On error the open transaction is rolled back.
+        
+        Args:
+            tables (iterable): (table name, column types, chunks, total rows)
+                for each table, where chunks are DataFrames of its rows
+            dialect (SQLDialect): Dialect for CREATE TABLE and identifiers
+            create_table (bool): Create each table before loading it
+            commit_interval (int): Number of rows per transaction
+            execute_rows (int): Number of rows per executemany() call
+            progress (bool): Whether to show a progress bar
+        
+        Returns:
+            int: Number of rows loaded
+        
+        Raises:
+            TargetLoadError: If the driver fails to load the rows
+        """
+        loaded = 0
+        try:
+            connection = self.connection = self.connect()
+            cursor = connection.cursor()
+            uncommitted = 0
+            for table_name, column_types, chunks, total_rows in tables:
+                if create_table:
+                    self.execute_script(cursor, dialect.create_table_statement(table_name, column_types))
+                
+                chunks = iter(chunks)
+                first = next(chunks, None)
+                if first is None:
+                    continue
+                sql = self.insert_statement(table_name, list(first.columns), dialect)
+                
+                with progress_bar(total_rows, f"Loading {table_name}", enabled=progress) as bar:
+                    for chunk in chain([first], chunks):
+                        for start in range(0, len(chunk), execute_rows):
+                            part = chunk.iloc[start:start + execute_rows]
+                            columns = [self.column_parameters(part[col], dialect) for col in part.columns]
+                            cursor.executemany(sql, list(zip(*columns)))
+                            
+                            loaded += len(part)
+                            uncommitted += len(part)
+                            bar.update(len(part))
+                            if uncommitted >= commit_interval:
+                                connection.commit()
+                                uncommitted = 0
+            connection.commit()
+        except getattr(self.driver, 'Error', ()) as e:
+            if self.connection is not None:
+                self.connection.rollback()
+            raise TargetLoadError(self.location, e)
+        finally:
+            self.close()
+        return loaded
+    
+    def close(self):
+        """Close the connection, if open"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
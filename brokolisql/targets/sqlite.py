@@ -0,0 +1,35 @@
+import sqlite3
+from brokolisql.targets.base import DatabaseTarget
+
+# Pragmas for a fast bulk load: the rollback journal is kept in memory and
+# no fsync is made per transaction. A failed load still rolls back its open
+# transaction; a crash mid-load can leave a partial database, which is
+# acceptable when the load can simply be rerun. journal_mode=OFF in the
+# target URL drops the journal too, and with it the rollback.
+FAST_LOAD_PRAGMAS = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+    'temp_store': 'MEMORY',
+    'cache_size': '-65536',
+}
+
+class SQLiteTarget(DatabaseTarget):
+    """SQLite database loaded through the standard library sqlite3 module"""
+    
+    driver = sqlite3
+    dialect = 'sqlite'
+    
+    def pragmas(self):
+        """Pragmas set on the connection: the fast-load defaults overridden by the target options"""
+        pragmas = dict(FAST_LOAD_PRAGMAS)
+        pragmas.update(self.options)
+        return pragmas
+    
+    def connect(self):
+        """Open the database file and apply the pragmas"""
+        connection = sqlite3.connect(self.location)
+        for name, value in self.pragmas().items():
+            if not name.isidentifier() or not value.replace('-', '').isalnum():
+                raise ValueError(f"Invalid SQLite pragma: {name}={value}")
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
@@ -0,0 +1,278 @@
+import ast
+import builtins
+import io
+import tokenize
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from brokolisql.exceptions import InvalidExpression
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+# numexpr's threads only pay off on long columns
+NUMEXPR_MIN_ROWS = 100000
+
+# Column dtypes numexpr computes exactly as NumPy does
+NUMEXPR_DTYPES = {np.dtype('bool'), np.dtype('int64'), np.dtype('float64')}
+
+# Operators numexpr evaluates with NumPy's semantics. Floor division and
+# modulo are left out: numexpr truncates negative integers where NumPy floors.
+NUMEXPR_OPERATORS = {
+    ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/',
+    ast.BitAnd: '&', ast.BitOr: '|', ast.Invert: '~', ast.USub: '-', ast.UAdd: '+',
+    ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.Eq: '==', ast.NotEq: '!=',
+}
+
+# Names always available to expressions
+BUILTIN_NAMES = set(dir(builtins))
+
+def _in(x, y):
+    """`x in y` of a query condition, as DataFrame.query evaluates it"""
+    try:
+        return x.isin(y)
+    except AttributeError:
+        if pd.api.types.is_list_like(x):
+            try:
+                return y.isin(x)
+            except AttributeError:
+                pass
+        return x in y
+
+def _not_in(x, y):
+    """`x not in y` of a query condition, as DataFrame.query evaluates it"""
+    try:
+        return ~x.isin(y)
+    except AttributeError:
+        if pd.api.types.is_list_like(x):
+            try:
+                return ~y.isin(x)
+            except AttributeError:
+                pass
+        return x not in y
+
+def _query_source(text):
+    """Python source of a query condition, with `&` and `|` read as `and` and `or` as DataFrame.query does"""
+    tokens = []
+    for token in tokenize.generate_tokens(io.StringIO(text.strip()).readline):
+        if token.type == tokenize.OP and token.string == '&':
+            tokens.append((tokenize.NAME, 'and'))
+        elif token.type == tokenize.OP and token.string == '|':
+            tokens.append((tokenize.NAME, 'or'))
+        else:
+            tokens.append((token.type, token.string))
+    return tokenize.untokenize(tokens)
+
+class _VectorizeCondition(ast.NodeTransformer):
+    """Rewrite a query condition into the element-wise Python it stands for"""
+    
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        operator = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(left=result, op=operator, right=value)
+        return result
+    
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+    
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        operands = [node.left] + node.comparators
+        pairs = []
+        for left, op, right in zip(operands, node.ops, operands[1:]):
+            # == and != against a list literal test membership in queries
+            listed = isinstance(left, (ast.List, ast.Tuple)) or isinstance(right, (ast.List, ast.Tuple))
+            if isinstance(op, ast.In) or (listed and isinstance(op, ast.Eq)):
+                pairs.append(ast.Call(func=ast.Name(id='__in', ctx=ast.Load()), args=[left, right], keywords=[]))
+            elif isinstance(op, ast.NotIn) or (listed and isinstance(op, ast.NotEq)):
+                pairs.append(ast.Call(func=ast.Name(id='__not_in', ctx=ast.Load()), args=[left, right], keywords=[]))
+            else:
+                pairs.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+        result = pairs[0]
+        for pair in pairs[1:]:
+            # Chained comparisons hold row by row
+            result = ast.BinOp(left=result, op=ast.BitAnd(), right=pair)
+        return result
+
+def _numexpr_source(node):
+    """numexpr source of an expression made of columns, numbers and operators, or None"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if type(node).__name__ in ('Constant', 'Num', 'NameConstant'):
+        value = getattr(node, 'value', getattr(node, 'n', None))
+        return repr(value) if isinstance(value, (bool, int, float)) else None
+    if isinstance(node, ast.BinOp) and type(node.op) in NUMEXPR_OPERATORS:
+        left, right = _numexpr_source(node.left), _numexpr_source(node.right)
+        if left is None or right is None:
+            return None
+        return f"({left} {NUMEXPR_OPERATORS[type(node.op)]} {right})"
+    if isinstance(node, ast.UnaryOp) and type(node.op) in NUMEXPR_OPERATORS:
+        operand = _numexpr_source(node.operand)
+        return None if operand is None else f"({NUMEXPR_OPERATORS[type(node.op)]}{operand})"
+    if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in NUMEXPR_OPERATORS:
+        left, right = _numexpr_source(node.left), _numexpr_source(node.comparators[0])
+        if left is None or right is None:
+            return None
+        return f"({left} {NUMEXPR_OPERATORS[type(node.ops[0])]} {right})"
+    return None
+
+def _align(series, index):
+    """A column of the input lined up with the rows of the current dataframe"""
+    if series.index is index or series.index.equals(index) or not series.index.is_unique:
+        return series
+    return series.reindex(index)
+
+class CompiledExpression:
+    """
+    An `add_column` expression or a `filter_rows` condition, parsed and
+    compiled once.
+    
+    Expressions are evaluated as Python, column by column. Their names
+    resolve to the columns of the current dataframe, then to the input
+    columns for names renamed or dropped by earlier steps, then to `pd`
+    and to `df`, the current dataframe. Conditions follow DataFrame.query:
+    `and`, `or`, `&` and `|` combine the rows, `in` and `==` against a list
+    test membership, and names are the current columns.
+    
+    When numexpr is installed, expressions made only of int64, float64 or
+    boolean columns, numbers and operators run on its multithreaded
+    kernels over long enough columns.
+    
+    Attributes:
+        text (str): The expression as written in the config
+        condition (bool): Whether it is a `filter_rows` condition
+        tree (ast.Expression): Parsed Python form of the expression
+        names (set): Free names the expression reads
+        query (bool): Whether the condition uses query-only syntax (`@`
+            local variables or backtick-quoted columns) and must run
+            through DataFrame.query
+    """
+    
+    def __init__(self, text, condition=False):
+        self.text = text
+        self.condition = condition
+        self.query = condition and ('@' in text or '`' in text)
+        self.tree = None
+        self.code = None
+        self.names = set()
+        self.numexpr_source = None
+        if self.query:
+            return
+        
+        try:
+            source = _query_source(text) if condition else text.strip()
+            tree = ast.parse(source, mode='eval')
+        except (SyntaxError, tokenize.TokenError) as e:
+            raise InvalidExpression(text, f"it is not valid syntax ({e})")
+        if condition:
+            tree = ast.fix_missing_locations(_VectorizeCondition().visit(tree))
+        
+        bound = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.arg):
+                bound.add(node.arg)
+            elif isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+                bound.add(node.id)
+        self.names = {node.id for node in ast.walk(tree)
+                      if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)} - bound - {'__in', '__not_in'}
+        self.tree = tree
+        self.code = compile(tree, '<expression>', 'eval')
+        self.numexpr_source = _numexpr_source(tree.body)
+    
+    def unknown_names(self, columns, inputs=()):
+        """Names that resolve to nothing, given the current and input columns"""
+        known = set(columns) | BUILTIN_NAMES | {'pd', 'df'}
+        if not self.condition:
+            known |= set(inputs)
+        return sorted(self.names - known)
+    
+    def _numexpr(self, df):
+        """Evaluate with numexpr when it is installed and worth it, else return None"""
+        if numexpr is None or self.numexpr_source is None or len(df) < NUMEXPR_MIN_ROWS:
+            return None
+        arrays = {}
+        for name in self.names:
+            if name not in df.columns or not isinstance(df[name], pd.Series) or df[name].dtype not in NUMEXPR_DTYPES:
+                return None
+            arrays[name] = df[name].to_numpy()
+        return pd.Series(numexpr.evaluate(self.numexpr_source, local_dict=arrays), index=df.index)
+    
+    def evaluate(self, df, inputs=None):
+        """
+        Evaluate the expression against a dataframe.
+        
+        Args:
+            df (DataFrame): The current dataframe
+            inputs (DataFrame): The input dataframe, whose columns names
+                missing from `df` fall back to
+        
+        Returns:
+            The value of the expression, usually a Series
+        
+        Raises:
+            InvalidExpression: If the expression reads an unknown name
+        """
+        result = self._numexpr(df)
+        if result is not None:
+            return result
+        
+        # Only the names the expression reads are looked up
+        scope = {'__builtins__': builtins, '__in': _in, '__not_in': _not_in}
+        for name in self.names:
+            if name in df.columns:
+                scope[name] = df[name]
+            elif not self.condition and inputs is not None and name in inputs.columns:
+                scope[name] = _align(inputs[name], df.index)
+            elif name == 'pd':
+                scope[name] = pd
+            elif name == 'df':
+                scope[name] = df
+        try:
+            return eval(self.code, scope)
+        except NameError as e:
+            raise InvalidExpression(self.text, f"{e}", list(df.columns))
+    
+    def filter(self, df):
+        """
+        Keep the rows of a dataframe for which the condition holds, as
+        DataFrame.query does.
+        
+        Args:
+            df (DataFrame): The current dataframe
+        
+        Returns:
+            DataFrame: The rows kept
+        """
+        if self.query or any(name not in df.columns and name not in BUILTIN_NAMES for name in self.names):
+            # Local variables and index names are left to DataFrame.query
+            return df.query(self.text)
+        mask = self.evaluate(df)
+        if isinstance(mask, pd.Series) and mask.dtype == bool and mask.index.equals(df.index):
+            # Taking the rows gives a frame of its own, which later steps can write to
+            return df.take(np.flatnonzero(mask.to_numpy()))
+        return df.loc[mask]
+
+@lru_cache(maxsize=1024)
+def compile_expression(text, condition=False):
+    """
+    Compile an expression or condition, reusing the compiled form of any
+    text seen before in this process.
+    
+    Args:
+        text (str): The expression
+        condition (bool): Whether it is a `filter_rows` condition
+    
+    Returns:
+        CompiledExpression: The compiled expression
+    
+    Raises:
+        InvalidExpression: If the expression is not valid syntax
+    """
+    return CompiledExpression(text, condition)
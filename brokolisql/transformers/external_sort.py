@@ -0,0 +1,215 @@
+import os
+import pickle
+import shutil
+import tempfile
+import pandas as pd
+
+# Memory used to sort rows before a sorted run is spilled to disk
+DEFAULT_SORT_MEMORY = 256 * 1024 * 1024
+
+# Rows per block of a sorted run, the unit runs are read back in while merging
+MERGE_BLOCK_ROWS = 10000
+
+class _Descending:
+    """Sort key wrapper reversing the order of a value"""
+    
+    __slots__ = ('value',)
+    
+    def __init__(self, value):
+        self.value = value
+    
+    def __lt__(self, other):
+        return other.value < self.value
+    
+    def __eq__(self, other):
+        return self.value == other.value
+
+def sort_frame(df, columns, ascending=True):
+    """
+    Sort a dataframe as the `sort` step does, keeping the order of rows
+    with equal keys.
+    
+    Args:
+        df (DataFrame): The rows to sort
+        columns (list): Columns to sort by
+        ascending (bool or list): Sort order, overall or per column
+    
+    Returns:
+        DataFrame: The sorted rows, missing values last
+    """
+    return df.sort_values(by=columns, ascending=ascending, kind='stable', na_position='last')
+
+class ExternalSort:
+    """
+    Sort of a stream of chunks too large to hold in memory.
+    
+    Chunks are gathered until they take up about `memory` bytes, as
+    measured on the first chunk, then sorted and written to a temporary
+    file as a sorted run, in blocks of `MERGE_BLOCK_ROWS` rows pickled one
+    after the other. The runs are then
+    merged block by block: the run whose buffered block ends on the
+    smallest key bounds the rows that can safely come out, and only those
+    rows are sorted together. Input that fits in memory is sorted there
+    without touching the disk.
+    
+    The order matches `DataFrame.sort_values` with a stable sort: missing
+    values last, and rows with equal keys in input order.
+    
+    Attributes:
+        columns (list): Columns to sort by
+        ascending (list): Whether each column sorts in ascending order
+        memory (int): Bytes of rows sorted in memory per run
+        spill_dir (str): Directory of the run files, or None for the
+            system temporary directory
+    """
+    
+    def __init__(self, columns, ascending=True, memory=DEFAULT_SORT_MEMORY, spill_dir=None):
+        self.columns = [columns] if isinstance(columns, str) else list(columns)
+        if isinstance(ascending, bool):
+            ascending = [ascending] * len(self.columns)
+        if len(ascending) != len(self.columns):
+            raise ValueError(f"Length of ascending ({len(ascending)}) != length of columns ({len(self.columns)})")
+        self.ascending = list(ascending)
+        self.memory = memory
+        self.spill_dir = spill_dir
+        self.spill_path = None
+    
+    def _sort(self, df):
+        return sort_frame(df, self.columns, self.ascending)
+    
+    def _key(self, arrays, i):
+        """Comparable key of row `i`, ordered the way the rows are sorted"""
+        key = []
+        for values, ascending in zip(arrays, self.ascending):
+            value = values[i]
+            if pd.isna(value):
+                # Missing values go last whatever the direction
+                key.append((1, 0))
+            else:
+                key.append((0, value if ascending else _Descending(value)))
+        return tuple(key)
+    
+    def _bisect(self, arrays, length, bound, right):
+        """Number of leading rows whose key is below `bound` (or equal, with `right`)"""
+        lo, hi = 0, length
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key = self._key(arrays, mid)
+            if key < bound or (right and key == bound):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
+    def _write_run(self, frames, number):
+        """Sort the gathered chunks and write them out as a run"""
+        if self.spill_path is None:
+            self.spill_path = tempfile.mkdtemp(prefix='brokolisql-sort-', dir=self.spill_dir)
+        run = self._sort(pd.concat(frames) if len(frames) > 1 else frames[0])
+        path = os.path.join(self.spill_path, f"run-{number}.pkl")
+        with open(path, 'wb') as f:
+            for start in range(0, len(run), MERGE_BLOCK_ROWS):
+                pickle.dump(run.iloc[start:start + MERGE_BLOCK_ROWS], f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+    
+    @staticmethod
+    def _read_blocks(path):
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+    
+    def _merge(self, paths):
+        """K-way merge of sorted runs, yielding sorted batches of rows"""
+        readers = [self._read_blocks(path) for path in paths]
+        buffers = [next(reader, None) for reader in readers]
+        # A run holding no rows takes no part in the merge
+        readers = [reader for reader, buffer in zip(readers, buffers) if buffer is not None]
+        buffers = [buffer for buffer in buffers if buffer is not None]
+        more = [True] * len(buffers)
+        
+        while any(more):
+            arrays = [[buffer[col].to_numpy() for col in self.columns] for buffer in buffers]
+            # The run whose buffer ends lowest, ties going to the earlier run
+            bound, b = min((self._key(arrays[r], len(buffers[r]) - 1), r)
+                           for r in range(len(buffers)) if more[r])
+            
+            pieces = []
+            for r, buffer in enumerate(buffers):
+                if r == b:
+                    split = len(buffer)
+                else:
+                    # Equal keys come out in run order, which keeps the sort stable
+                    split = self._bisect(arrays[r], len(buffer), bound, right=r < b)
+                if split:
+                    pieces.append(buffer.iloc[:split])
+                    buffers[r] = buffer.iloc[split:]
+            yield self._sort(pd.concat(pieces))
+            
+            block = next(readers[b], None)
+            if block is None:
+                more[b] = False
+            else:
+                buffers[b] = block
+        
+        rest = [buffer for buffer in buffers if len(buffer)]
+        if rest:
+            yield self._sort(pd.concat(rest))
+    
+    def sort(self, chunks):
+        """
+        Sort a stream of chunks.
+        
+        Args:
+            chunks (iterable): DataFrames sharing the same columns
+        
+        Yields:
+            DataFrame: The rows in sorted order, in chunks
+        """
+        try:
+            frames, rows, paths = [], 0, []
+            run_rows = None
+            empty = None
+            for chunk in chunks:
+                if not len(chunk):
+                    # Chunks emptied by a filter are left out of the runs
+                    empty = chunk if empty is None else empty
+                    continue
+                if run_rows is None:
+                    # Measuring every chunk in depth would cost about as much as sorting it
+                    bytes_per_row = chunk.memory_usage(index=True, deep=True).sum() / len(chunk)
+                    run_rows = max(1, int(self.memory // bytes_per_row))
+                frames.append(chunk)
+                rows += len(chunk)
+                if run_rows is not None and rows >= run_rows:
+                    paths.append(self._write_run(frames, len(paths)))
+                    frames, rows = [], 0
+            
+            if not paths:
+                if frames or empty is not None:
+                    frames = frames or [empty]
+                    yield self._sort(pd.concat(frames) if len(frames) > 1 else frames[0])
+                return
+            if frames:
+                paths.append(self._write_run(frames, len(paths)))
+            
+            # Batches as small as a row can come out of the merge
+            batch, rows = [], 0
+            for rows_out in self._merge(paths):
+                batch.append(rows_out)
+                rows += len(rows_out)
+                if rows >= MERGE_BLOCK_ROWS:
+                    yield pd.concat(batch)
+                    batch, rows = [], 0
+            if batch:
+                yield pd.concat(batch)
+        finally:
+            self.close()
+    
+    def close(self):
+        """Remove the run files, if any"""
+        if self.spill_path is not None:
+            shutil.rmtree(self.spill_path, ignore_errors=True)
+            self.spill_path = None
@@ -0,0 +1,510 @@
+import ast
+from operator import methodcaller
+import numpy as np
+import pandas as pd
+from brokolisql.exceptions import InvalidExpression
+from brokolisql.services import metrics
+from brokolisql.transformers.expressions import compile_expression
+from brokolisql.transformers.transform_engine import apply_transform
+
+# `apply_function` functions, which map to the .str method of the same name
+STRING_FUNCTIONS = {'upper', 'lower', 'strip', 'title', 'capitalize'}
+
+# Series methods whose result for a row only depends on that row
+ELEMENTWISE_METHODS = {
+    'abs', 'astype', 'between', 'clip', 'fillna', 'isin', 'isna', 'isnull', 'map', 'notna', 'notnull',
+    'replace', 'round',
+}
+
+# pandas functions that work value by value
+ELEMENTWISE_FUNCTIONS = {
+    'Timedelta', 'Timestamp', 'isna', 'isnull', 'notna', 'notnull', 'to_datetime', 'to_numeric', 'to_timedelta',
+}
+
+def _literal(node):
+    """Whether an AST node is a literal such as a constant, list or slice of constants"""
+    if isinstance(node, ast.Slice):
+        return all(part is None or _literal(part) for part in (node.lower, node.upper, node.step))
+    if type(node).__name__ == 'Index':
+        # Subscripts are wrapped in ast.Index before Python 3.9
+        return _literal(node.value)
+    try:
+        ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return False
+    return True
+
+def _subscript_key(node):
+    """The literal value of a subscript, or None"""
+    key = node.slice
+    if type(key).__name__ == 'Index':
+        key = key.value
+    try:
+        return ast.literal_eval(key)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+
+class Expression:
+    """
+    What an `add_column` expression or a `filter_rows` condition reads,
+    given the columns current at its step.
+    
+    Attributes:
+        text (str): The expression
+        compiled (CompiledExpression): Its compiled form
+        refs (set): Names of the current columns it reads
+        fallbacks (set): Input columns it reads by names that are no
+            longer current
+        reads_frame (bool): Whether it may read any current column,
+            through `df` or query-only syntax
+        elementwise (bool): Whether the value for a row only depends on
+            that row, so it can be computed on any subset of the rows
+    
+    Raises:
+        InvalidExpression: If it reads a name that is neither a current
+            column, an input column nor a builtin
+    """
+    
+    def __init__(self, compiled, columns, inputs):
+        self.text = compiled.text
+        self.compiled = compiled
+        self.refs = set()
+        self.fallbacks = set()
+        self.reads_frame = compiled.query
+        self.elementwise = False
+        if compiled.query:
+            return
+        
+        unknown = compiled.unknown_names(columns, inputs)
+        if compiled.condition:
+            # DataFrame.query also resolves the index by name
+            unknown = [name for name in unknown if name != 'index']
+        if unknown:
+            raise InvalidExpression(self.text, f"unknown name {', '.join(unknown)}", columns)
+        
+        self.refs = {name for name in compiled.names if name in columns}
+        if not compiled.condition:
+            self.fallbacks = {name for name in compiled.names if name not in columns and name in inputs}
+        if 'df' in compiled.names and 'df' not in columns:
+            # The current dataframe, only followed when a column is read from it
+            parents = {child: node for node in ast.walk(compiled.tree) for child in ast.iter_child_nodes(node)}
+            for node in ast.walk(compiled.tree):
+                if isinstance(node, ast.Name) and node.id == 'df':
+                    column = self._df_column(parents.get(node), columns)
+                    if column is None:
+                        self.reads_frame = True
+                    else:
+                        self.refs.add(column)
+        
+        self.elementwise = compiled.condition or self._kind(compiled.tree.body, columns) in ('series', 'scalar')
+    
+    @staticmethod
+    def _df_column(node, columns):
+        """Column read by a `df['X']` or `df.X` node, or None"""
+        if isinstance(node, ast.Subscript):
+            column = _subscript_key(node)
+        elif isinstance(node, ast.Attribute) and not hasattr(pd.DataFrame, node.attr):
+            column = node.attr
+        else:
+            return None
+        return column if column in columns else None
+    
+    def _kind(self, node, columns):
+        """
+        Kind of value a node evaluates to when it works row by row:
+        'series', 'scalar', 'pd', 'df', 'str' or 'dt' (accessors), or None
+        when it does not.
+        """
+        if _literal(node):
+            return 'scalar'
+        
+        if isinstance(node, ast.Name):
+            return node.id if node.id in ('pd', 'df') else 'series'
+        
+        if isinstance(node, ast.Subscript):
+            value = self._kind(node.value, columns)
+            if value == 'df':
+                return 'series' if self._df_column(node, columns) else None
+            if value == 'str' and _literal(node.slice):
+                return 'series'
+            return None
+        
+        if isinstance(node, ast.Attribute):
+            value = self._kind(node.value, columns)
+            if value == 'df':
+                return 'series' if self._df_column(node, columns) else None
+            if value == 'series' and node.attr in ('str', 'dt'):
+                return node.attr
+            if value == 'dt':
+                return 'series'
+            if value == 'scalar':
+                return 'scalar'
+            return None
+        
+        if isinstance(node, ast.Call):
+            arguments = [self._kind(arg, columns) for arg in node.args]
+            arguments += [self._kind(keyword.value, columns) for keyword in node.keywords]
+            if any(kind not in ('series', 'scalar') for kind in arguments):
+                return None
+            if not isinstance(node.func, ast.Attribute):
+                return None
+            
+            owner = self._kind(node.func.value, columns)
+            method = node.func.attr
+            if owner == 'pd' and method in ELEMENTWISE_FUNCTIONS:
+                return 'series' if 'series' in arguments else 'scalar'
+            if owner == 'str' and method != 'cat':
+                return 'series'
+            if owner == 'dt':
+                return 'series'
+            if owner == 'series' and method in ELEMENTWISE_METHODS:
+                # fillna(method='ffill') carries values across rows
+                if any(keyword.arg == 'method' for keyword in node.keywords):
+                    return None
+                return 'series'
+            if owner == 'scalar':
+                return 'scalar'
+            return None
+        
+        if isinstance(node, (ast.BinOp, ast.UnaryOp, ast.Compare)):
+            if isinstance(node, ast.BinOp):
+                operands = [node.left, node.right]
+            elif isinstance(node, ast.UnaryOp):
+                operands = [node.operand]
+            else:
+                operands = [node.left] + node.comparators
+            kinds = [self._kind(operand, columns) for operand in operands]
+            if any(kind not in ('series', 'scalar') for kind in kinds):
+                return None
+            return 'series' if 'series' in kinds else 'scalar'
+        
+        return None
+
+class Step:
+    """A step of a transformation plan, running one or more config steps"""
+    
+    def __init__(self, transforms):
+        self.transforms = transforms
+    
+    def apply(self, df, inputs):
+        """Run the step and return the transformed dataframe"""
+        for transform in self.transforms:
+            df = apply_transform(df, transform, inputs)
+        return df
+    
+    def describe(self):
+        """One-line description of the step"""
+        return '; '.join(_describe_transform(transform) for transform in self.transforms)
+
+class RelabelStep(Step):
+    """`rename_columns` done by relabelling a shallow copy instead of copying the data"""
+    
+    def apply(self, df, inputs):
+        mapping = self.transforms[0].get('mapping', {})
+        df = df.copy(deep=False)
+        df.columns = [mapping.get(col, col) for col in df.columns]
+        return df
+    
+    def describe(self):
+        mapping = self.transforms[0].get('mapping', {})
+        return 'relabel ' + ', '.join(f"{old} -> {new}" for old, new in mapping.items())
+
+class AddColumnStep(Step):
+    """
+    `add_column` with an element-wise expression. After a filter has been
+    moved ahead of it, the expression is only computed for the rows kept.
+    """
+    
+    def __init__(self, transforms, expression):
+        super().__init__(transforms)
+        self.expression = expression
+        self.restricted = False
+    
+    def describe(self):
+        suffix = ' (on the filtered rows)' if self.restricted else ''
+        return super().describe() + suffix
+
+class FusedStringStep(Step):
+    """Consecutive `apply_function` string steps on a column, done in one pass over its values"""
+    
+    def apply(self, df, inputs):
+        column = self.transforms[0]['column']
+        series = df[column]
+        if series.dtype != object:
+            return super().apply(df, inputs)
+        
+        # Validate like the .str accessor, which rejects non-string columns
+        series.str
+        functions = [methodcaller(transform['function']) for transform in self.transforms]
+        
+        def fused(value):
+            # As with .str methods, values without the method become NaN
+            try:
+                for function in functions:
+                    value = function(value)
+            except (TypeError, AttributeError):
+                return np.nan
+            return value
+        
+        values = series.to_numpy()
+        missing = pd.isna(values)
+        result = np.empty(len(values), dtype=object)
+        result[:] = [value if is_missing else fused(value) for value, is_missing in zip(values, missing)]
+        df[column] = pd.Series(result, index=series.index, name=series.name)
+        return df
+    
+    def describe(self):
+        functions = ' -> '.join(transform['function'] for transform in self.transforms)
+        return f"apply_function {self.transforms[0]['column']}: {functions} (fused)"
+
+def _describe_transform(transform):
+    """One-line description of a config step"""
+    transform_type = transform.get('type')
+    details = {key: value for key, value in transform.items() if key != 'type'}
+    if transform_type == 'filter_rows':
+        return f"filter_rows {details.get('condition', '')}"
+    if transform_type == 'add_column':
+        return f"add_column {details.get('name', '')} = {details.get('expression', '')}"
+    if transform_type == 'drop_columns':
+        return f"drop_columns {', '.join(details.get('columns', []))}"
+    if transform_type == 'apply_function':
+        return f"apply_function {details.get('column', '')}: {details.get('function', '')}"
+    return f"{transform_type} " + ', '.join(f"{key}={value!r}" for key, value in details.items())
+
+def _follow(current, transform):
+    """
+    Columns after a config step, as [current name, input column or None]
+    pairs, or None once they can no longer be followed.
+    """
+    transform_type = transform.get('type')
+    if transform_type == 'rename_columns':
+        mapping = transform.get('mapping', {})
+        current = [[mapping.get(name, name), origin] for name, origin in current]
+        if len({name for name, _ in current}) < len(current):
+            # Duplicate names make columns impossible to follow
+            return None
+    elif transform_type == 'drop_columns':
+        dropped = set(transform.get('columns', []))
+        current = [entry for entry in current if entry[0] not in dropped]
+    elif transform_type == 'add_column' and transform.get('name') and transform.get('expression'):
+        name = transform['name']
+        if any(entry[0] == name for entry in current):
+            current = [[entry[0], None if entry[0] == name else entry[1]] for entry in current]
+        else:
+            current = current + [[name, None]]
+    elif transform_type == 'aggregate':
+        return None
+    return current
+
+def _read_columns(transform):
+    """Columns of the current dataframe a non-expression config step reads"""
+    transform_type = transform.get('type')
+    if transform_type in ('change_type', 'replace_values', 'apply_function'):
+        return [transform.get('column', '')]
+    if transform_type == 'sort':
+        return list(transform.get('columns', []))
+    return []
+
+class Plan:
+    """
+    Optimized plan of a transformation config.
+    
+    Attributes:
+        columns (list): Columns of the input the plan was compiled for
+        exclude_columns (list): Input columns that need not be read at all
+        steps (list): Steps to run in order
+        rewrites (list): Descriptions of the optimizations applied
+    """
+    
+    def __init__(self, columns, exclude_columns, steps, rewrites):
+        self.columns = columns
+        self.exclude_columns = exclude_columns
+        self.steps = steps
+        self.rewrites = rewrites
+    
+    def explain(self):
+        """Describe the plan as printed by `--explain`"""
+        lines = ['Transformation plan:']
+        if self.exclude_columns:
+            lines.append(f"  0. scan, skipping columns {', '.join(self.exclude_columns)}")
+        else:
+            lines.append('  0. scan all columns')
+        for i, step in enumerate(self.steps, 1):
+            lines.append(f"  {i}. {step.describe()}")
+        lines.append('Rewrites:')
+        lines.extend(f"  - {rewrite}" for rewrite in self.rewrites or ['none'])
+        return '\n'.join(lines)
+
+def compile_plan(config, columns=None):
+    """
+    Compile a transformation config into an optimized plan.
+    
+    Every `add_column` expression and `filter_rows` condition is parsed
+    once and checked against the columns current at its step, so an
+    unknown name fails before any row is transformed. The optimizer then:
+    
+    - pushes `drop_columns` down into the reader for input columns nothing
+      reads, so they are never loaded,
+    - runs `rename_columns` as a relabelling, without copying the data,
+    - moves `filter_rows` ahead of the `add_column` steps it does not
+      depend on, so their expressions only compute the rows kept,
+    - fuses consecutive string `apply_function` steps on one column.
+    
+    A rewrite is only made when the expressions involved can be analyzed
+    and the plan gives the same result as running the steps in order.
+    
+    Args:
+        config (dict): Transformation config, as loaded by `load_config`
+        columns (list): Column names of the input, if known
+    
+    Returns:
+        Plan: The compiled plan
+    
+    Raises:
+        InvalidExpression: If an expression is not valid syntax or reads
+            an unknown name
+    """
+    transforms = list(config.get('transformations', []))
+    plain = Plan(columns, [], [Step([transform]) for transform in transforms], [])
+    if columns is None or 'pd' in columns or 'df' in columns:
+        return plain
+    
+    # Follow the columns through the steps, as current name and input column,
+    # checking each expression against the columns current at its step
+    expressions = {}
+    fallback_refs = set()
+    current = [[col, col] for col in columns]
+    for i, transform in enumerate(transforms):
+        if transform.get('type') == 'add_column' and transform.get('name') and transform.get('expression'):
+            compiled = compile_expression(transform['expression'])
+        elif transform.get('type') == 'filter_rows' and transform.get('condition'):
+            compiled = compile_expression(transform['condition'], condition=True)
+        else:
+            compiled = None
+        
+        if compiled is not None and current is not None:
+            expressions[i] = Expression(compiled, [name for name, _ in current], columns)
+            fallback_refs |= expressions[i].fallbacks
+        elif compiled is not None and not compiled.condition:
+            # Past an aggregate any input column name may be read
+            fallback_refs |= compiled.names & set(columns)
+        if current is not None:
+            current = _follow(current, transform)
+    
+    # Follow them again to find the input columns dropped before being read
+    current = [[col, col] for col in columns]
+    read = set()
+    excluded = []
+    steps = []
+    rewrites = []
+    
+    for i, transform in enumerate(transforms):
+        transform_type = transform.get('type')
+        origins = {name: origin for name, origin in current} if current is not None else {}
+        
+        if transform_type == 'rename_columns':
+            steps.append(RelabelStep([transform]))
+        elif transform_type == 'add_column' and i in expressions and expressions[i].elementwise:
+            steps.append(AddColumnStep([transform], expressions[i]))
+        elif transform_type == 'drop_columns' and current is not None:
+            kept = []
+            pushed = []
+            for name in transform.get('columns', []):
+                matches = [entry for entry in current if entry[0] == name]
+                origin = matches[0][1] if len(matches) == 1 else None
+                if origin is not None and origin not in read and origin not in fallback_refs:
+                    pushed.append(origin)
+                else:
+                    kept.append(name)
+            excluded.extend(pushed)
+            if pushed:
+                rewrites.append(f"pushed drop_columns {', '.join(pushed)} down into the reader")
+            if kept:
+                steps.append(Step([dict(transform, columns=kept)]))
+        else:
+            steps.append(Step([transform]))
+        
+        # Track what the step reads and how it changes the columns
+        if current is not None:
+            if i in expressions:
+                read |= {origins[ref] for ref in expressions[i].refs if origins.get(ref)}
+                if expressions[i].reads_frame:
+                    read |= {origin for origin in origins.values() if origin}
+            else:
+                read |= {origins[name] for name in _read_columns(transform) if origins.get(name)}
+            current = _follow(current, transform)
+    
+    if any(isinstance(step, RelabelStep) for step in steps):
+        rewrites.append('rename_columns relabels the columns without copying the data')
+    steps = _hoist_filters(steps, expressions, transforms, rewrites)
+    steps = _fuse_string_steps(steps, rewrites)
+    return Plan(columns, excluded, steps, rewrites)
+
+def _hoist_filters(steps, expressions, transforms, rewrites):
+    """Move filters ahead of the element-wise computed columns they do not read"""
+    conditions = {id(transforms[i]): expression for i, expression in expressions.items()
+                  if transforms[i].get('type') == 'filter_rows' and not expression.reads_frame}
+    hoisted = []
+    for step in steps:
+        condition = conditions.get(id(step.transforms[0])) if len(step.transforms) == 1 else None
+        position = len(hoisted)
+        if condition is not None and type(step) is Step:
+            while position and isinstance(hoisted[position - 1], AddColumnStep) \
+                    and hoisted[position - 1].transforms[0]['name'] not in condition.refs:
+                position -= 1
+        if position < len(hoisted):
+            crossed = hoisted[position:]
+            for add_step in crossed:
+                add_step.restricted = True
+            names = ', '.join(add_step.transforms[0]['name'] for add_step in crossed)
+            rewrites.append(f"moved filter_rows {condition.text} ahead of add_column {names}")
+        hoisted.insert(position, step)
+    return hoisted
+
+def _fuse_string_steps(steps, rewrites):
+    """Fuse runs of string `apply_function` steps on the same column"""
+    def fusable(step):
+        transform = step.transforms[0]
+        return type(step) is Step and len(step.transforms) == 1 \
+            and transform.get('type') == 'apply_function' and transform.get('column') \
+            and transform.get('function') in STRING_FUNCTIONS
+    
+    fused = []
+    for step in steps:
+        previous = fused[-1] if fused else None
+        if previous is not None and fusable(step) and (isinstance(previous, FusedStringStep) or fusable(previous)) \
+                and previous.transforms[0]['column'] == step.transforms[0]['column']:
+            fused[-1] = FusedStringStep(previous.transforms + step.transforms)
+        else:
+            fused.append(step)
+    
+    for step in fused:
+        if isinstance(step, FusedStringStep):
+            rewrites.append(f"fused {step.describe()[:-len(' (fused)')]}")
+    return fused
+
+def execute_plan(plan, df):
+    """
+    Run a compiled plan on a dataframe.
+    
+    Args:
+        plan (Plan): Plan from `compile_plan`
+        df (DataFrame): The dataframe to transform, with or without the
+            columns the plan excludes
+    
+    Returns:
+        DataFrame: The transformed dataframe
+    """
+    # Excluded columns are normally not read at all
+    excluded = [col for col in plan.exclude_columns if col in df.columns]
+    if excluded:
+        df = df.drop(columns=excluded)
+    
+    # Steps replace the columns of df rather than writing into them, so a
+    # shallow copy keeps the input columns for expressions to fall back to
+    inputs = df.copy(deep=False)
+    for number, step in enumerate(plan.steps, 1):
+        # Timed step by step, as numbered in the plan's explanation
+        with metrics.stage(f"transform {number}: {step.describe()}", len(df)):
+            df = step.apply(df, inputs)
+    return df
@@ -0,0 +1,281 @@
+import os
+import pickle
+import shutil
+import tempfile
+import pandas as pd
+from brokolisql.exceptions import TransformNotStreamable
+from brokolisql.services import metrics
+from brokolisql.transformers.transform_engine import ROW_LOCAL_TRANSFORMS, apply_transformations
+from brokolisql.transformers.plan import compile_plan, execute_plan
+from brokolisql.transformers.external_sort import ExternalSort, DEFAULT_SORT_MEMORY
+
+# Aggregations a streaming group-by can compute from per-chunk partial results
+STREAMING_AGGREGATIONS = {'sum', 'count', 'min', 'max', 'mean'}
+
+# Partial statistics kept for each aggregation, and how partials of each merge
+PARTIAL_STATISTICS = {
+    'sum': ('sum',),
+    'count': ('count',),
+    'min': ('min',),
+    'max': ('max',),
+    'mean': ('sum', 'count'),
+}
+MERGE_FUNCTIONS = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+# Groups held in memory by a streaming aggregate before its partials spill to disk
+DEFAULT_SPILL_GROUPS = 1000000
+
+# Number of files spilled partials are hash-partitioned into
+SPILL_PARTITIONS = 16
+
+def _needs_all_rows(transform):
+    """Whether a config step needs the whole input rather than one chunk"""
+    if transform.get('type') == 'aggregate':
+        return bool(transform.get('group_by'))
+    if transform.get('type') == 'sort':
+        return bool(transform.get('columns'))
+    return False
+
+def _split(transforms):
+    """Split config steps around the first one that needs all the rows"""
+    for i, transform in enumerate(transforms):
+        if _needs_all_rows(transform):
+            return transforms[:i], transform, transforms[i + 1:]
+    return transforms, None, []
+
+def _unsupported_steps(transforms):
+    """Steps of a config that cannot run in streaming mode"""
+    head, barrier, tail = _split(transforms)
+    # Sorts and aggregates without columns do nothing
+    unsupported = [t.get('type') for t in head
+                   if t.get('type') not in ROW_LOCAL_TRANSFORMS and t.get('type') not in ('aggregate', 'sort')]
+    if barrier is not None and barrier.get('type') == 'aggregate':
+        aggregations = barrier.get('aggregations', {})
+        if isinstance(aggregations, dict):
+            functions = sorted({func for funcs in aggregations.values() for func in _functions(funcs)})
+        else:
+            functions = [str(aggregations)]
+        unsupported += [f"aggregate ({func})" for func in functions if func not in STREAMING_AGGREGATIONS]
+    elif barrier is not None:
+        # Steps after a sort keep streaming
+        unsupported += _unsupported_steps(tail)
+    return unsupported
+
+def split_streaming(config):
+    """
+    Split a transformation config for streaming: the row-local steps that
+    run chunk by chunk, the first step that needs all the rows (an
+    `aggregate` or a `sort`), and the steps after it. Steps after an
+    aggregate run on the aggregated rows; steps after a sort are split
+    again, and keep streaming over the sorted rows.
+    
+    Args:
+        config (dict): The transformation config
+    
+    Returns:
+        tuple: (config of the row-local steps, aggregate or sort step or
+            None, config of the remaining steps or None)
+    
+    Raises:
+        TransformNotStreamable: If a step before the aggregate or sort is
+            not row-local, or an aggregate uses functions that cannot be
+            merged across chunks
+    """
+    transforms = config.get('transformations', [])
+    unsupported = _unsupported_steps(transforms)
+    if unsupported:
+        raise TransformNotStreamable(unsupported)
+    
+    head, barrier, tail = _split(transforms)
+    return {'transformations': head}, barrier, {'transformations': tail} if tail else None
+
+def _functions(funcs):
+    """Aggregation functions of a column, given as one name or a list"""
+    return [funcs] if isinstance(funcs, str) else list(funcs)
+
+class StreamingAggregate:
+    """
+    Two-phase group-by of an `aggregate` step over a stream of chunks.
+    
+    Each chunk is reduced to partial statistics per group (sums, non-null
+    counts, minimums and maximums; a mean is kept as a sum and a count),
+    and partials are merged as they pile up. Once more than `spill_groups`
+    groups are held in memory, the partials are hash-partitioned by group
+    key into files in `spill_dir`; each partition is merged on its own at
+    the end, so at most one partition of groups is loaded at a time.
+    
+    The result matches `df.groupby(group_by).agg(aggregations).reset_index()`
+    over all the rows at once: groups sorted by key, rows with a missing
+    key left out.
+    
+    Attributes:
+        group_by (list): Columns to group by
+        aggregations (dict): Aggregation function, or list of them, per column
+        spill_groups (int): Number of groups kept in memory before spilling
+        spill_dir (str): Directory of the spill files, or None for the
+            system temporary directory
+    """
+    
+    def __init__(self, group_by, aggregations, spill_groups=DEFAULT_SPILL_GROUPS, spill_dir=None):
+        self.group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+        self.aggregations = aggregations
+        self.spill_groups = spill_groups
+        self.spill_dir = spill_dir
+        
+        self.outputs = [(column, func) for column, funcs in aggregations.items() for func in _functions(funcs)]
+        self.statistics = list(dict.fromkeys((column, stat) for column, func in self.outputs
+                                             for stat in PARTIAL_STATISTICS[func]))
+        self.partials = []
+        self.held = 0
+        self.empty = None
+        self.spill_path = None
+    
+    def add(self, chunk):
+        """Fold the partial statistics of a chunk into the running state"""
+        named = {f"{column}\x1f{stat}": (column, stat) for column, stat in self.statistics}
+        partial = chunk.groupby(self.group_by, sort=False).agg(**named)
+        if not len(partial):
+            # Empty partials would lose the dtypes of the others when concatenated
+            self.empty = partial
+            return
+        self.partials.append(partial)
+        self.held += len(partial)
+        if self.held > 2 * max(len(self.partials[0]), 1) and len(self.partials) > 1:
+            # Merging keeps the state at about one row per group seen
+            self.partials = [self._merge(self.partials)]
+            self.held = len(self.partials[0])
+        if self.held > self.spill_groups:
+            self._spill()
+    
+    def _merge(self, partials):
+        merge = {f"{column}\x1f{stat}": MERGE_FUNCTIONS[stat] for column, stat in self.statistics}
+        merged = pd.concat(partials)
+        return merged.groupby(level=list(range(len(self.group_by))), sort=False).agg(merge)
+    
+    def _partition_path(self, partition):
+        return os.path.join(self.spill_path, f"partition-{partition}.pkl")
+    
+    def _spill(self):
+        """Append the partials held in memory to the partition files"""
+        if self.spill_path is None:
+            self.spill_path = tempfile.mkdtemp(prefix='brokolisql-aggregate-', dir=self.spill_dir)
+        merged = self._merge(self.partials) if len(self.partials) > 1 else self.partials[0]
+        partitions = pd.util.hash_pandas_object(merged.index, index=False).to_numpy() % SPILL_PARTITIONS
+        for partition, part in merged.groupby(partitions, sort=False):
+            with open(self._partition_path(partition), 'ab') as f:
+                pickle.dump(part, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.partials = []
+        self.held = 0
+    
+    def _spilled_partitions(self):
+        """Merge the partials of each partition file in turn"""
+        for partition in range(SPILL_PARTITIONS):
+            path = self._partition_path(partition)
+            if not os.path.exists(path):
+                continue
+            parts = []
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        parts.append(pickle.load(f))
+                    except EOFError:
+                        break
+            yield self._merge(parts)
+    
+    def result(self):
+        """
+        Merge all partial statistics into the aggregated rows.
+        
+        Returns:
+            DataFrame: One row per group
+        """
+        try:
+            if self.spill_path is not None:
+                if self.partials:
+                    self._spill()
+                merged = pd.concat(list(self._spilled_partitions()))
+            elif self.partials:
+                merged = self._merge(self.partials)
+            else:
+                merged = self.empty
+        finally:
+            self.close()
+        merged = merged.sort_index()
+        
+        columns = {}
+        for column, func in self.outputs:
+            if func == 'mean':
+                values = merged[f"{column}\x1fsum"] / merged[f"{column}\x1fcount"]
+            else:
+                values = merged[f"{column}\x1f{PARTIAL_STATISTICS[func][0]}"]
+            columns[(column, func)] = values
+        df = pd.DataFrame(columns, index=merged.index)
+        if all(isinstance(funcs, str) for funcs in self.aggregations.values()):
+            # As with DataFrame.agg, single functions keep the column name alone
+            df.columns = [column for column, _ in self.outputs]
+        return df.reset_index()
+    
+    def close(self):
+        """Remove the spill files, if any"""
+        if self.spill_path is not None:
+            shutil.rmtree(self.spill_path, ignore_errors=True)
+            self.spill_path = None
+
+def stream_transformations(chunks, plan, barrier=None, tail=None, spill_groups=DEFAULT_SPILL_GROUPS,
+                           spill_dir=None, sort_memory=DEFAULT_SORT_MEMORY):
+    """
+    Apply transformations to a stream of chunks, as split by
+    `split_streaming`.
+    
+    The row-local steps of `plan` run on each chunk as it is read. An
+    `aggregate` step folds the chunks into a streaming group-by, and the
+    aggregated rows, transformed by the `tail` steps, come out once the
+    input is exhausted. A `sort` step runs as an external merge sort, and
+    the `tail` steps stream over its output.
+    
+    Args:
+        chunks (iterable): DataFrames sharing the same columns
+        plan (Plan): Compiled plan of the row-local steps
+        barrier (dict): The `aggregate` or `sort` step, or None
+        tail (dict): Config of the steps after it, or None
+        spill_groups (int): Number of groups an aggregate keeps in memory
+            before spilling partial results to disk
+        spill_dir (str): Directory of the spill files and sorted runs
+        sort_memory (int): Bytes of rows a sort holds in memory per run
+    
+    Yields:
+        DataFrame: Transformed chunks
+    """
+    chunks = (execute_plan(plan, chunk) for chunk in chunks)
+    if barrier is None:
+        yield from chunks
+        return
+    
+    if barrier['type'] == 'sort':
+        sorter = ExternalSort(barrier['columns'], barrier.get('ascending', True), sort_memory, spill_dir)
+        chunks = metrics.track(sorter.sort(chunks), 'transform sort')
+        if not tail:
+            yield from chunks
+            return
+        head, barrier, tail = split_streaming(tail)
+        yield from stream_transformations(chunks, compile_plan(head), barrier, tail, spill_groups=spill_groups,
+                                          spill_dir=spill_dir, sort_memory=sort_memory)
+        return
+    
+    state = StreamingAggregate(barrier['group_by'], barrier.get('aggregations', {}), spill_groups, spill_dir)
+    try:
+        seen = False
+        for chunk in chunks:
+            with metrics.stage('transform aggregate', len(chunk)):
+                state.add(chunk)
+            seen = True
+        if not seen:
+            return
+        with metrics.stage('transform aggregate'):
+            df = state.result()
+    finally:
+        state.close()
+    if tail:
+        with metrics.stage('transform after aggregate', len(df)):
+            df = apply_transformations(df, tail)
+    yield df
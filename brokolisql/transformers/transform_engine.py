@@ -1,21 +1,29 @@
-import pandas as pd
 import json
 import os
+from brokolisql.transformers.expressions import compile_expression
+from brokolisql.transformers.external_sort import sort_frame
 
-def apply_transformations(df, config_path):
+# Steps that only look at one row at a time and can run chunk by chunk
+ROW_LOCAL_TRANSFORMS = {
+    'rename_columns',
+    'drop_columns',
+    'filter_rows',
+    'add_column',
+    'change_type',
+    'replace_values',
+    'apply_function',
+}
+
+def load_config(config_path):
     """
-    Apply transformations to the dataframe based on a config file.
+    Load a transformation config file.
     
     Args:
-        df (DataFrame): The dataframe to transform
-        config_path (str): Path to the transformation config file
+        config_path (str): Path to a JSON or YAML config file
         
     Returns:
-        DataFrame: The transformed dataframe
+        dict: The parsed config
     """
-    
-    env = {"pd": pd, "df": df}
-    env.update(df)
     # Check file extension
     _, ext = os.path.splitext(config_path)
     
@@ -30,72 +38,108 @@ def apply_transformations(df, config_path):
     else:
         raise ValueError(f"Unsupported config file extension: {ext}")
     
-    # Apply each transformation in sequence
-    for transform in config.get('transformations', []):
-        transform_type = transform.get('type')
-        
-        if transform_type == 'rename_columns':
-            rename_map = transform.get('mapping', {})
-            df = df.rename(columns=rename_map)
-        
-        elif transform_type == 'drop_columns':
-            columns = transform.get('columns', [])
-            df = df.drop(columns=columns, errors='ignore')
-        
-        elif transform_type == 'filter_rows':
-            condition = transform.get('condition', '')
-            if condition:
-                df = df.query(condition)
-        
-        elif transform_type == 'add_column':
-            name = transform.get('name', '')
-            expression = transform.get('expression', '')
-            if name and expression:
-                df[name] = eval(expression, env)
-        
-        elif transform_type == 'change_type':
-            column = transform.get('column', '')
-            target_type = transform.get('to_type', '')
-            if column and target_type:
-                df[column] = df[column].astype(target_type)
-        
-        elif transform_type == 'replace_values':
-            column = transform.get('column', '')
-            old_value = transform.get('old_value', None)
-            new_value = transform.get('new_value', None)
-            if column:
-                if old_value is not None and new_value is not None:
-                    df[column] = df[column].replace(old_value, new_value)
-                elif transform.get('mapping'):
-                     df.loc[:, column] = df[column].replace(transform.get('mapping'))
-        
-        elif transform_type == 'apply_function':
-            column = transform.get('column', '')
-            function_name = transform.get('function', '')
-            
-            if column and function_name:
-                # Some common functions
-                if function_name == 'upper':
-                    df[column] = df[column].str.upper()
-                elif function_name == 'lower':
-                   df.loc[:, column] = df[column].str.lower()
-                elif function_name == 'strip':
-                    df[column] = df[column].str.strip()
-                elif function_name == 'title':
-                    df[column] = df[column].str.title()
-                elif function_name == 'capitalize':
-                    df[column] = df[column].str.capitalize()
+    return config
+
+def apply_transformations(df, config_path):
+    """
+    Apply transformations to the dataframe based on a config file.
+    
+    The steps are compiled into an optimized plan with
+    `transformers.plan.compile_plan` and run with `execute_plan`, which
+    gives the same result as applying them one by one.
+    
+    Args:
+        df (DataFrame): The dataframe to transform
+        config_path (str or dict): Path to the transformation config file,
+            or a config already loaded with `load_config`
         
-        elif transform_type == 'sort':
-            columns = transform.get('columns', [])
-            ascending = transform.get('ascending', True)
-            if columns:
-                df = df.sort_values(by=columns, ascending=ascending)
+    Returns:
+        DataFrame: The transformed dataframe
+    """
+    from brokolisql.transformers.plan import compile_plan, execute_plan
+    
+    config = load_config(config_path) if isinstance(config_path, str) else config_path
+    return execute_plan(compile_plan(config, list(df.columns)), df)
+
+def apply_transform(df, transform, inputs=None):
+    """
+    Apply a single transformation step.
+    
+    Args:
+        df (DataFrame): The dataframe to transform
+        transform (dict): The step, as found in the config
+        inputs (DataFrame): The dataframe the transformations started
+            from, whose columns `add_column` expressions can still read
+            after they are renamed or dropped
         
-        elif transform_type == 'aggregate':
-            group_by = transform.get('group_by', [])
-            aggregations = transform.get('aggregations', {})
-            if group_by:
-                df = df.groupby(group_by).agg(aggregations).reset_index()
+    Returns:
+        DataFrame: The transformed dataframe
+    """
+    transform_type = transform.get('type')
+    
+    if transform_type == 'rename_columns':
+        rename_map = transform.get('mapping', {})
+        df = df.rename(columns=rename_map)
+    
+    elif transform_type == 'drop_columns':
+        columns = transform.get('columns', [])
+        df = df.drop(columns=columns, errors='ignore')
+    
+    elif transform_type == 'filter_rows':
+        condition = transform.get('condition', '')
+        if condition:
+            df = compile_expression(condition, condition=True).filter(df)
+    
+    elif transform_type == 'add_column':
+        name = transform.get('name', '')
+        expression = transform.get('expression', '')
+        if name and expression:
+            df[name] = compile_expression(expression).evaluate(df, inputs)
+    
+    elif transform_type == 'change_type':
+        column = transform.get('column', '')
+        target_type = transform.get('to_type', '')
+        if column and target_type:
+            df[column] = df[column].astype(target_type)
+    
+    elif transform_type == 'replace_values':
+        column = transform.get('column', '')
+        old_value = transform.get('old_value', None)
+        new_value = transform.get('new_value', None)
+        if column:
+            if old_value is not None and new_value is not None:
+                df[column] = df[column].replace(old_value, new_value)
+            elif transform.get('mapping'):
+                df[column] = df[column].replace(transform.get('mapping'))
+    
+    elif transform_type == 'apply_function':
+        column = transform.get('column', '')
+        function_name = transform.get('function', '')
         
+        if column and function_name:
+            # Some common functions
+            if function_name == 'upper':
+                df[column] = df[column].str.upper()
+            elif function_name == 'lower':
+                df[column] = df[column].str.lower()
+            elif function_name == 'strip':
+                df[column] = df[column].str.strip()
+            elif function_name == 'title':
+                df[column] = df[column].str.title()
+            elif function_name == 'capitalize':
+                df[column] = df[column].str.capitalize()
+    
+    elif transform_type == 'sort':
+        columns = transform.get('columns', [])
+        ascending = transform.get('ascending', True)
+        if columns:
+            # Stable, so rows with equal keys come out as a streamed sort gives them
+            df = sort_frame(df, columns, ascending)
+    
+    elif transform_type == 'aggregate':
+        group_by = transform.get('group_by', [])
+        aggregations = transform.get('aggregations', {})
+        if group_by:
+            df = df.groupby(group_by).agg(aggregations).reset_index()
+    
     return df
\ No newline at end of file
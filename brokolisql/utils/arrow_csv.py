@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = pacsv = None
+
+# Values read_csv takes as missing by default
+NA_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+# Values read_csv takes as booleans by default; Arrow would also take '1' and '0'
+TRUE_VALUES = ['True', 'TRUE', 'true']
+FALSE_VALUES = ['False', 'FALSE', 'false']
+
+# Bytes of CSV text Arrow parses at a time, and so rows its streaming reader
+# settles column types from
+STREAM_BLOCK_SIZE = 1 << 24
+
+# Bytes read up front to spot the columns Arrow would read as dates or times
+PEEK_BLOCK_SIZE = 1 << 20
+
+
+def arrow_available():
+    """
+    Check whether pyarrow is installed for the Arrow CSV engine.
+    
+    Returns:
+        bool: True if pyarrow can be imported.
+    """
+    return pacsv is not None
+
+
+def _plain(type):
+    """Whether read_csv also reads a column of this Arrow type, rather than keeping it as text."""
+    return (pa.types.is_integer(type) or pa.types.is_floating(type) or pa.types.is_boolean(type)
+            or pa.types.is_string(type) or pa.types.is_null(type))
+
+
+def _arrow_type(dtype):
+    """Arrow type of a known column dtype, or None to leave the column to Arrow's inference."""
+    dtype = np.dtype(dtype)
+    # Object columns are read as text, as read_csv reads them with that dtype
+    if dtype.kind == 'O':
+        return pa.string()
+    if dtype.kind not in 'iufb':
+        return None
+    return pa.from_numpy_dtype(dtype)
+
+
+def _options(header, usecols=None, dtypes=None, strings=(), block_size=None):
+    """Arrow reader options matching read_csv's defaults, columns named as read_csv names them."""
+    names = list(header)
+    read_options = pacsv.ReadOptions(column_names=names, skip_rows=1)
+    if block_size:
+        read_options.block_size = block_size
+    column_types = {name: pa.string() for name in strings}
+    for name, dtype in (dtypes or {}).items():
+        type = _arrow_type(dtype)
+        if type is not None and name not in column_types:
+            column_types[name] = type
+    convert_options = pacsv.ConvertOptions(
+        column_types=column_types, include_columns=[names[i] for i in usecols] if usecols is not None else None,
+        null_values=NA_VALUES, true_values=TRUE_VALUES, false_values=FALSE_VALUES,
+        strings_can_be_null=True, quoted_strings_can_be_null=True)
+    return read_options, pacsv.ParseOptions(newlines_in_values=True), convert_options
+
+
+def _text_columns(schema):
+    """Columns Arrow reads as dates or times, which read_csv leaves as strings."""
+    return [field.name for field in schema if not _plain(field.type)]
+
+
+def _frame(table, start=0):
+    """DataFrame of an Arrow table, with missing values as read_csv gives them."""
+    df = table.to_pandas(deduplicate_objects=True)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            df.isetitem(i, pd.Series(np.nan, index=df.index))
+        elif df.dtypes.iloc[i] == object and table.column(i).null_count:
+            # Arrow gives None where read_csv gives NaN
+            column = df.iloc[:, i]
+            df.isetitem(i, column.where(column.notna(), np.nan))
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def read_csv(filepath, header, usecols=None, dtypes=None):
+    """
+    Read a whole CSV file with Arrow's multithreaded reader, into the
+    DataFrame `pd.read_csv` would give.
+    
+    Args:
+        filepath (str): Path to the CSV file.
+        header (Index): Column names, as read_csv reads them from the header.
+        usecols (list): Positions of the columns to read, or None for all.
+        dtypes (dict): Dtypes keyed by header name; numeric and boolean
+            ones are read as such, object ones as text, others are left to
+            inference.
+    
+    Returns:
+        DataFrame: The rows.
+    
+    Raises:
+        ArrowInvalid: If Arrow cannot parse the file, such as one whose
+            rows do not all have as many fields as the header.
+    """
+    with pacsv.open_csv(filepath, *_options(header, usecols, dtypes, block_size=PEEK_BLOCK_SIZE)) as reader:
+        strings = _text_columns(reader.schema)
+    table = pacsv.read_csv(filepath, *_options(header, usecols, dtypes, strings))
+    later = _text_columns(table.schema)
+    if later:
+        # Dates first seen past the peeked rows are parsed again as text
+        table = pacsv.read_csv(filepath, *_options(header, usecols, dtypes, strings + later))
+    return _frame(table)
+
+
+def iter_csv(filepath, header, chunk_size, usecols=None, dtypes=None):
+    """
+    Read a CSV file with Arrow's streaming reader, block by block, in
+    chunks of `chunk_size` rows like `pd.read_csv(chunksize=chunk_size)`.
+    
+    Column types are settled from the first block; known dtypes, such as
+    those of a schema scan, fix them for the whole file.
+    
+    Args:
+        filepath (str): Path to the CSV file.
+        header (Index): Column names, as read_csv reads them from the header.
+        chunk_size (int): Number of rows per chunk.
+        usecols (list): Positions of the columns to read, or None for all.
+        dtypes (dict): Dtypes keyed by header name, as for `read_csv`.
+    
+    Yields:
+        DataFrame: The next chunk of rows.
+    
+    Raises:
+        ArrowInvalid: If Arrow cannot parse the file, or a later block does
+            not fit the types settled from the first one.
+    """
+    reader = pacsv.open_csv(filepath, *_options(header, usecols, dtypes, block_size=STREAM_BLOCK_SIZE))
+    strings = _text_columns(reader.schema)
+    if strings:
+        reader = pacsv.open_csv(filepath, *_options(header, usecols, dtypes, strings, STREAM_BLOCK_SIZE))
+    
+    pending, rows, start = [], 0, 0
+    for batch in reader:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunk_size:
+            table = pa.Table.from_batches(pending, schema=reader.schema)
+            yield _frame(table.slice(0, chunk_size), start)
+            rest = table.slice(chunk_size)
+            pending, rows, start = rest.to_batches(), rest.num_rows, start + chunk_size
+    if rows or not start:
+        # An empty file still makes one empty chunk
+        yield _frame(pa.Table.from_batches(pending, schema=reader.schema), start)
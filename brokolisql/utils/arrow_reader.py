@@ -0,0 +1,292 @@
+import json
+import numpy as np
+from brokolisql.exceptions import OptionalDependencyMissing
+
+# Input formats read through pyarrow: Parquet files, and Arrow IPC files,
+# which Feather (version 2) files are
+ARROW_FORMATS = ('parquet', 'arrow')
+
+# SQL types of Arrow integer types; unsigned ones take the next wider type,
+# and uint64, wider than any integer type, a decimal of its 20 digits
+INTEGER_SQL_TYPES = {
+    'int8': 'TINYINT',
+    'int16': 'SMALLINT',
+    'int32': 'INTEGER',
+    'int64': 'BIGINT',
+    'uint8': 'SMALLINT',
+    'uint16': 'INTEGER',
+    'uint32': 'BIGINT',
+    'uint64': 'DECIMAL(20, 0)',
+}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise OptionalDependencyMissing('pyarrow', 'Parquet, Feather and Arrow IPC input')
+    return pyarrow
+
+
+class _ArrowFile:
+    """
+    A Parquet or Arrow IPC file opened for reading batch by batch.
+    
+    Both are memory-mapped, so batches are only paged in, and copied, when
+    they are converted to DataFrames.
+    """
+    
+    def __init__(self, filepath, format):
+        pa = self.pa = _import_pyarrow()
+        self.format = format
+        self.source = pa.memory_map(filepath)
+        if format == 'parquet':
+            self.reader = pa.parquet.ParquetFile(self.source)
+            self.schema = self.reader.schema_arrow
+        else:
+            try:
+                self.reader = pa.ipc.open_file(self.source)
+            except pa.ArrowInvalid:
+                # Arrow IPC streams have no footer, and can only be read in order
+                self.source.seek(0)
+                self.reader = pa.ipc.open_stream(self.source)
+            self.schema = self.reader.schema
+    
+    def close(self):
+        self.source.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def batches(self, chunk_size=None, columns=None):
+        """Record batches of at most `chunk_size` rows, Parquet files read row group by row group."""
+        if self.format == 'parquet':
+            for i in range(self.reader.num_row_groups):
+                table = self.reader.read_row_group(i, columns=columns)
+                yield from table.to_batches(chunk_size)
+            return
+        
+        if isinstance(self.reader, self.pa.ipc.RecordBatchFileReader):
+            batches = (self.reader.get_batch(i) for i in range(self.reader.num_record_batches))
+        else:
+            batches = iter(self.reader)
+        for batch in batches:
+            if columns is not None:
+                batch = batch.select(columns)
+            # Slicing a memory-mapped batch copies nothing
+            for start in range(0, batch.num_rows, chunk_size or max(batch.num_rows, 1)):
+                yield batch.slice(start, chunk_size)
+    
+    def null_counts(self):
+        """
+        Number of rows and of missing values of each column, from the file's
+        metadata: Parquet column statistics, or the null counts every Arrow
+        batch carries. A column whose nulls are not recorded counts as None.
+        """
+        if self.format == 'parquet':
+            metadata = self.reader.metadata
+            counts = {name: 0 for name in self.schema.names}
+            for i in range(metadata.num_row_groups):
+                row_group = metadata.row_group(i)
+                for j in range(row_group.num_columns):
+                    column = row_group.column(j)
+                    # Only top-level columns count; nested fields are not split
+                    name = column.path_in_schema
+                    if name not in counts:
+                        continue
+                    statistics = column.statistics
+                    if counts[name] is None or statistics is None or not statistics.has_null_count:
+                        counts[name] = None
+                    else:
+                        counts[name] += statistics.null_count
+            # Nested columns have no statistics of their own
+            for name in counts:
+                if self.schema.field(name).type.num_fields:
+                    counts[name] = None
+            return metadata.num_rows, counts
+        
+        rows = 0
+        counts = {name: 0 for name in self.schema.names}
+        for batch in self.batches():
+            rows += batch.num_rows
+            for name, column in zip(batch.schema.names, batch.columns):
+                counts[name] += column.null_count
+        return rows, counts
+
+
+def _plain_type(pa, type):
+    """The Arrow type a column is read as: dictionaries decoded, times of day as text."""
+    if pa.types.is_dictionary(type):
+        type = type.value_type
+    if pa.types.is_time(type):
+        return pa.string()
+    return type
+
+
+def _plain_schema(pa, schema):
+    """Schema with every column of the type it is read as."""
+    return pa.schema([field.with_type(_plain_type(pa, field.type)) for field in schema])
+
+
+def _frame(pa, data, start=0):
+    """DataFrame of an Arrow table or record batch."""
+    schema = _plain_schema(pa, data.schema)
+    if schema != data.schema:
+        data = data.cast(schema)
+    # Integer and boolean columns with missing values are read as objects,
+    # so integers keep their digits instead of turning into floats
+    df = data.to_pandas(integer_object_nulls=True, date_as_object=True)
+    for i, field in enumerate(schema):
+        if pa.types.is_nested(field.type):
+            # Lists, structs and maps are written as JSON text
+            df.isetitem(i, _json_column(data.column(i)))
+    for i in range(len(df.columns)):
+        if df.dtypes.iloc[i] == object and data.column(i).null_count:
+            # Arrow gives None where the other readers give NaN
+            column = df.iloc[:, i]
+            df.isetitem(i, column.where(column.notna(), np.nan))
+    df.index = range(start, start + len(df))
+    return df
+
+
+def _json_column(column):
+    """JSON text of each value of a nested Arrow column, None for nulls."""
+    return np.array([None if value is None else json.dumps(value, default=str, ensure_ascii=False)
+                     for value in column.to_pylist()], dtype=object)
+
+
+def sql_type(pa, type, nulls=None, rows=None):
+    """
+    SQL type of an Arrow column type.
+    
+    Args:
+        pa (module): The pyarrow module.
+        type (DataType): Arrow type of the column.
+        nulls (int): Number of missing values, or None if not known.
+        rows (int): Number of rows.
+    
+    Returns:
+        str: The SQL type.
+    """
+    type = _plain_type(pa, type)
+    # Completely empty columns, as type inference types them
+    if pa.types.is_null(type) or (rows and nulls == rows):
+        return 'VARCHAR(255)'
+    if pa.types.is_integer(type):
+        return INTEGER_SQL_TYPES[str(type)]
+    if pa.types.is_floating(type):
+        return 'DOUBLE' if pa.types.is_float64(type) else 'FLOAT'
+    if pa.types.is_boolean(type):
+        return 'BOOLEAN'
+    if pa.types.is_decimal(type):
+        return f'DECIMAL({type.precision}, {type.scale})'
+    if pa.types.is_timestamp(type):
+        return 'TIMESTAMP'
+    if pa.types.is_date(type):
+        return 'DATE'
+    if pa.types.is_string(type) or pa.types.is_large_string(type) or pa.types.is_nested(type):
+        # Lengths are not in the schema, and finding them would mean reading
+        # the values; nested values are written as JSON text
+        return 'TEXT'
+    return 'VARCHAR(255)'
+
+
+def read_arrow_schema(filepath, format):
+    """
+    Settle the schema of a Parquet or Arrow IPC file from its own schema
+    and metadata, without reading any values.
+    
+    Args:
+        filepath (str): Path to the file.
+        format (str): 'parquet' or 'arrow'.
+    
+    Returns:
+        tuple: (pandas dtypes dict, column types dict, row count), keyed by
+            the column names of the file.
+    """
+    with _ArrowFile(filepath, format) as f:
+        pa = f.pa
+        rows, nulls = f.null_counts()
+        # An empty table converts to the dtypes of columns without nulls
+        dtypes = _plain_schema(pa, f.schema).empty_table().to_pandas(date_as_object=True).dtypes.to_dict()
+        column_types = {}
+        for field in f.schema:
+            type = _plain_type(pa, field.type)
+            maybe_null = field.nullable and nulls[field.name] != 0
+            if maybe_null and (pa.types.is_integer(type) or pa.types.is_boolean(type)):
+                dtypes[field.name] = np.dtype(object)
+            column_types[field.name] = sql_type(pa, field.type, nulls[field.name], rows)
+    return dtypes, column_types, rows
+
+
+def iter_arrow_frames(filepath, format, chunk_size=None, columns=None):
+    """
+    Stream a Parquet or Arrow IPC file as DataFrames of at most
+    `chunk_size` rows.
+    
+    Parquet files are read one row group at a time. Arrow IPC files are
+    memory-mapped and their record batches sliced without copying, so only
+    the chunk being converted is read from the file.
+    
+    Args:
+        filepath (str): Path to the file.
+        format (str): 'parquet' or 'arrow'.
+        chunk_size (int): Number of rows per chunk, or None for the record
+            batches or row groups of the file as they are.
+        columns (list): Names of the columns to read, or None for all.
+    
+    Yields:
+        DataFrame: The next chunk of rows.
+    """
+    with _ArrowFile(filepath, format) as f:
+        start = 0
+        for batch in f.batches(chunk_size, columns):
+            yield _frame(f.pa, batch, start)
+            start += batch.num_rows
+        if not start:
+            # An empty file still makes one empty chunk
+            schema = f.schema if columns is None else f.pa.schema([f.schema.field(name) for name in columns])
+            yield _frame(f.pa, schema.empty_table())
+
+
+def read_arrow_file(filepath, format, columns=None):
+    """
+    Read a whole Parquet or Arrow IPC file into a DataFrame.
+    
+    Args:
+        filepath (str): Path to the file.
+        format (str): 'parquet' or 'arrow'.
+        columns (list): Names of the columns to read, or None for all.
+    
+    Returns:
+        DataFrame: The rows.
+    """
+    with _ArrowFile(filepath, format) as f:
+        pa = f.pa
+        if format == 'parquet':
+            table = f.reader.read(columns=columns)
+        else:
+            table = f.reader.read_all()
+            if columns is not None:
+                table = table.select(columns)
+        return _frame(pa, table)
+
+
+def read_arrow_columns(filepath, format):
+    """
+    Read the column names of a Parquet or Arrow IPC file from its schema.
+    
+    Args:
+        filepath (str): Path to the file.
+        format (str): 'parquet' or 'arrow'.
+    
+    Returns:
+        list: Column names.
+    """
+    with _ArrowFile(filepath, format) as f:
+        return list(f.schema.names)
@@ -0,0 +1,192 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from brokolisql.exceptions import FileNotFound, SheetNotFound
+
+# Value of `sheets` selecting every sheet of a workbook
+ALL_SHEETS = '*'
+
+
+def _is_legacy(filepath):
+    """Old binary .xls workbooks cannot be opened by openpyxl."""
+    return os.path.splitext(filepath)[-1].lower() == '.xls'
+
+
+def _open_workbook(filepath):
+    return load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+
+
+def list_sheets(filepath):
+    """
+    List the sheet names of a workbook in order.
+    
+    Args:
+        filepath (str): Path to the Excel file.
+    
+    Returns:
+        list: Sheet names.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFound(filepath)
+    
+    if _is_legacy(filepath):
+        return pd.ExcelFile(filepath).sheet_names
+    
+    workbook = _open_workbook(filepath)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def resolve_sheets(filepath, sheets=None):
+    """
+    Turn a sheet selection into a list of sheet names.
+    
+    Args:
+        filepath (str): Path to the Excel file.
+        sheets (list): Sheet names or 0-based positions, or `ALL_SHEETS`
+            for every sheet. Defaults to the first sheet.
+    
+    Returns:
+        list: Sheet names in the order selected.
+    
+    Raises:
+        SheetNotFound: If a selected sheet does not exist.
+    """
+    available = list_sheets(filepath)
+    if not sheets:
+        return available[:1]
+    
+    names = []
+    for sheet in sheets:
+        if sheet == ALL_SHEETS:
+            names.extend(available)
+        elif sheet in available:
+            names.append(sheet)
+        elif str(sheet).isdigit() and int(sheet) < len(available):
+            names.append(available[int(sheet)])
+        else:
+            raise SheetNotFound(filepath, sheet, available)
+    return names
+
+
+def _convert_cell(value):
+    """Convert a cell value the way `pandas.read_excel` does."""
+    if value is None:
+        return ''
+    if isinstance(value, str) and value in ERROR_CODES:
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _iter_rows(worksheet):
+    """
+    Yield the converted rows of a worksheet, without trailing empty cells
+    and without the empty rows at the end of the sheet.
+    """
+    empty_rows = 0
+    for row in worksheet.iter_rows(values_only=True):
+        row = [_convert_cell(value) for value in row]
+        while row and row[-1] == '':
+            row.pop()
+        if not row:
+            # Held back until a row with data shows they are not trailing
+            empty_rows += 1
+            continue
+        for _ in range(empty_rows):
+            yield []
+        empty_rows = 0
+        yield row
+
+
+def _parse_rows(rows, header):
+    """
+    Build a DataFrame from raw rows with pandas' own Excel parser, so values
+    and dtypes come out exactly as `pandas.read_excel` would give them.
+    """
+    width = max([len(header)] + [len(row) for row in rows])
+    header = header + [''] * (width - len(header))
+    # Blank and duplicate header cells get pandas' 'Unnamed: n' / 'name.1' names
+    columns = TextParser([header], header=0, skip_blank_lines=False).read().columns
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    rows = [row + [''] * (width - len(row)) for row in rows]
+    return TextParser(rows, header=None, names=columns, skip_blank_lines=False).read()
+
+
+def iter_excel_frames(filepath, sheet, chunk_size=None):
+    """
+    Stream a worksheet as DataFrames of at most `chunk_size` rows.
+    
+    Workbooks are opened with openpyxl in read-only, values-only mode, so
+    rows are read lazily from the file and only one chunk is held in memory.
+    The first row of the sheet is the header. Legacy .xls workbooks are
+    read whole with `pandas.read_excel` and sliced.
+    
+    Args:
+        filepath (str): Path to the Excel file.
+        sheet (str): Name of the sheet.
+        chunk_size (int): Number of rows per chunk, or None for the whole
+            sheet in one frame.
+    
+    Yields:
+        DataFrame: The next chunk of rows.
+    """
+    if _is_legacy(filepath):
+        df = pd.read_excel(filepath, sheet_name=sheet)
+        step = chunk_size or max(len(df), 1)
+        for i in range(0, max(len(df), 1), step):
+            yield df.iloc[i:i + step]
+        return
+    
+    workbook = _open_workbook(filepath)
+    try:
+        worksheet = workbook[sheet]
+        # Read-only sheets may carry stale dimensions that truncate rows
+        worksheet.reset_dimensions()
+        rows = _iter_rows(worksheet)
+        header = next(rows, [])
+        
+        chunk = list(islice(rows, chunk_size))
+        yield _parse_rows(chunk, header)
+        while chunk_size:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield _parse_rows(chunk, header)
+    finally:
+        workbook.close()
+
+
+def read_excel_sheet(filepath, sheet):
+    """Read a whole worksheet into a DataFrame."""
+    # Without a chunk size the sheet comes back as a single frame
+    return list(iter_excel_frames(filepath, sheet))[0]
+
+
+def read_excel_sheets(filepath, sheets, workers=1):
+    """
+    Read several worksheets, each in its own worker process when `workers`
+    is more than one.
+    
+    Args:
+        filepath (str): Path to the Excel file.
+        sheets (list): Sheet names.
+        workers (int): Number of worker processes.
+    
+    Returns:
+        list: One DataFrame per sheet, in the order of `sheets`.
+    """
+    if workers <= 1 or len(sheets) <= 1:
+        return [read_excel_sheet(filepath, sheet) for sheet in sheets]
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(sheets))) as executor:
+        return list(executor.map(read_excel_sheet, [filepath] * len(sheets), sheets))
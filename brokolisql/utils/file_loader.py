@@ -1,18 +1,281 @@
+import numpy as np
 import pandas as pd
-import json
-import xml.etree.ElementTree as ET
+from itertools import islice
 from brokolisql.services import normalizer
 from brokolisql.services import type_inference
+from brokolisql.services import metrics
 import os
+from brokolisql.utils.json_reader import iter_json_records, iter_ndjson_records
+from brokolisql.utils.xml_reader import iter_xml_records
+from brokolisql.utils.excel_reader import resolve_sheets, iter_excel_frames, read_excel_sheets
+from brokolisql.utils import arrow_csv
+from brokolisql.utils.arrow_reader import (
+    ARROW_FORMATS, iter_arrow_frames, read_arrow_file, read_arrow_schema, read_arrow_columns,
+)
+import xml.etree.ElementTree as ET
 from brokolisql.exceptions import (
+    BrokoliSQLException,
     FileNotFound,
     FileFormatNotSupported,
     FileLoadError,
     FileParsingError,
+    SchemaMismatch,
 )
 
+# Parsers CSV files can be read with: pandas' C parser, or Arrow's
+# multithreaded reader when pyarrow is installed
+CSV_ENGINES = ('c', 'pyarrow')
+
+# Rows per chunk in streaming mode when no size or memory budget is given
+DEFAULT_CHUNK_SIZE = 50000
+
+# Rows read up front to measure the in-memory size of a row
+MEMORY_SAMPLE_ROWS = 1000
+
+# A chunk is held as a DataFrame, its formatted literals and the SQL text
+# built from them, so a row costs a few times its DataFrame footprint
+MEMORY_OVERHEAD_FACTOR = 4
+
+# The strings read_csv's inference reads as booleans
+BOOLEAN_VALUES = dict([(value, True) for value in arrow_csv.TRUE_VALUES]
+                      + [(value, False) for value in arrow_csv.FALSE_VALUES])
+
+
+def resolve_format(filepath, format='auto'):
+    """
+    Resolve the input format of a file, inferring it from the extension
+    when `format` is 'auto'.
+    
+    Args:
+        filepath (str): Path to the input file.
+        format (str): Format of the file. If 'auto', infer from extension.
+    
+    Returns:
+        str: One of 'csv', 'excel', 'json', 'ndjson', 'xml', 'parquet' or
+            'arrow' (Feather and Arrow IPC files).
+    
+    Raises:
+        FileFormatNotSupported: If the extension is not recognized.
+    """
+    if format != 'auto':
+        return format
+    
+    ext = os.path.splitext(filepath)[-1].lower()
+    if ext == '.csv':
+        return 'csv'
+    elif ext in ['.xls', '.xlsx']:
+        return 'excel'
+    elif ext == '.json':
+        return 'json'
+    elif ext in ['.ndjson', '.jsonl']:
+        return 'ndjson'
+    elif ext in ['.xml', '.html']:
+        return 'xml'
+    elif ext in ['.parquet', '.pq']:
+        return 'parquet'
+    elif ext in ['.feather', '.arrow', '.arrows', '.ipc']:
+        return 'arrow'
+    else:
+        raise FileFormatNotSupported(ext)
+
+
+def _record_frames(records, chunk_size, flatten=True):
+    """Group records into DataFrames of `chunk_size` rows."""
+    while True:
+        batch = list(islice(records, chunk_size))
+        if not batch:
+            return
+        # json_normalize names nested fields 'parent.child'
+        if flatten and all(isinstance(record, dict) for record in batch):
+            yield pd.json_normalize(batch)
+        else:
+            yield pd.DataFrame(batch)
+
 
-def load_file(filepath, format='auto'):
+def _iter_frames(filepath, format, chunk_size, csv_dtypes=None, json_path=None,
+                 xml_record_tag=None, xml_attributes=False, sheets=None, exclude_columns=None, engine='c'):
+    """Read a file as a stream of DataFrames of at most `chunk_size` rows."""
+    if format == 'csv':
+        yield from _iter_csv(filepath, chunk_size, _csv_usecols(filepath, exclude_columns), csv_dtypes, engine)
+    elif format == 'excel':
+        # Selected sheets are read one after the other into a single stream
+        for sheet in resolve_sheets(filepath, sheets):
+            yield from iter_excel_frames(filepath, sheet, chunk_size)
+    elif format == 'json':
+        yield from _record_frames(iter_json_records(filepath, json_path), chunk_size)
+    elif format == 'ndjson':
+        yield from _record_frames(iter_ndjson_records(filepath), chunk_size)
+    elif format == 'xml':
+        records = iter_xml_records(filepath, xml_record_tag, xml_attributes)
+        try:
+            yield from _record_frames(records, chunk_size, flatten=False)
+        except ET.ParseError as e:
+            raise FileParsingError(filepath, e)
+    elif format in ARROW_FORMATS:
+        yield from iter_arrow_frames(filepath, format, chunk_size, _arrow_usecols(filepath, format, exclude_columns))
+    else:
+        df = _read_frame(filepath, format)
+        for i in range(0, max(len(df), 1), chunk_size):
+            yield df.iloc[i:i + chunk_size]
+
+
+def _append_frames(frames, numeric_bools=False):
+    """
+    Stack frames read separately, settling the dtype of every column the
+    same way a streaming pass over them would.
+    """
+    dtypes = {}
+    rows = 0
+    null_dtype = np.dtype('float64')
+    for df in frames:
+        for col in dtypes.keys() - set(df.columns):
+            dtypes[col] = type_inference.merge_dtypes(dtypes[col], null_dtype, numeric_bools)
+        for col in df.columns:
+            if col in dtypes:
+                dtypes[col] = type_inference.merge_dtypes(dtypes[col], df[col].dtype, numeric_bools)
+            elif rows:
+                dtypes[col] = type_inference.merge_dtypes(null_dtype, df[col].dtype, numeric_bools)
+            else:
+                dtypes[col] = df[col].dtype
+        rows += len(df)
+    return pd.concat([_conform(df, dtypes) for df in frames], ignore_index=True)
+
+
+def _csv_header(filepath):
+    """Raw and normalized column names of a CSV file."""
+    header = pd.read_csv(filepath, nrows=0).columns
+    return header, normalizer.normalize_column_names(pd.DataFrame(columns=header)).columns
+
+
+def _read_csv(filepath, usecols=None, dtypes=None, engine='c'):
+    """Read a whole CSV file, with Arrow's reader when asked for and installed."""
+    if engine == 'pyarrow' and arrow_csv.arrow_available():
+        try:
+            return arrow_csv.read_csv(filepath, _csv_header(filepath)[0], usecols, dtypes)
+        except arrow_csv.pa.ArrowInvalid:
+            # Files Arrow cannot parse, such as ones with short rows, are left to the C parser
+            pass
+    return pd.read_csv(filepath, dtype=dtypes, usecols=usecols)
+
+
+def _iter_csv(filepath, chunk_size, usecols=None, dtypes=None, engine='c'):
+    """Read a CSV file in chunks, with Arrow's streaming reader when asked for and installed."""
+    read = 0
+    if engine == 'pyarrow' and arrow_csv.arrow_available():
+        try:
+            for chunk in arrow_csv.iter_csv(filepath, _csv_header(filepath)[0], chunk_size, usecols, dtypes):
+                yield chunk
+                read += 1
+            return
+        except arrow_csv.pa.ArrowInvalid:
+            # The C parser takes over from the first chunk Arrow could not parse
+            pass
+    yield from islice(pd.read_csv(filepath, chunksize=chunk_size, dtype=dtypes, usecols=usecols), read, None)
+
+
+def _csv_usecols(filepath, exclude_columns):
+    """Positions of the CSV columns to parse, or None for all of them."""
+    if not exclude_columns:
+        return None
+    _, normalized = _csv_header(filepath)
+    return [i for i, col in enumerate(normalized) if col not in exclude_columns]
+
+
+def _csv_dtypes(filepath, dtypes, exclude_columns=None):
+    """Key dtypes given for normalized column names by the raw CSV header names."""
+    header, normalized = _csv_header(filepath)
+    pairs = [(raw, col) for raw, col in zip(header, normalized) if col not in (exclude_columns or ())]
+    _check_columns(filepath, [col for _, col in pairs], dtypes)
+    return {raw: dtypes[col] for raw, col in pairs}
+
+
+def _read_bools(df, dtypes):
+    """
+    Read text columns the way read_csv's inference would have read them
+    whole: a column of nothing but 'True' and 'False' holds booleans.
+    """
+    for col, dtype in dtypes.items():
+        if dtype != object or col not in df.columns:
+            continue
+        values = df[col].dropna()
+        if len(values) and values.isin(BOOLEAN_VALUES).all():
+            df[col] = df[col].map(BOOLEAN_VALUES, na_action='ignore')
+    return df
+
+
+def _arrow_header(filepath, format):
+    """Raw and normalized column names of a Parquet or Arrow IPC file."""
+    header = pd.Index(read_arrow_columns(filepath, format))
+    return header, normalizer.normalize_column_names(pd.DataFrame(columns=header)).columns
+
+
+def _arrow_usecols(filepath, format, exclude_columns):
+    """Raw names of the Parquet or Arrow IPC columns to read, or None for all of them."""
+    if not exclude_columns:
+        return None
+    header, normalized = _arrow_header(filepath, format)
+    return [raw for raw, col in zip(header, normalized) if col not in exclude_columns]
+
+
+def _arrow_schema(filepath, format, exclude_columns=None):
+    """Schema of a Parquet or Arrow IPC file from its metadata, keyed by normalized column names."""
+    dtypes, column_types, rows = read_arrow_schema(filepath, format)
+    header, normalized = _arrow_header(filepath, format)
+    pairs = [(raw, col) for raw, col in zip(header, normalized) if col not in (exclude_columns or ())]
+    return {col: dtypes[raw] for raw, col in pairs}, {col: column_types[raw] for raw, col in pairs}, rows
+
+
+def _exclude_columns(df, exclude_columns):
+    """Drop the excluded columns formats without a column selection had to read."""
+    excluded = [col for col in exclude_columns or () if col in df.columns]
+    return df.drop(columns=excluded) if excluded else df
+
+
+def _check_columns(filepath, columns, dtypes):
+    """Make sure a file has exactly the columns of the schema it is read with."""
+    missing = [col for col in dtypes if col not in set(columns)]
+    unexpected = [col for col in columns if col not in dtypes]
+    if missing or unexpected:
+        raise SchemaMismatch(filepath, missing, unexpected)
+
+
+def _load_error(filepath, error, known_schema=False):
+    """
+    The error to raise for a file that failed to load: a value that does
+    not fit a dtype of the known schema the file is read with, such as a
+    cached one, is a mismatch with that schema rather than a read error.
+    """
+    if known_schema and isinstance(error, (ValueError, TypeError)) and not isinstance(error, pd.errors.ParserError):
+        return SchemaMismatch(filepath, error=error)
+    return FileLoadError(filepath, error)
+
+
+def _read_frame(filepath, format, workers=1, dtypes=None, sheets=None, exclude_columns=None, engine='c',
+                **reader_options):
+    """Read a whole file into a DataFrame."""
+    if format == 'csv':
+        # Known dtypes spare read_csv its type guessing, but for object
+        # columns, which may hold booleans as well as text
+        known = None
+        if dtypes:
+            known = {raw: dtype for raw, dtype in _csv_dtypes(filepath, dtypes, exclude_columns).items()
+                     if dtype != object}
+        df = _read_csv(filepath, _csv_usecols(filepath, exclude_columns), known, engine)
+    elif format == 'excel':
+        frames = read_excel_sheets(filepath, resolve_sheets(filepath, sheets), workers)
+        # Pandas' Excel parser reads booleans next to numbers as numbers
+        df = _append_frames(frames, numeric_bools=True) if len(frames) > 1 else frames[0]
+    elif format in ('json', 'ndjson', 'xml'):
+        frames = list(_iter_frames(filepath, format, DEFAULT_CHUNK_SIZE, **reader_options))
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    elif format in ARROW_FORMATS:
+        df = read_arrow_file(filepath, format, _arrow_usecols(filepath, format, exclude_columns))
+    else:
+        raise FileFormatNotSupported(format)
+    return df
+
+
+def load_file(filepath, format='auto', workers=1, schema=None, engine='c', **reader_options):
     """
     Load a file into a pandas DataFrame, normalize column names,
     and infer column types.
@@ -20,58 +283,291 @@ def load_file(filepath, format='auto'):
     Args:
         filepath (str): Path to the input file.
         format (str): Format of the file. If 'auto', infer from extension.
-        
+        workers (int): Number of processes used to read several Excel
+            sheets at once.
+        schema (tuple): Known (dtypes, column types, rows) schema of the
+            file, such as a cached one. The file is read with its dtypes
+            and column types are not inferred. Parquet and Arrow IPC files
+            are read with the schema they carry when none is given.
+        engine (str): Parser of CSV files: 'c', pandas' C parser, or
+            'pyarrow', Arrow's multithreaded reader. Both give the same
+            DataFrame; the C parser reads the file when pyarrow is not
+            installed or Arrow cannot parse it.
+        reader_options: Format-specific reader options: `json_path`, the
+            dot-separated path to the record array of a JSON document;
+            `xml_record_tag`, the tag of XML record elements;
+            `xml_attributes`, to take XML record attributes as columns; and
+            `sheets`, the Excel sheet names or positions to read ('*' for
+            all of them, appended in order; defaults to the first sheet);
+            and `exclude_columns`, normalized names of columns not to load,
+            which CSV, Parquet and Arrow IPC files do not even read.
+    
     Returns:
         tuple: (DataFrame, column types dict)
-        
+    
     Raises:
         ValueError: If the file cannot be read or format is unsupported.
     """
     if not os.path.exists(filepath):
         raise FileNotFound(filepath)
+    
+    format = resolve_format(filepath, format)
+    
+    known = schema is not None
+    try:
+        if schema is None and format in ARROW_FORMATS:
+            # Parquet and Arrow files carry their schema, so no values need inspecting
+            with metrics.stage('infer'):
+                schema = _arrow_schema(filepath, format, reader_options.get('exclude_columns'))
+        dtypes = schema[0] if schema else None
+        with metrics.stage('parse'):
+            df = _read_frame(filepath, format, workers, dtypes, engine=engine, **reader_options)
+        metrics.add('parse', len(df))
+    except BrokoliSQLException:
+        raise
+    except Exception as e:
+        raise _load_error(filepath, e, known)
+    
+    try:
+        with metrics.stage('normalize', len(df)):
+            df = normalizer.normalize_column_names(df)
+            df = _exclude_columns(df, reader_options.get('exclude_columns'))
+            if schema:
+                _check_columns(filepath, df.columns, dtypes)
+                df = _conform(df, dtypes)
+                column_types = dict(schema[1])
+        if not schema:
+            with metrics.stage('infer', len(df)):
+                column_types = type_inference.infer_column_types(df)
+    except BrokoliSQLException:
+        raise
+    except Exception as e:
+        raise _load_error(filepath, e, known)
+    
+    return df, column_types
 
-    if format == 'auto':
-        ext = os.path.splitext(filepath)[-1].lower()
-        if ext == '.csv':
-            format = 'csv'
-        elif ext in ['.xls', '.xlsx']:
-            format = 'excel'
-        elif ext == '.json':
-            format = 'json'
-        elif ext in ['.xml', '.html']:
-            format = 'xml'
-        else:
-            raise FileFormatNotSupported(ext)
+
+def load_sheets(filepath, sheets=None, workers=1, schemas=None, exclude_columns=None):
+    """
+    Load Excel sheets as separate DataFrames, reading them in parallel
+    worker processes when `workers` is more than one.
+    
+    Args:
+        filepath (str): Path to the Excel file.
+        sheets (list): Sheet names or positions, '*' for all of them.
+            Defaults to the first sheet.
+        workers (int): Number of worker processes.
+        schemas (list): Known schema of each sheet, or None where it is
+            not known, as for `load_file`.
+        exclude_columns (list): Normalized names of the columns not to
+            load from each sheet, or None to load them all.
+    
+    Returns:
+        list: (sheet name, DataFrame, column types dict) for each sheet.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFound(filepath)
     
     try:
-        if format == 'csv':
-            df = pd.read_csv(filepath)
-        elif format == 'excel':
-            df = pd.read_excel(filepath)
-        elif format == 'json':
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            if isinstance(data, list):
-                df = pd.DataFrame(data)
-            else:
-                df = pd.json_normalize(data)
-        elif format == 'xml':
-            try:
-                tree = ET.parse(filepath)
-                root = tree.getroot()
-                elements = [{elem.tag: elem.text for elem in child} for child in root]
-                df = pd.DataFrame(elements)
-            except ET.ParseError as e:
-                raise FileParsingError(filepath)
-        else:
-            raise FileFormatNotSupported()
+        names = resolve_sheets(filepath, sheets)
+        with metrics.stage('parse'):
+            frames = read_excel_sheets(filepath, names, workers)
+    except BrokoliSQLException:
+        raise
     except Exception as e:
         raise FileLoadError(filepath, e)
+    
+    loaded = []
+    excluded = exclude_columns or [None] * len(names)
+    for name, df, schema, exclude in zip(names, frames, schemas or [None] * len(names), excluded):
+        metrics.add('parse', len(df))
+        with metrics.stage('normalize', len(df)):
+            df = _exclude_columns(normalizer.normalize_column_names(df), exclude)
+        if schema:
+            _check_columns(filepath, df.columns, schema[0])
+            try:
+                df = _conform(df, schema[0])
+            except Exception as e:
+                raise _load_error(filepath, e, known_schema=True)
+            loaded.append((name, df, dict(schema[1])))
+        else:
+            with metrics.stage('infer', len(df)):
+                loaded.append((name, df, type_inference.infer_column_types(df)))
+    return loaded
+
 
+def _conform(df, dtypes):
+    """Give a chunk the columns and dtypes settled for the whole file."""
+    if list(df.columns) != list(dtypes):
+        df = df.reindex(columns=list(dtypes))
+    for col, dtype in dtypes.items():
+        if df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def iter_file_chunks(filepath, format='auto', chunk_size=DEFAULT_CHUNK_SIZE, dtypes=None, engine='c',
+                     **reader_options):
+    """
+    Read a file as a stream of DataFrame chunks with normalized column names.
+    
+    CSV, Excel, JSON, NDJSON and XML files are read incrementally, Parquet
+    files one row group at a time and Arrow IPC files through a memory map;
+    legacy .xls workbooks are loaded once and sliced into chunks.
+    
+    Args:
+        filepath (str): Path to the input file.
+        format (str): Format of the file. If 'auto', infer from extension.
+        chunk_size (int): Number of rows per chunk.
+        dtypes (dict): Optional pandas dtypes keyed by normalized column
+            name, applied to every chunk so values render the same way
+            throughout the file.
+        engine (str): Parser of CSV files, as for `load_file`. Arrow's
+            reader streams the file block by block.
+        reader_options: Format-specific reader options, as for `load_file`.
+    
+    Yields:
+        DataFrame: The next chunk of rows.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFound(filepath)
+    
+    format = resolve_format(filepath, format)
+    
     try:
-        df = normalizer.normalize_column_names(df)
-        column_types = type_inference.infer_column_types(df)
+        csv_dtypes = None
+        if dtypes and format == 'csv':
+            # read_csv wants the raw header names
+            csv_dtypes = _csv_dtypes(filepath, dtypes, reader_options.get('exclude_columns'))
+        
+        frames = _iter_frames(filepath, format, chunk_size, csv_dtypes=csv_dtypes, engine=engine, **reader_options)
+        for chunk in metrics.track(frames, 'parse'):
+            with metrics.stage('normalize', len(chunk)):
+                chunk = normalizer.normalize_column_names(chunk)
+                chunk = _exclude_columns(chunk, reader_options.get('exclude_columns'))
+                if dtypes:
+                    if format == 'csv':
+                        # Text columns are read as text, so numbers in them keep
+                        # their digits, and their booleans are read back here
+                        chunk = _read_bools(chunk, dtypes)
+                    # Record-based formats may not carry every column in every chunk
+                    chunk = _conform(chunk, dtypes)
+            yield chunk
+    except BrokoliSQLException:
+        raise
     except Exception as e:
-        raise FileLoadError(filepath, e)
+        raise _load_error(filepath, e, bool(dtypes))
+
+
+def scan_file_schema(filepath, format='auto', chunk_size=DEFAULT_CHUNK_SIZE, engine='c', **reader_options):
+    """
+    Make one streaming pass over a file to settle its schema without
+    holding more than one chunk in memory.
+    
+    Parquet and Arrow IPC files are not read at all: their schema and
+    metadata give the types and the row count.
+    
+    Args:
+        filepath (str): Path to the input file.
+        format (str): Format of the file. If 'auto', infer from extension.
+        chunk_size (int): Number of rows per chunk.
+        engine (str): Parser of CSV files, as for `load_file`.
+        reader_options: Format-specific reader options, as for `load_file`.
+    
+    Returns:
+        tuple: (pandas dtypes dict, column types dict, row count)
+    """
+    format = resolve_format(filepath, format)
+    if format in ARROW_FORMATS:
+        if not os.path.exists(filepath):
+            raise FileNotFound(filepath)
+        try:
+            with metrics.stage('scan infer'):
+                return _arrow_schema(filepath, format, reader_options.get('exclude_columns'))
+        except BrokoliSQLException:
+            raise
+        except Exception as e:
+            raise FileLoadError(filepath, e)
+    
+    stats, rows = scan_file_stats(filepath, format, chunk_size, engine=engine, **reader_options)
+    dtypes = {col: column.dtype for col, column in stats.items()}
+    column_types = type_inference.column_types_from_stats(stats)
+    return dtypes, column_types, rows
+
+
+def scan_file_stats(filepath, format='auto', chunk_size=DEFAULT_CHUNK_SIZE, engine='c', **reader_options):
+    """
+    Make one streaming pass over a file to collect the stats of its
+    columns, which merge with those of other files into the schema of all
+    of them.
+    
+    Args:
+        filepath (str): Path to the input file.
+        format (str): Format of the file. If 'auto', infer from extension.
+        chunk_size (int): Number of rows per chunk.
+        engine (str): Parser of CSV files, as for `load_file`.
+        reader_options: Format-specific reader options, as for `load_file`.
+    
+    Returns:
+        tuple: (column stats dict, row count)
+    """
+    stats = {}
+    rows = 0
+    format = resolve_format(filepath, format)
+    
+    # Column stats merge chunk by chunk into the stats of the whole file, so
+    # the dtypes and SQL types match those of a whole-file read
+    with metrics.scope('scan'):
+        for chunk in iter_file_chunks(filepath, format, chunk_size, engine=engine, **reader_options):
+            with metrics.stage('infer', len(chunk)):
+                stats = type_inference.merge_column_stats(stats, type_inference.collect_column_stats(chunk),
+                                                          numeric_bools=format == 'excel')
+            rows += len(chunk)
+    return stats, rows
+
+
+def read_columns(filepath, format='auto', **reader_options):
+    """
+    Read the normalized column names of a file from its first row.
+    
+    Args:
+        filepath (str): Path to the input file.
+        format (str): Format of the file. If 'auto', infer from extension.
+        reader_options: Format-specific reader options, as for `load_file`.
+    
+    Returns:
+        list: Column names.
+    """
+    if resolve_format(filepath, format) in ARROW_FORMATS and os.path.exists(filepath):
+        # Taken from the schema, without reading a row group
+        _, normalized = _arrow_header(filepath, resolve_format(filepath, format))
+        return [col for col in normalized if col not in (reader_options.get('exclude_columns') or ())]
+    with metrics.scope('sample'):
+        sample = next(iter_file_chunks(filepath, format, 1, **reader_options), None)
+    return list(sample.columns) if sample is not None else []
+
+
+def estimate_chunk_size(filepath, format='auto', max_memory=None, **reader_options):
+    """
+    Pick a chunk size that keeps a streaming run within a memory budget,
+    based on the measured in-memory size of the first rows of the file.
+    
+    Args:
+        filepath (str): Path to the input file.
+        format (str): Format of the file. If 'auto', infer from extension.
+        max_memory (int): Memory budget in bytes.
+        reader_options: Format-specific reader options, as for `load_file`.
+    
+    Returns:
+        int: Number of rows per chunk.
+    """
+    if not max_memory:
+        return DEFAULT_CHUNK_SIZE
+    
+    with metrics.scope('sample'):
+        sample = next(iter_file_chunks(filepath, format, MEMORY_SAMPLE_ROWS, **reader_options), None)
+    if sample is None or len(sample) == 0:
+        return DEFAULT_CHUNK_SIZE
     
-    return df, column_types
\ No newline at end of file
+    bytes_per_row = sample.memory_usage(index=True, deep=True).sum() / len(sample)
+    return max(1, int(max_memory // (bytes_per_row * MEMORY_OVERHEAD_FACTOR)))
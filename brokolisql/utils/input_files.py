@@ -0,0 +1,79 @@
+import glob
+import os
+import re
+from brokolisql.exceptions import FileFormatNotSupported, InputNotMatched
+from brokolisql.utils.file_loader import resolve_format
+
+# Characters that make an --input a glob pattern rather than a path
+GLOB_CHARACTERS = re.compile(r'[*?[]')
+
+# Placeholders of the table and output name templates of a batch of files
+TEMPLATE_FIELDS = ('stem', 'name', 'parent', 'index')
+
+
+def is_batch_input(path):
+    """Whether an --input names several files: a directory or a glob pattern, rather than a file."""
+    if os.path.isfile(path):
+        return False
+    return os.path.isdir(path) or bool(GLOB_CHARACTERS.search(path))
+
+
+def expand_input(path, format='auto'):
+    """
+    List the files of a directory or glob pattern given as --input.
+    
+    A directory stands for the files right inside it in a format that can
+    be read, or all of them when the format is given; a pattern for the
+    files it matches, with `**` matching any number of directories.
+    
+    Args:
+        path (str): The directory or pattern.
+        format (str): Format of the files, or 'auto' to tell it by extension.
+    
+    Returns:
+        list: Paths of the files, sorted.
+    
+    Raises:
+        InputNotMatched: If there are no such files.
+    """
+    if os.path.isdir(path):
+        files = [os.path.join(path, name) for name in os.listdir(path)]
+        files = [file for file in files if os.path.isfile(file) and _readable(file, format)]
+    else:
+        files = [file for file in glob.glob(path, recursive=True) if os.path.isfile(file)]
+    if not files:
+        raise InputNotMatched(path)
+    return sorted(files)
+
+
+def _readable(path, format):
+    try:
+        resolve_format(path, format)
+    except FileFormatNotSupported:
+        return False
+    return True
+
+
+def template_fields(path, index):
+    """
+    Values of the placeholders of a name template for one file of a batch:
+    `stem`, its name without extensions, `name`, its name, `parent`, the
+    name of its directory, and `index`, its 1-based position in the batch.
+    """
+    name = os.path.basename(path)
+    return {
+        'stem': name.split('.')[0] or name,
+        'name': name,
+        'parent': os.path.basename(os.path.dirname(os.path.abspath(path))),
+        'index': index,
+    }
+
+
+def is_template(value):
+    """Whether a --table or --output is a name template, holding a placeholder such as {stem}."""
+    return bool(value) and re.search(r'\{(' + '|'.join(TEMPLATE_FIELDS) + r')(![rsa])?(:[^}]*)?\}', value) is not None
+
+
+def render_table_name(template, fields):
+    """Render a table name template, replacing what a table name cannot hold with underscores."""
+    return re.sub(r'[^\w]', '_', template.format(**fields))
@@ -0,0 +1,138 @@
+import json
+
+# Characters read from the file at a time
+READ_SIZE = 1 << 16
+
+
+class _JSONStream:
+    """
+    Minimal incremental JSON scanner: values are decoded one at a time with
+    `JSONDecoder.raw_decode` from a buffer that is refilled on demand, so
+    only the value being decoded has to fit in memory.
+    """
+    
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+    
+    def _fill(self):
+        if self.pos > len(self.buf) // 2:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        # Read at least as much as is pending so that a large value is
+        # re-scanned a logarithmic number of times, not once per read
+        data = self.f.read(max(READ_SIZE, len(self.buf) - self.pos))
+        if not data:
+            self.eof = True
+        self.buf += data
+    
+    def peek(self):
+        """Skip whitespace and return the next character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+    
+    def expect(self, chars):
+        """Consume the next character, which must be one of `chars`."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Invalid JSON: expected one of {chars!r} but found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+    
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # A number cut off by the end of the buffer still decodes
+            if end >= len(self.buf) and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return value
+    
+    def array_items(self):
+        """Yield the items of the array starting at the current position."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+    
+    def find_key(self, key):
+        """
+        Advance inside the object starting at the current position until
+        the value of `key`, skipping the values of other keys.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            return False
+        while True:
+            name = self.value()
+            self.expect(':')
+            if name == key:
+                return True
+            self.value()
+            if self.expect(',}') == '}':
+                return False
+
+
+def iter_json_records(filepath, record_path=None):
+    """
+    Incrementally read the records of a JSON document.
+    
+    Records are the items of the top-level array or, with `record_path`,
+    of the array found by following dot-separated object keys from the top
+    level (for example 'data.items'). A top-level object without
+    `record_path` is a single record.
+    
+    Args:
+        filepath (str): Path to the JSON file.
+        record_path (str): Dot-separated path to the record array.
+    
+    Yields:
+        The next decoded record.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        stream = _JSONStream(f)
+        
+        for key in record_path.split('.') if record_path else []:
+            if stream.peek() != '{' or not stream.find_key(key):
+                raise ValueError(f"JSON path '{record_path}' not found: no object key '{key}'")
+        
+        if stream.peek() == '[':
+            yield from stream.array_items()
+        else:
+            yield stream.value()
+
+
+def iter_ndjson_records(filepath):
+    """
+    Read newline-delimited JSON (one record per line), skipping blank lines.
+    
+    Args:
+        filepath (str): Path to the NDJSON/JSON Lines file.
+    
+    Yields:
+        The next decoded record.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
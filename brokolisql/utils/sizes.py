@@ -0,0 +1,50 @@
+import re
+
+_UNITS = {
+    '': 1,
+    'K': 1024,
+    'M': 1024 ** 2,
+    'G': 1024 ** 3,
+    'T': 1024 ** 4,
+}
+
+
+def parse_size(value):
+    """
+    Parse a human-readable byte size such as '512MB', '2G' or '1048576'.
+    
+    Args:
+        value (str or int): The size to parse. Units are binary (1K = 1024).
+        
+    Returns:
+        int: The size in bytes.
+        
+    Raises:
+        ValueError: If the value is not a valid size.
+    """
+    if isinstance(value, int):
+        return value
+    
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*$', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    
+    number, unit = match.groups()
+    return int(float(number) * _UNITS[unit.upper()])
+
+
+
+def format_size(size):
+    """
+    Write a byte size in the largest unit it reaches, such as '1.5 MB'.
+    
+    Args:
+        size (int): The size in bytes. Units are binary (1K = 1024).
+        
+    Returns:
+        str: The readable size.
+    """
+    for unit in ('T', 'G', 'M', 'K'):
+        if size >= _UNITS[unit]:
+            return f"{size / _UNITS[unit]:.1f} {unit}B"
+    return f"{size} B"
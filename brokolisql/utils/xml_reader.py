@@ -0,0 +1,57 @@
+import xml.etree.ElementTree as ET
+
+
+def _local_name(tag):
+    """Strip the '{namespace}' prefix ElementTree adds to qualified tags."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_xml_records(filepath, record_tag=None, attributes=False):
+    """
+    Stream the records of an XML document with `iterparse`, clearing each
+    element once it has been read so memory use does not grow with the
+    size of the file.
+    
+    A record is every child of the root element or, with `record_tag`,
+    every element with that tag at any depth. Its fields are the text of
+    its child elements, keyed by their tag.
+    
+    Args:
+        filepath (str): Path to the XML file.
+        record_tag (str): Tag of the record elements, with or without
+            namespace.
+        attributes (bool): Also take the record element's attributes as
+            columns.
+    
+    Yields:
+        dict: The next record.
+    """
+    def is_record(elem, depth):
+        if record_tag is None:
+            return depth == 1
+        return record_tag in (elem.tag, _local_name(elem.tag))
+    
+    parents = []
+    in_record = 0
+    
+    for event, elem in ET.iterparse(filepath, events=('start', 'end')):
+        if event == 'start':
+            if is_record(elem, len(parents)):
+                in_record += 1
+            parents.append(elem)
+            continue
+        
+        parents.pop()
+        record_end = is_record(elem, len(parents))
+        if record_end:
+            record = dict(elem.attrib) if attributes else {}
+            for child in elem:
+                record[child.tag] = child.text
+            yield record
+            in_record -= 1
+        
+        # Elements of a record are still needed until the record ends;
+        # anything else that has ended is dropped from its parent
+        if parents and (record_end or not in_record):
+            elem.clear()
+            parents[-1].remove(elem)